@@ -0,0 +1,449 @@
+# async_engine.py
+"""
+Асинхронный движок отправки payload на asyncio
+"""
+
+import asyncio
+import queue
+import socket
+import ssl
+import threading
+import time
+from urllib.parse import urlsplit, urlencode
+
+import config
+from latency import build_timings
+from wire_request import RequestCompiler
+
+
+class HTTPResponseError(Exception):
+    """Некорректный HTTP ответ сервера"""
+
+
+class AsyncResponse:
+    """Ответ сервера, полученный асинхронным клиентом"""
+
+    def __init__(self, status_code, headers, body, connect_time=0.0, connections=0, phases=None):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.connect_time = connect_time
+        self.connections = connections
+        # DNS, TCP и TLS (нс), момент получения заголовков (perf_counter_ns)
+        self.phases = phases or (0, 0, 0, None)
+
+
+class _Connection:
+    """Открытое keep-alive соединение"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.requests = 0
+
+    def close(self):
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+
+
+class AsyncHTTPClient:
+    """Минимальный неблокирующий HTTP/1.1 клиент с пулом keep-alive соединений"""
+
+    def __init__(self, target_url):
+        """
+        Инициализация клиента
+
+        Args:
+            target_url (str): URL целевого сервера
+        """
+        parts = urlsplit(target_url)
+        self.scheme = parts.scheme or "http"
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.scheme == "https" else 80)
+        self.base_path = parts.path.rstrip("/")
+        self._idle = []
+
+        default_port = 443 if self.scheme == "https" else 80
+        self.host_header = self.host if self.port == default_port else f"{self.host}:{self.port}"
+
+        self.ssl_context = None
+        if self.scheme == "https":
+            self.ssl_context = ssl.create_default_context()
+            self.ssl_context.check_hostname = False
+            self.ssl_context.verify_mode = ssl.CERT_NONE
+
+    async def _open(self):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter_ns()
+        infos = await loop.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM)
+        resolved = time.perf_counter_ns()
+
+        # До Python 3.11 TLS устанавливается вместе с TCP и не выделяется в фазу
+        split_tls = hasattr(asyncio.StreamWriter, "start_tls")
+        ssl_context = self.ssl_context if not split_tls else None
+        last_error = None
+        for address in dict.fromkeys(info[4][0] for info in infos):
+            try:
+                reader, writer = await asyncio.open_connection(
+                    address, self.port,
+                    ssl=ssl_context,
+                    server_hostname=self.host if ssl_context else None
+                )
+                break
+            except OSError as e:
+                last_error = e
+        else:
+            raise last_error or OSError(f"Не удалось разрешить {self.host}")
+        connected = time.perf_counter_ns()
+
+        tls_ns = 0
+        if self.ssl_context and split_tls:
+            await writer.start_tls(self.ssl_context, server_hostname=self.host)
+            tls_ns = time.perf_counter_ns() - connected
+
+        phases = (resolved - start, connected - resolved, tls_ns)
+        return _Connection(reader, writer), (connected + tls_ns - start) / 1e9, phases
+
+    @staticmethod
+    async def _read_body(reader, length, body, body_limit, discarded):
+        # Сохраняется не более body_limit байт, остальное читается без сохранения
+        keep = min(length, max(body_limit - len(body), 0))
+        if keep:
+            body += await reader.readexactly(keep)
+        left = length - keep
+        while left:
+            chunk = await reader.read(min(left, 64 * 1024))
+            if not chunk:
+                raise asyncio.IncompleteReadError(b"", left)
+            left -= len(chunk)
+        return discarded + length - keep
+
+    async def _read_response(self, reader, body_limit=None):
+        status_line = await reader.readline()
+        if not status_line:
+            raise asyncio.IncompleteReadError(b"", None)
+        parts = status_line.split(None, 2)
+        if len(parts) < 2 or not parts[0].startswith(b"HTTP/"):
+            raise HTTPResponseError(f"Некорректная строка статуса: {status_line[:100]!r}")
+        status_code = int(parts[1])
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        headers_ns = time.perf_counter_ns()
+
+        # Без ограничения тело читается целиком; с ограничением остаток больше
+        # BLOCK_DRAIN_LIMIT не дочитывается, соединение закрывается
+        limit = float("inf") if body_limit is None else body_limit
+        drain_limit = float("inf") if body_limit is None else config.BLOCK_DRAIN_LIMIT
+        keep_alive = headers.get("connection", "").lower() != "close"
+        body = bytearray()
+        discarded = 0
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                if discarded > drain_limit:
+                    keep_alive = False
+                    break
+                size_line = await reader.readline()
+                size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+                if size == 0:
+                    # Завершающие заголовки (trailers)
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                discarded = await self._read_body(reader, size, body, limit, discarded)
+                await reader.readexactly(2)
+        elif "content-length" in headers:
+            length = int(headers["content-length"])
+            if length - min(length, limit) > drain_limit:
+                body += await reader.readexactly(min(length, limit))
+                keep_alive = False
+            else:
+                await self._read_body(reader, length, body, limit, 0)
+        elif status_code in (204, 304) or 100 <= status_code < 200:
+            pass
+        else:
+            body += await (reader.read() if body_limit is None else reader.read(body_limit))
+            keep_alive = False
+
+        return status_code, headers, bytes(body), keep_alive, headers_ns
+
+    def build_request(self, path, params=None, headers=None):
+        """
+        Сформировать GET запрос в формате HTTP/1.1
+
+        Args:
+            path (str): Путь запроса
+            params (Dict): Параметры query string
+            headers (Dict): Дополнительные заголовки
+
+        Returns:
+            bytes: Запрос в wire-формате
+        """
+        target = self.base_path + path
+        if params:
+            target += "?" + urlencode(params)
+        connection = "keep-alive" if config.HTTP_KEEP_ALIVE else "close"
+        extra = "".join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+        return (
+            f"GET {target} HTTP/1.1\r\n"
+            f"Host: {self.host_header}\r\n"
+            f"User-Agent: waf-tester\r\n"
+            f"Accept: */*\r\n"
+            f"{extra}"
+            f"Connection: {connection}\r\n"
+            f"\r\n"
+        ).encode("latin-1", errors="replace")
+
+    async def get(self, path, params=None, headers=None, body_limit=None):
+        """
+        Отправить GET запрос
+
+        Args:
+            path (str): Путь запроса
+            params (Dict): Параметры query string
+            headers (Dict): Дополнительные заголовки
+            body_limit (int): Сколько байт тела сохранить (None - всё тело)
+
+        Returns:
+            AsyncResponse: Ответ сервера
+        """
+        return await self.request(self.build_request(path, params, headers), body_limit)
+
+    async def request(self, request, body_limit=None):
+        """
+        Отправить готовый запрос в wire-формате
+
+        Args:
+            request (bytes): Запрос (build_request или RequestTemplate.render)
+            body_limit (int): Сколько байт тела сохранить (None - всё тело)
+
+        Returns:
+            AsyncResponse: Ответ сервера
+        """
+        connect_time = 0.0
+        connections = 0
+        dns_ns = tcp_ns = tls_ns = 0
+
+        # Одна повторная попытка, если сервер закрыл простаивающее соединение
+        for attempt in range(2):
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                conn, elapsed, (dns, tcp, tls) = await self._open()
+                connect_time += elapsed
+                connections += 1
+                dns_ns += dns
+                tcp_ns += tcp
+                tls_ns += tls
+
+            try:
+                conn.writer.write(request)
+                await conn.writer.drain()
+                status_code, headers, body, keep_alive, headers_ns = \
+                    await self._read_response(conn.reader, body_limit)
+            except (asyncio.IncompleteReadError, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if conn.requests == 0 or attempt == 1:
+                    raise
+                continue
+            except BaseException:
+                conn.close()
+                raise
+
+            conn.requests += 1
+            if keep_alive and config.HTTP_KEEP_ALIVE:
+                self._idle.append(conn)
+            else:
+                conn.close()
+            break
+
+        return AsyncResponse(
+            status_code, headers, body, connect_time, connections,
+            (dns_ns, tcp_ns, tls_ns, headers_ns)
+        )
+
+    def close(self):
+        """
+        Закрыть все простаивающие соединения
+        """
+        for conn in self._idle:
+            conn.close()
+        self._idle = []
+
+
+# Сигнал потоку сбора результатов: цикл событий завершился
+_STOP = object()
+
+
+class AsyncEngine:
+    """Отправка payload с тысячами одновременных запросов
+
+    Цикл событий занят только сетью: фиксированный пул корутин берёт
+    payload из очереди и отдаёт результаты в очередь потока сбора. Поток
+    сбора выдаёт payload из набора (с пропуском по кэшу и журналу) и
+    вызывает обработчик результатов - агрегатор, приёмники, журнал с
+    fsync, SQLite - не задерживая корутины.
+    """
+
+    def __init__(self, tester, concurrency=None):
+        """
+        Инициализация движка
+
+        Args:
+            tester (WAFTester): Тестер, для которого формируются результаты
+            concurrency (int): Максимум одновременных запросов
+        """
+        self.tester = tester
+        self.concurrency = concurrency or config.ASYNC_CONCURRENCY
+        self.compiler = RequestCompiler(tester.target_url)
+        self.client = None
+        self._loop = None
+        self._payloads = None
+
+    async def send_payload(self, payload_dict):
+        """
+        Отправить один payload запрос
+
+        Args:
+            payload_dict (Dict): Словарь с информацией о payload
+
+        Returns:
+            TestResult: Результат отправки
+        """
+        result = self.tester.new_result(payload_dict)
+
+        try:
+            request = self.compiler.compile(payload_dict).render(result.correlation_id)
+            await self.tester.rate_limiter.acquire_async(payload_dict["endpoint"])
+            start_ns = time.perf_counter_ns()
+            response = await asyncio.wait_for(
+                self.client.request(request, self.tester.block_detector.body_bytes),
+                timeout=config.REQUEST_TIMEOUT
+            )
+            end_ns = time.perf_counter_ns()
+            response_time = (end_ns - start_ns) / 1e9
+            self.tester.http_pool.stats.record(
+                response.connections, response.connect_time, response_time
+            )
+
+            result.sent_ts = time.time()
+            result.connect_time = response.connect_time
+            result.timings = build_timings(start_ns, end_ns, *response.phases, response.connections)
+            self.tester.apply_response(result, response.status_code, response_time,
+                                       response.headers, response.body)
+
+        except asyncio.TimeoutError:
+            result.status_code = "TIMEOUT"
+            self.tester.rate_limiter.feedback(result.status_code, config.REQUEST_TIMEOUT)
+        except (OSError, asyncio.IncompleteReadError):
+            result.status_code = "CONNECTION_ERROR"
+        except Exception as e:
+            result.status_code = f"ERROR: {str(e)}"
+
+        return result
+
+    async def _run(self, results, started):
+        self.client = AsyncHTTPClient(self.tester.target_url)
+        self._loop = asyncio.get_running_loop()
+        self._payloads = asyncio.Queue()
+        started.set()
+
+        # Фиксированный пул корутин: в работе не больше concurrency запросов
+        async def worker():
+            while True:
+                payload_dict = await self._payloads.get()
+                if payload_dict is None:
+                    return
+                results.put(await self.send_payload(payload_dict))
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            self.client.close()
+
+    def _give(self, batch):
+        # Выполняется в цикле событий: payload (None - конец) для корутин
+        for payload_dict in batch:
+            self._payloads.put_nowait(payload_dict)
+
+    def _collect(self, payloads, results, on_result, started):
+        # Поток сбора: payload выдаются окнами по мере получения результатов
+        started.wait()
+        if self._loop is None:
+            return
+        iterator = iter(payloads)
+        window = self.concurrency * 2
+        in_flight = 0
+        exhausted = False
+        while True:
+            batch = []
+            while not exhausted and in_flight < window:
+                payload_dict = next(iterator, None)
+                if payload_dict is None:
+                    exhausted = True
+                    batch.extend([None] * self.concurrency)
+                    break
+                batch.append(payload_dict)
+                in_flight += 1
+            if batch:
+                try:
+                    self._loop.call_soon_threadsafe(self._give, batch)
+                except RuntimeError:
+                    # Цикл событий уже остановлен (прерывание)
+                    return
+            if exhausted and not in_flight:
+                return
+
+            result = results.get()
+            while True:
+                if result is _STOP:
+                    return
+                in_flight -= 1
+                on_result(result)
+                try:
+                    result = results.get_nowait()
+                except queue.Empty:
+                    break
+
+    def run(self, payloads, on_result):
+        """
+        Отправить все payload и передать результаты в обработчик
+
+        Args:
+            payloads (Iterable[Dict]): Набор payload (перебирается в потоке сбора)
+            on_result (Callable): Вызывается для каждого TestResult в потоке сбора
+        """
+        results = queue.SimpleQueue()
+        started = threading.Event()
+        errors = []
+
+        def collect():
+            try:
+                self._collect(payloads, results, on_result, started)
+            except BaseException as e:
+                errors.append(e)
+                # Корутины завершаются, не дожидаясь остальных payload
+                try:
+                    self._loop.call_soon_threadsafe(self._give, [None] * self.concurrency)
+                except RuntimeError:
+                    pass
+
+        collector = threading.Thread(target=collect, name="async-results", daemon=True)
+        collector.start()
+
+        try:
+            asyncio.run(self._run(results, started))
+        finally:
+            # Результаты, уже полученные до остановки цикла, обрабатываются
+            started.set()
+            results.put(_STOP)
+            collector.join()
+        if errors:
+            raise errors[0]
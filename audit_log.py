@@ -0,0 +1,314 @@
+# audit_log.py
+"""
+Потоковое чтение аудит-лога ModSecurity с учётом ротации
+"""
+
+import json
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+
+import config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def select_json_loads():
+    """
+    Выбрать декодер JSON: orjson, если установлен, иначе стандартный json
+
+    Returns:
+        Callable: Функция разбора JSON
+    """
+    if config.LOG_JSON_BACKEND in ("auto", "orjson") and orjson is not None:
+        return orjson.loads
+    return json.loads
+
+
+class LogPosition:
+    """Позиция в файле лога: inode и смещение на момент начала теста
+
+    Для источников, которые читаются только целиком (.gz, каталог
+    concurrent mode), вместо смещения хранится время начала теста since.
+    """
+
+    def __init__(self, path, inode=None, device=None, offset=0, since=None):
+        self.path = str(path)
+        self.inode = inode
+        self.device = device
+        self.offset = offset
+        self.since = since
+
+    def __repr__(self):
+        return f"LogPosition({self.path!r}, inode={self.inode}, offset={self.offset})"
+
+
+def capture_position(path):
+    """
+    Запомнить текущий конец файла лога
+
+    Args:
+        path (str): Путь к логу
+
+    Returns:
+        LogPosition: Позиция, начиная с которой будут читаться новые записи
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        # Файла ещё нет - всё, что появится, относится к текущему запуску
+        return LogPosition(path)
+    return LogPosition(path, st.st_ino, st.st_dev, st.st_size)
+
+
+def find_rotated(position):
+    """
+    Найти файл, в который был переименован лог при ротации
+
+    Args:
+        position (LogPosition): Сохранённая позиция исходного файла
+
+    Returns:
+        Path: Путь к ротированному файлу или None
+    """
+    if position.inode is None:
+        return None
+    log_path = Path(position.path)
+    try:
+        candidates = sorted(log_path.parent.iterdir())
+    except OSError:
+        return None
+    for candidate in candidates:
+        if candidate == log_path or not candidate.name.startswith(log_path.name):
+            continue
+        try:
+            st = candidate.stat()
+        except OSError:
+            continue
+        if st.st_ino == position.inode and st.st_dev == position.device:
+            return candidate
+    return None
+
+
+def _read_lines(path, offset=0):
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        yield from f
+
+
+def iter_lines(path, position=None):
+    """
+    Построчно прочитать записи, добавленные в лог после сохранённой позиции
+
+    Файл читается потоково, поэтому потребление памяти не зависит от размера лога.
+    Если лог был ротирован, сначала дочитывается хвост старого файла,
+    затем новый файл с начала.
+
+    Args:
+        path (str): Путь к логу
+        position (LogPosition): Позиция начала (None - читать файл целиком)
+
+    Yields:
+        bytes: Строки лога (без декодирования)
+    """
+    if position is None or position.inode is None:
+        if os.path.exists(path):
+            yield from _read_lines(path)
+        return
+
+    try:
+        st = os.stat(path)
+    except OSError:
+        st = None
+
+    if st is not None and (st.st_ino, st.st_dev) == (position.inode, position.device):
+        # Тот же файл; если он стал короче - его обрезали (copytruncate)
+        offset = position.offset if st.st_size >= position.offset else 0
+        yield from _read_lines(path, offset)
+        return
+
+    # Файл ротирован: дочитываем старый, затем новый с начала
+    rotated = find_rotated(position)
+    if rotated is not None:
+        yield from _read_lines(rotated, position.offset)
+    if st is not None:
+        yield from _read_lines(path)
+
+
+class LinePrefilter:
+    """Дешёвая побайтовая проверка строки лога до разбора JSON"""
+
+    _TIMESTAMP = re.compile(rb'"time_?stamp"\s*:\s*"([^"]+)"')
+
+    def __init__(self, run_id=None, since=None, mode=None):
+        """
+        Инициализация фильтра
+
+        Args:
+            run_id (str): Идентификатор запуска (маркер корреляции)
+            since (datetime): Начало временного окна запуска
+            mode (str): "marker", "time" или None (без фильтрации)
+        """
+        self.mode = config.LOG_PREFILTER if mode is None else mode
+        self.marker = run_id.encode() if run_id else None
+        self.since = since
+        if self.mode == "marker" and self.marker is None:
+            self.mode = None
+        if self.mode == "time" and since is None:
+            self.mode = None
+
+    def _in_window(self, line):
+        match = self._TIMESTAMP.search(line)
+        if match is None:
+            return True
+        try:
+            stamp = datetime.fromisoformat(match.group(1).decode().replace('Z', '+00:00'))
+        except ValueError:
+            return True
+        since = self.since
+        if stamp.tzinfo is not None and since.tzinfo is None:
+            since = since.astimezone()
+        elif stamp.tzinfo is None and since.tzinfo is not None:
+            stamp = stamp.astimezone()
+        return stamp >= since
+
+    def accept(self, line):
+        """
+        Проверить, может ли строка относиться к текущему запуску
+
+        Args:
+            line (bytes): Строка лога
+
+        Returns:
+            bool: False если строку можно пропустить без разбора
+        """
+        if self.mode == "marker":
+            return self.marker in line
+        if self.mode == "time":
+            return self._in_window(line)
+        return True
+
+
+def iter_entries(lines, prefilter=None):
+    """
+    Разобрать JSON записи аудит-лога
+
+    Args:
+        lines (Iterable[bytes]): Строки лога
+        prefilter (LinePrefilter): Фильтр строк до разбора JSON (опционально)
+
+    Yields:
+        Dict: Записи лога (строки, не являющиеся JSON, пропускаются)
+    """
+    accept = prefilter.accept if prefilter is not None else None
+    json_loads = select_json_loads()
+    for line in lines:
+        if accept is not None and not accept(line):
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield json_loads(line)
+        except ValueError:
+            # Некорректный UTF-8 внутри записи - пробуем без битых байтов
+            if isinstance(line, bytes):
+                try:
+                    yield json_loads(line.decode('utf-8', errors='ignore'))
+                except ValueError:
+                    continue
+
+
+class AuditLogFollower:
+    """Чтение лога в режиме tail -F: новые строки по мере записи, с учётом ротации"""
+
+    def __init__(self, position, chunk_size=1 << 20):
+        """
+        Инициализация follower
+
+        Args:
+            position (LogPosition): Позиция, с которой начинается чтение
+            chunk_size (int): Максимум байт, читаемых за один опрос
+        """
+        self.position = position
+        self.path = position.path
+        self.chunk_size = chunk_size
+        self._file = None
+        self._ident = None
+        self._buffer = b""
+
+        if position.inode is None:
+            return
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            st = None
+        if st is not None and (st.st_ino, st.st_dev) == (position.inode, position.device):
+            self._open(self.path, position.offset if st.st_size >= position.offset else 0)
+        else:
+            rotated = find_rotated(position)
+            if rotated is not None:
+                self._open(rotated, position.offset)
+
+    def _open(self, path, offset):
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            return False
+        st = os.fstat(f.fileno())
+        f.seek(offset)
+        self._file = f
+        self._ident = (st.st_ino, st.st_dev)
+        return True
+
+    def _switch_if_rotated(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+        if self._file is None or (st.st_ino, st.st_dev) != self._ident:
+            # Старый файл дочитан до конца - переходим на новый
+            self.close()
+            self._buffer = b""
+            return self._open(self.path, 0)
+        if st.st_size < self._file.tell():
+            # Файл обрезан (copytruncate)
+            self._file.seek(0)
+            self._buffer = b""
+            return True
+        return False
+
+    def poll(self):
+        """
+        Прочитать строки, дописанные с момента предыдущего опроса
+
+        Returns:
+            List[bytes]: Завершённые строки (неполная последняя строка остаётся в буфере)
+        """
+        if self._file is None and not self._switch_if_rotated():
+            return []
+
+        chunk = self._file.read(self.chunk_size)
+        if not chunk:
+            if not self._switch_if_rotated():
+                return []
+            chunk = self._file.read(self.chunk_size)
+
+        data = self._buffer + chunk
+        end = data.rfind(b"\n")
+        if end < 0:
+            self._buffer = data
+            return []
+        self._buffer = data[end + 1:]
+        return data[:end].split(b"\n")
+
+    def close(self):
+        """
+        Закрыть файл лога
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,368 @@
+# benchmark.py
+"""
+Бенчмарк накладных расходов WAF: контрольный трафик против атак
+"""
+
+import asyncio
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import config
+from latency import LatencyHistogram
+from payloads import load_corpus
+from rate_limiter import RateLimiter
+
+CONTROL_TYPE = "control"
+
+
+def control_payloads(endpoints=None, values=None, parameter=None):
+    """
+    Бесконечный поток безопасных контрольных запросов
+
+    Args:
+        endpoints (List[str]): Endpoint (по умолчанию config.TEST_ENDPOINTS)
+        values (List[str]): Безопасные значения (по умолчанию config.BENCHMARK_CONTROL_VALUES)
+        parameter (str): Параметр запроса (по умолчанию config.BENCHMARK_CONTROL_PARAMETER)
+
+    Yields:
+        Dict: Payload в формате payloads.get_all_payloads с типом "control"
+    """
+    endpoints = endpoints or config.TEST_ENDPOINTS
+    values = values or config.BENCHMARK_CONTROL_VALUES
+    parameter = parameter or config.BENCHMARK_CONTROL_PARAMETER
+    for idx in itertools.count():
+        # Каждый endpoint по очереди получает все значения
+        yield {
+            "id": f"control_{idx}",
+            "attack_type": CONTROL_TYPE,
+            "payload": values[(idx // len(endpoints)) % len(values)],
+            "endpoint": endpoints[idx % len(endpoints)],
+            "method": "GET",
+            "parameter": parameter,
+            "description": "Benign control request",
+        }
+
+
+def repeat_payloads(payloads, count):
+    """
+    Повторять набор payload до нужного числа атак
+
+    Args:
+        payloads (Iterable[Dict]): Набор payload (должен допускать повторный проход)
+        count (int): Число атак (0 - один проход)
+
+    Yields:
+        Dict: Payload с уникальным id
+    """
+    if not count:
+        yield from payloads
+        return
+    sent = 0
+    for round_idx in itertools.count():
+        empty = True
+        for payload in payloads:
+            if sent >= count:
+                return
+            empty = False
+            if round_idx:
+                payload = dict(payload, id=f"{payload['id']}_{round_idx}")
+            yield payload
+            sent += 1
+        if empty:
+            return
+
+
+def interleave(attacks, controls, ratio):
+    """
+    Перемежать атаки контрольными запросами
+
+    Args:
+        attacks (Iterable[Dict]): Атаки
+        controls (Iterator[Dict]): Контрольные запросы
+        ratio (float): Контрольных запросов на одну атаку (может быть дробным)
+
+    Yields:
+        Dict: Payload в порядке отправки
+    """
+    credit = 0.0
+    for attack in attacks:
+        yield attack
+        credit += ratio
+        while credit >= 1:
+            credit -= 1
+            yield next(controls)
+
+
+class BenchmarkStats:
+    """Гистограммы задержки для контрольных запросов и атак"""
+
+    def __init__(self, warmup=0):
+        """
+        Инициализация статистики
+
+        Args:
+            warmup (int): Сколько первых ответов не учитывать
+        """
+        self.warmup = warmup
+        self.seen = 0
+        self.by_class = {}
+        self.by_endpoint = {}
+        self.by_type = {}
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _hist(groups, key):
+        hist = groups.get(key)
+        if hist is None:
+            hist = groups[key] = LatencyHistogram()
+        return hist
+
+    def add(self, result, latency_ns):
+        """
+        Учесть ответ
+
+        Args:
+            result (TestResult): Результат запроса
+            latency_ns (int): Задержка в наносекундах (None - запрос не выполнен)
+        """
+        kind = CONTROL_TYPE if result.attack_type == CONTROL_TYPE else "attack"
+        with self._lock:
+            self.seen += 1
+            if self.seen <= self.warmup:
+                return
+            counts = self.counts.setdefault(kind, {"sent": 0, "blocked": 0, "errors": 0})
+            counts["sent"] += 1
+            if latency_ns is None:
+                counts["errors"] += 1
+                return
+            counts["blocked"] += 1 if result.was_blocked else 0
+            self._hist(self.by_class, kind).record(latency_ns)
+            self._hist(self.by_endpoint, (kind, result.endpoint)).record(latency_ns)
+            if kind == "attack":
+                self._hist(self.by_type, result.attack_type).record(latency_ns)
+
+    @staticmethod
+    def _delta(hist, baseline):
+        summary = hist.summary()
+        if baseline is None or not baseline.count:
+            return summary
+        base = baseline.summary()
+        for key in ("p50_ms", "p90_ms", "p99_ms", "p999_ms", "mean_ms"):
+            summary[f"overhead_{key}"] = summary[key] - base[key]
+        return summary
+
+    def summary(self, elapsed, target_rate=0):
+        """
+        Итоги бенчмарка
+
+        Args:
+            elapsed (float): Длительность прогона (сек)
+            target_rate (float): Заданная скорость, запросов/сек
+
+        Returns:
+            Dict: Пропускная способность, задержки и прирост задержки атак
+                  относительно контрольного трафика
+        """
+        with self._lock:
+            control = self.by_class.get(CONTROL_TYPE)
+            # Пропускная способность считается по всем ответам, включая прогрев
+            total = self.seen
+
+            by_endpoint = {}
+            for (kind, endpoint), hist in self.by_endpoint.items():
+                if kind != "attack":
+                    continue
+                # Базой служит контрольный трафик на тот же endpoint, если он был
+                baseline = self.by_endpoint.get((CONTROL_TYPE, endpoint))
+                entry = self._delta(hist, baseline if baseline is not None else control)
+                entry["baseline"] = "endpoint" if baseline is not None else "all_control"
+                by_endpoint[endpoint] = entry
+
+            return {
+                "elapsed": elapsed,
+                "target_rate": target_rate,
+                "throughput": total / elapsed if elapsed else 0,
+                "throughput_by_class": {
+                    kind: counts["sent"] / elapsed if elapsed else 0
+                    for kind, counts in self.counts.items()
+                },
+                "counts": {kind: dict(counts) for kind, counts in self.counts.items()},
+                "latency": {kind: hist.summary() for kind, hist in self.by_class.items()},
+                "overhead": self._delta(self.by_class["attack"], control)
+                            if "attack" in self.by_class else {},
+                "control_by_endpoint": {
+                    endpoint: hist.summary()
+                    for (kind, endpoint), hist in self.by_endpoint.items()
+                    if kind == CONTROL_TYPE
+                },
+                "by_endpoint": by_endpoint,
+                "by_type": {t: self._delta(h, control) for t, h in self.by_type.items()},
+            }
+
+
+class BenchmarkRunner:
+    """Отправка атак вперемешку с контрольными запросами с заданной нагрузкой
+
+    Режимы нагрузки:
+        open  - запросы отправляются по расписанию start + i / rate независимо
+                от ответов, задержка считается от запланированного момента
+                (учитывается ожидание в очереди, без coordinated omission)
+        fixed - замкнутый цикл: свободный исполнитель берёт следующий запрос,
+                скорость ограничена token bucket, задержка - время ответа
+    """
+
+    def __init__(self, tester, load=None, rate=None, requests=None, control_ratio=None, warmup=None):
+        """
+        Инициализация бенчмарка
+
+        Args:
+            tester (WAFTester): Тестер с настроенным движком отправки
+            load (str): "open" или "fixed" (по умолчанию config.BENCHMARK_LOAD)
+            rate (float): Запросов/сек (по умолчанию config.BENCHMARK_RATE)
+            requests (int): Число атак (по умолчанию config.BENCHMARK_REQUESTS)
+            control_ratio (float): Контрольных запросов на атаку
+            warmup (int): Сколько первых ответов не учитывать
+        """
+        self.tester = tester
+        self.load = load or config.BENCHMARK_LOAD
+        self.rate = config.BENCHMARK_RATE if rate is None else rate
+        self.requests = config.BENCHMARK_REQUESTS if requests is None else requests
+        self.control_ratio = config.BENCHMARK_CONTROL_RATIO if control_ratio is None else control_ratio
+        self.stats = BenchmarkStats(config.BENCHMARK_WARMUP if warmup is None else warmup)
+        self.completed = 0
+
+        if self.load == "open" and not self.rate:
+            print("[!] Режим open требует BENCHMARK_RATE > 0, используется fixed")
+            self.load = "fixed"
+        # В режиме open темп задаёт расписание, в fixed - token bucket
+        self.tester.rate_limiter = RateLimiter(
+            rate=self.rate if self.load == "fixed" else 0,
+            burst=1, endpoint_limits={}, adaptive=False
+        )
+
+    @staticmethod
+    def _latency(result, scheduled):
+        # Вызывается сразу после ответа, до передачи результата в статистику
+        if result.timings is None:
+            return None
+        if scheduled is None:
+            return result.timings[-1]
+        return max(time.perf_counter_ns() - scheduled, 0)
+
+    def _record(self, result, latency_ns):
+        self.stats.add(result, latency_ns)
+        self.completed += 1
+        if self.completed % 100 == 0:
+            print(f"\r[*] Выполнено запросов: {self.completed}", end="", flush=True)
+
+    def _schedule(self, stream):
+        # Запланированный момент отправки для каждого запроса (perf_counter_ns)
+        if self.load != "open":
+            for payload in stream:
+                yield payload, None
+            return
+        interval = 1e9 / self.rate
+        start = time.perf_counter_ns()
+        for idx, payload in enumerate(stream):
+            yield payload, start + int(idx * interval)
+
+    def _run_threaded(self, stream):
+        window = config.SUBMIT_WINDOW or config.CONCURRENT_REQUESTS * 4
+        if self.load == "open":
+            # Очередь с запасом: опоздавшие запросы ждут исполнителя, а не расписание
+            window = max(window, int(self.rate * config.REQUEST_TIMEOUT))
+
+        # Движок raw отправляет через свой пул сокетов, остальные - через requests
+        raw_engine = None
+        send_payload = self.tester.send_payload
+        if self.tester.engine == "raw":
+            from raw_engine import RawEngine
+            raw_engine = RawEngine(self.tester)
+            send_payload = raw_engine.send_payload
+
+        def send(payload, scheduled):
+            result = send_payload(payload)
+            return result, self._latency(result, scheduled)
+
+        pending = set()
+        with ThreadPoolExecutor(max_workers=config.CONCURRENT_REQUESTS) as executor:
+            for payload, scheduled in self._schedule(stream):
+                if scheduled is not None:
+                    delay = (scheduled - time.perf_counter_ns()) / 1e9
+                    if delay > 0:
+                        time.sleep(delay)
+                pending.add(executor.submit(send, payload, scheduled))
+
+                done = {f for f in pending if f.done()}
+                if len(pending) >= window:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.discard(future)
+                    self._record(*future.result())
+
+            for future in pending:
+                self._record(*future.result())
+        if raw_engine is not None:
+            raw_engine.close()
+
+    async def _run_async(self, stream):
+        from async_engine import AsyncEngine, AsyncHTTPClient
+
+        engine = AsyncEngine(self.tester)
+        engine.client = AsyncHTTPClient(self.tester.target_url)
+        semaphore = asyncio.Semaphore(engine.concurrency)
+
+        async def send(payload, scheduled):
+            async with semaphore:
+                result = await engine.send_payload(payload)
+            self._record(result, self._latency(result, scheduled))
+
+        tasks = set()
+        try:
+            for payload, scheduled in self._schedule(stream):
+                if scheduled is not None:
+                    delay = (scheduled - time.perf_counter_ns()) / 1e9
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                elif len(tasks) >= engine.concurrency:
+                    # Замкнутый цикл: новый запрос только на место завершённого;
+                    # завершённые задачи удаляет из tasks их done-callback
+                    await asyncio.wait(set(tasks), return_when=asyncio.FIRST_COMPLETED)
+                task = asyncio.ensure_future(send(payload, scheduled))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            engine.client.close()
+
+    def run(self, payloads=None):
+        """
+        Запустить бенчмарк
+
+        Args:
+            payloads (Iterable[Dict]): Набор атак (по умолчанию - load_corpus())
+
+        Returns:
+            Dict: Итоги из BenchmarkStats.summary
+        """
+        attacks = repeat_payloads(load_corpus() if payloads is None else payloads, self.requests)
+        stream = interleave(attacks, control_payloads(), self.control_ratio)
+
+        rate = f"{self.rate} запр/сек" if self.rate else "без ограничения"
+        print(f"\n[*] Бенчмарк: нагрузка {self.load}, {rate}, "
+              f"контрольных запросов на атаку: {self.control_ratio}")
+
+        start = time.perf_counter()
+        if self.tester.engine == "asyncio":
+            asyncio.run(self._run_async(stream))
+        else:
+            self._run_threaded(stream)
+        elapsed = time.perf_counter() - start
+        self.tester.http_pool.close()
+
+        print(f"\n[✓] Бенчмарк завершён: {self.completed} запросов за {elapsed:.2f} сек")
+        return self.stats.summary(elapsed, self.rate)
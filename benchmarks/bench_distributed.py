@@ -0,0 +1,85 @@
+# benchmarks/bench_distributed.py
+"""
+Масштабирование распределённой отправки по числу рабочих процессов
+
+Заглушка WAF запускается отдельным процессом, чтобы не делить GIL с координатором.
+
+Запуск: python benchmarks/bench_distributed.py --count 20000 --workers 1,2,4
+"""
+
+import argparse
+import contextlib
+import io
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import config
+from bench_engines import build_corpus
+from waf_tester import WAFTester
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stub(port, delay):
+    process = subprocess.Popen(
+        [sys.executable, str(ROOT / "stub_server.py"), "--port", str(port), "--delay", str(delay)],
+        stdout=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Заглушка WAF не запустилась")
+
+
+def run(url, corpus, workers, engine):
+    config.DISTRIBUTED_WORKERS = workers
+    with contextlib.redirect_stdout(io.StringIO()):
+        tester = WAFTester(url, "/dev/null", engine=engine, keep_results=False)
+        start = time.perf_counter()
+        tester.send_all_payloads(corpus)
+        elapsed = time.perf_counter() - start
+    stats = tester.get_statistics()
+    return elapsed, stats["total_sent"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Масштабирование по числу рабочих")
+    parser.add_argument("--count", type=int, default=20000, help="Число запросов")
+    parser.add_argument("--workers", default="1,2,4", help="Число рабочих через запятую")
+    parser.add_argument("--engine", choices=["threads", "asyncio"], default="threads")
+    parser.add_argument("--delay", type=float, default=0.01, help="Задержка заглушки (сек)")
+    args = parser.parse_args()
+
+    port = free_port()
+    stub = start_stub(port, args.delay)
+    url = f"http://127.0.0.1:{port}"
+    corpus = build_corpus(args.count)
+    try:
+        print(f"{'рабочих':>8} {'время, с':>10} {'запр/сек':>10} {'ускорение':>10}")
+        base = None
+        for workers in [int(w) for w in args.workers.split(",")]:
+            elapsed, sent = run(url, corpus, workers, args.engine)
+            rps = sent / elapsed if elapsed else 0
+            base = base or rps
+            print(f"{workers:>8} {elapsed:>10.2f} {rps:>10.0f} {rps / base:>9.2f}x")
+    finally:
+        stub.kill()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# benchmarks/bench_engines.py
+"""
+Сравнение движков отправки (threads / asyncio) на локальной заглушке WAF
+
+Запуск: python benchmarks/bench_engines.py --count 5000 --delay 0.02
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config
+from payloads import get_all_payloads
+from stub_server import StubServer
+from waf_tester import WAFTester
+
+
+def build_corpus(count):
+    """
+    Размножить базовый набор payload до нужного количества
+
+    Args:
+        count (int): Требуемое число запросов
+
+    Returns:
+        List[Dict]: Список payload с уникальными id
+    """
+    base = get_all_payloads()
+    corpus = []
+    for idx in range(count):
+        payload = dict(base[idx % len(base)])
+        payload["id"] = f"{payload['id']}_{idx}"
+        corpus.append(payload)
+    return corpus
+
+
+def run_engine(engine, url, corpus):
+    with contextlib.redirect_stdout(io.StringIO()):
+        tester = WAFTester(url, "/dev/null", engine=engine)
+        start = time.perf_counter()
+        tester.send_all_payloads(corpus)
+        elapsed = time.perf_counter() - start
+
+    stats = tester.get_statistics()
+    errors = sum(1 for r in tester.test_results if not isinstance(r.status_code, int))
+    return {
+        "engine": engine,
+        "elapsed": elapsed,
+        "rps": len(corpus) / elapsed if elapsed else 0,
+        "blocked": stats["total_blocked"],
+        "errors": errors,
+        "connections": stats["connection_stats"]["connections_opened"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк движков отправки")
+    parser.add_argument("--count", type=int, default=2000, help="число запросов")
+    parser.add_argument("--delay", type=float, default=0.02,
+                        help="задержка ответа заглушки в секундах")
+    parser.add_argument("--threads", type=int, default=config.CONCURRENT_REQUESTS,
+                        help="потоков в thread-pool движке")
+    parser.add_argument("--concurrency", type=int, default=config.ASYNC_CONCURRENCY,
+                        help="одновременных запросов в asyncio движке")
+    args = parser.parse_args()
+
+    config.CONCURRENT_REQUESTS = args.threads
+    config.ASYNC_CONCURRENCY = args.concurrency
+
+    server = StubServer(delay=args.delay).start()
+    corpus = build_corpus(args.count)
+    print(f"[*] Заглушка: {server.url}, задержка {args.delay * 1000:.0f} мс, "
+          f"запросов: {len(corpus)}")
+
+    try:
+        rows = [run_engine(engine, server.url, corpus) for engine in ("threads", "asyncio")]
+    finally:
+        server.stop()
+
+    print(f"\n{'Движок':<10}{'Время, с':>10}{'Запр/с':>10}{'Блок.':>8}{'Ошибки':>8}{'Соед.':>8}")
+    for row in rows:
+        print(f"{row['engine']:<10}{row['elapsed']:>10.2f}{row['rps']:>10.0f}"
+              f"{row['blocked']:>8}{row['errors']:>8}{row['connections']:>8}")
+
+
+if __name__ == "__main__":
+    main()
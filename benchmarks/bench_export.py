@@ -0,0 +1,106 @@
+# benchmarks/bench_export.py
+"""
+Сохранение результатов большого прогона: JSON отчёт целиком против потоковой выгрузки
+
+Полный отчёт держит в памяти все результаты и пишет один документ с
+отступами; потоковая выгрузка пишет строку на результат и небольшую сводку.
+
+Запуск: python benchmarks/bench_export.py --count 1000000 --formats jsonl,csv
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config
+from payloads import get_all_payloads
+from report import open_exporters, save_report_json, save_summary_json
+from stats import StatsAggregator
+from waf_tester import TestResult
+
+
+def make_results(count, base):
+    for idx in range(count):
+        p = base[idx % len(base)]
+        result = TestResult(f"{p['id']}_{idx}", p["attack_type"], p["payload"],
+                            p["endpoint"], p["parameter"])
+        result.status_code = 403 if idx % 3 else 200
+        result.was_blocked = result.status_code == 403
+        result.blocked_by_rules = ("942100",) if result.was_blocked else ()
+        result.response_time = 0.0123
+        result.connect_time = 0.0004
+        result.sent_ts = time.time()
+        result.timings = (30000, 90000, None, 8400000, 150000, 8700000)
+        yield result
+
+
+def run_full(count, base, directory):
+    results = []
+    aggregator = StatsAggregator(max_missed=None)
+    for result in make_results(count, base):
+        results.append(result)
+        aggregator.add(result)
+    save_report_json(aggregator.snapshot(), str(Path(directory) / "full.json"))
+    return [Path(directory) / "full.json"]
+
+
+def run_streaming(count, base, directory, formats):
+    aggregator = StatsAggregator(max_missed=config.MAX_MISSED_IN_MEMORY)
+    exporters = open_exporters(str(Path(directory) / "results"), formats)
+    sinks = [aggregator] + exporters
+    for result in make_results(count, base):
+        for sink in sinks:
+            sink.add(result)
+    for exporter in exporters:
+        exporter.close()
+    stats = aggregator.snapshot()
+    stats["exports"] = [exporter.filename for exporter in exporters]
+    save_summary_json(stats, str(Path(directory) / "summary.json"))
+    return [Path(name) for name in stats["exports"]] + [Path(directory) / "summary.json"]
+
+
+def measure(run, *args):
+    # Время и пик памяти замеряются отдельными прогонами: tracemalloc замедляет выделения
+    with contextlib.redirect_stdout(io.StringIO()):
+        gc.collect()
+        start = time.perf_counter()
+        files = run(*args)
+        elapsed = time.perf_counter() - start
+        size = sum(path.stat().st_size for path in files)
+        gc.collect()
+        tracemalloc.start()
+        run(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, peak, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сохранение результатов большого прогона")
+    parser.add_argument("--count", type=int, default=200000, help="Число результатов")
+    parser.add_argument("--formats", default="jsonl,csv", help="Форматы потоковой выгрузки")
+    args = parser.parse_args()
+
+    base = get_all_payloads()
+    formats = [kind.strip() for kind in args.formats.split(",") if kind.strip()]
+    print(f"[*] Результатов: {args.count}")
+    print(f"{'способ':<22} {'время, с':>9} {'пик, МБ':>9} {'файлы, МБ':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        rows = [("json целиком", run_full, (args.count, base, directory))]
+        for kind in formats:
+            rows.append((f"поток {kind}", run_streaming, (args.count, base, directory, [kind])))
+        for name, run, run_args in rows:
+            elapsed, peak, size = measure(run, *run_args)
+            print(f"{name:<22} {elapsed:>9.2f} {peak / 2**20:>9.1f} {size / 2**20:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/bench_log_parse.py
+"""
+Бенчмарк разбора аудит-лога: полный json.loads против предфильтра и orjson
+
+Генерирует синтетический лог (по умолчанию 1M строк), в котором лишь малая
+доля записей относится к текущему запуску, и замеряет время разбора.
+
+Запуск: python benchmarks/bench_log_parse.py --lines 1000000 --share 0.01
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import audit_log
+import config
+from audit_log import LinePrefilter, iter_entries, iter_lines
+
+RUN_ID = "0123456789ab"
+
+
+def generate_log(path, lines, share):
+    """
+    Сгенерировать синтетический аудит-лог
+
+    Args:
+        path (str): Путь к файлу
+        lines (int): Число строк
+        share (float): Доля строк текущего запуска
+    """
+    every = max(int(1 / share), 1) if share else 0
+    with open(path, "w", encoding="utf-8") as f:
+        for idx in range(lines):
+            ours = every and idx % every == 0
+            marker = f"{RUN_ID}-sql_{idx:07d}" if ours else f"ffffffffffff-req_{idx:07d}"
+            entry = {
+                "transaction": {
+                    "client_ip": f"10.0.{idx % 250}.{idx % 200}",
+                    "timestamp": "2026-10-17T10:00:00+00:00",
+                    "request": {
+                        "method": "GET",
+                        "uri": f"/api/data?id=%27+OR+%271%27%3D%27{idx}",
+                        "headers": {"Host": "target", "User-Agent": "bench",
+                                    "X-WAF-Test-Id": marker},
+                    },
+                    "response": {"http_code": 403},
+                    "messages": [{"message": "SQL Injection Attack",
+                                  "details": {"ruleId": "942100", "severity": "2"}}],
+                }
+            }
+            f.write(json.dumps(entry) + "\n")
+
+
+def measure(name, path, prefilter, backend):
+    config.LOG_JSON_BACKEND = backend
+    start = time.perf_counter()
+    count = sum(1 for _ in iter_entries(iter_lines(path), prefilter))
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28}{elapsed:>10.2f}{count:>12}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк разбора аудит-лога")
+    parser.add_argument("--lines", type=int, default=1_000_000, help="число строк лога")
+    parser.add_argument("--share", type=float, default=0.01,
+                        help="доля записей текущего запуска")
+    parser.add_argument("--log", help="использовать готовый файл вместо генерации")
+    args = parser.parse_args()
+
+    path = args.log
+    tmp_dir = None
+    if path is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmp_dir.name, "modsec_audit.log")
+        print(f"[*] Генерация {args.lines} строк...")
+        generate_log(path, args.lines, args.share)
+    print(f"[*] Лог: {path} ({os.path.getsize(path) / 1e6:.0f} МБ)\n")
+
+    marker = LinePrefilter(run_id=RUN_ID, mode="marker")
+    print(f"{'Режим':<28}{'Время, с':>10}{'Записей':>12}")
+    baseline = measure("json, без фильтра", path, None, "json")
+    measure("json + предфильтр", path, marker, "json")
+    if audit_log.orjson is not None:
+        measure("orjson, без фильтра", path, None, "orjson")
+        fastest = measure("orjson + предфильтр", path, marker, "orjson")
+        print(f"\n[✓] Ускорение: x{baseline / fastest:.1f}")
+    else:
+        print("\n[!] orjson не установлен - быстрый декодер не измерен")
+
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
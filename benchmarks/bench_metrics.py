@@ -0,0 +1,106 @@
+# benchmarks/bench_metrics.py
+"""
+Стоимость метрик на результат: наборы счётчиков по потокам против общей блокировки
+
+Потоки-отправители учитывают результаты, пока отдельный поток непрерывно
+запрашивает метрики, как Prometheus с очень малым интервалом.
+
+Запуск: python benchmarks/bench_metrics.py --count 200000 --threads 4
+"""
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from metrics import RunMetrics
+from payloads import get_all_payloads
+from waf_tester import TestResult
+
+
+class LockedMetrics(RunMetrics):
+    """Для сравнения: один набор счётчиков под общей блокировкой"""
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+
+    def observe(self, result):
+        with self._lock:
+            super().observe(result)
+
+    def add(self, result):
+        with self._lock:
+            super().add(result)
+
+    def render(self, openmetrics=False):
+        with self._lock:
+            return super().render(openmetrics)
+
+
+def make_results(count, base):
+    results = []
+    for idx in range(count):
+        p = base[idx % len(base)]
+        result = TestResult(f"{p['id']}_{idx}", p["attack_type"], p["payload"], p["endpoint"])
+        result.status_code = 403 if idx % 3 else 200
+        result.was_blocked = result.status_code == 403
+        result.blocked_by_rules = ("942100",) if result.was_blocked else ()
+        result.timings = (None, None, None, 8400000, 150000, (idx % 500) * 100000)
+        results.append(result)
+    return results
+
+
+def measure(metrics, results, threads, scrape):
+    stop = threading.Event()
+    scrapes = 0
+
+    def scraper():
+        nonlocal scrapes
+        while not stop.is_set():
+            metrics.render()
+            scrapes += 1
+
+    def feed(part):
+        for result in part:
+            metrics.observe(result)
+            metrics.add(result)
+
+    parts = [results[idx::threads] for idx in range(threads)]
+    workers = [threading.Thread(target=feed, args=(part,)) for part in parts]
+    scrape_thread = threading.Thread(target=scraper) if scrape else None
+    if scrape_thread:
+        scrape_thread.start()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    if scrape_thread:
+        scrape_thread.join()
+    return elapsed / len(results) * 1e9, scrapes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Стоимость метрик на результат")
+    parser.add_argument("--count", type=int, default=200000, help="Число результатов")
+    parser.add_argument("--threads", type=int, default=4, help="Потоков-отправителей")
+    args = parser.parse_args()
+
+    results = make_results(args.count, get_all_payloads())
+    print(f"[*] Результатов: {args.count}, потоков: {args.threads}")
+    print(f"{'вариант':<24} {'нс/результат':>13} {'запросов метрик':>16}")
+    for name, cls in (("по потокам", RunMetrics), ("общая блокировка", LockedMetrics)):
+        for scrape in (False, True):
+            cost, scrapes = measure(cls(), results, args.threads, scrape)
+            label = f"{name}{' + scrape' if scrape else ''}"
+            print(f"{label:<24} {cost:>13.0f} {scrapes:>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/bench_mutations.py
+"""
+Скорость генерации вариантов payload движком мутаций
+
+Варианты только создаются и проходят фильтр повторов, в память не собираются.
+
+Запуск: python benchmarks/bench_mutations.py --bases 2000 --depth 2
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config
+from mutations import MutatedCorpus
+from payloads import get_all_payloads
+
+
+def build_bases(count):
+    # Уникальные исходные payload на основе встроенного набора
+    base = get_all_payloads()
+    return [
+        dict(base[idx % len(base)], id=f"bench_{idx}",
+             payload=f"{base[idx % len(base)]['payload']} {idx}")
+        for idx in range(count)
+    ]
+
+
+def measure(bases, depth, dedup):
+    config.MUTATION_DEDUP = dedup
+    corpus = MutatedCorpus(bases, depth=depth)
+    start = time.perf_counter()
+    for _ in corpus:
+        pass
+    elapsed = time.perf_counter() - start
+
+    # Память - отдельным проходом, tracemalloc сильно замедляет генерацию
+    tracemalloc.start()
+    for _ in corpus:
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return corpus, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Скорость генерации вариантов payload")
+    parser.add_argument("--bases", type=int, default=2000, help="Число исходных payload")
+    parser.add_argument("--depth", type=int, default=2, help="Длина цепочки преобразований")
+    args = parser.parse_args()
+
+    bases = build_bases(args.bases)
+    config.MUTATION_BLOOM_CAPACITY = len(bases) * MutatedCorpus(bases, depth=args.depth).chains_per_payload()
+    print(f"[*] Исходных payload: {len(bases)}, глубина {args.depth}, "
+          f"вариантов до фильтра: {config.MUTATION_BLOOM_CAPACITY}")
+    print(f"{'фильтр':<8} {'уникальных':>11} {'повторов':>9} {'сек':>7} {'млн/мин':>8} {'пик, МБ':>8}")
+    for dedup in (None, "set", "bloom"):
+        corpus, elapsed, peak = measure(bases, args.depth, dedup)
+        total = corpus.produced + corpus.duplicates
+        print(f"{dedup or '-':<8} {corpus.produced:>11} {corpus.duplicates:>9} {elapsed:>7.2f} "
+              f"{total / elapsed * 60 / 1e6:>8.2f} {peak / 2**20:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
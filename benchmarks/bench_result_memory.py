@@ -0,0 +1,99 @@
+# benchmarks/bench_result_memory.py
+"""
+Память на хранение результатов: объекты со словарём, __slots__ и колоночная таблица
+
+Запуск: python benchmarks/bench_result_memory.py --count 1000000
+"""
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from payloads import get_all_payloads
+from result_table import ResultTable
+from waf_tester import TestResult
+
+
+class DictTestResult:
+    """Прежнее представление результата: __dict__, datetime и список правил"""
+
+    def __init__(self, request_id, attack_type, payload, endpoint, parameter=None):
+        self.request_id = request_id
+        self.attack_type = attack_type
+        self.payload = payload
+        self.endpoint = endpoint
+        self.parameter = parameter
+        self.correlation_id = None
+        self.was_blocked = False
+        self.log_matched = False
+        self.blocked_by_rules = []
+        self.status_code = None
+        self.response_time = 0
+        self.connect_time = 0
+        self.sent_time = None
+
+
+def make_results(cls, count, base):
+    # Строки собираются заново для каждого результата, как при чтении набора из файла
+    for idx in range(count):
+        p = base[idx % len(base)]
+        fields = ["".join(p[k]) for k in ("attack_type", "endpoint", "parameter")]
+        if cls is not DictTestResult:
+            # Как в WAFTester.new_result
+            fields = [sys.intern(f) for f in fields]
+        attack_type, endpoint, parameter = fields
+        result = cls(f"{p['id']}_{idx}", attack_type, "".join(p["payload"]), endpoint, parameter)
+        result.status_code = 403 if idx % 3 else 200
+        result.was_blocked = result.status_code == 403
+        result.response_time = 0.0123
+        result.connect_time = 0.0004
+        if cls is DictTestResult:
+            result.sent_time = datetime.now()
+            if result.was_blocked:
+                result.blocked_by_rules.append("942100")
+        else:
+            result.sent_ts = time.time()
+            if result.was_blocked:
+                result.blocked_by_rules = ("942100",)
+        yield result
+
+
+def measure(name, count, base):
+    gc.collect()
+    tracemalloc.start()
+    if name == "dict":
+        store = list(make_results(DictTestResult, count, base))
+    elif name == "slots":
+        store = list(make_results(TestResult, count, base))
+    else:
+        store = ResultTable()
+        for result in make_results(TestResult, count, base):
+            store.append(result)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    return current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Память на хранение результатов")
+    parser.add_argument("--count", type=int, default=200000, help="Число результатов")
+    args = parser.parse_args()
+
+    base = get_all_payloads()
+    print(f"[*] Результатов: {args.count}")
+    print(f"{'хранилище':<10} {'память, МБ':>12} {'пик, МБ':>10} {'байт/результат':>16}")
+    for name in ("dict", "slots", "table"):
+        current, peak = measure(name, args.count, base)
+        print(f"{name:<10} {current / 2**20:>12.1f} {peak / 2**20:>10.1f} "
+              f"{current / args.count:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/bench_search.py
+"""
+Адаптивный поиск обходов против полного перебора мутаций на локальной заглушке WAF
+
+Полный перебор отправляет все варианты и даёт эталонный набор payload,
+для которых существует обход; поиск должен найти их за меньшее число запросов.
+
+Запуск: python benchmarks/bench_search.py --depth 2
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config
+from bypass_search import BypassSearch
+from mutations import MutatedCorpus
+from payloads import get_all_payloads
+from stub_server import StubServer
+from waf_tester import WAFTester
+
+
+def bypassed_bases(results):
+    # id исходного payload до "~" у вариантов, которые не были заблокированы
+    return {r.request_id.split("~")[0] for r in results
+            if isinstance(r.status_code, int) and not r.was_blocked}
+
+
+def run_full(url, bases):
+    with contextlib.redirect_stdout(io.StringIO()):
+        tester = WAFTester(url, "", engine="asyncio")
+        start = time.perf_counter()
+        tester.send_all_payloads(MutatedCorpus(bases))
+        elapsed = time.perf_counter() - start
+    return tester.get_statistics()["total_sent"], bypassed_bases(tester.test_results), elapsed
+
+
+def run_search(url, bases):
+    with contextlib.redirect_stdout(io.StringIO()):
+        tester = WAFTester(url, "", engine="asyncio")
+        search = BypassSearch(bases)
+        start = time.perf_counter()
+        search.run(tester)
+        elapsed = time.perf_counter() - start
+    tester.finalize_results()
+    return search, bypassed_bases(tester.test_results), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Адаптивный поиск против полного перебора")
+    parser.add_argument("--depth", type=int, default=2, help="Длина цепочки преобразований")
+    parser.add_argument("--transforms", help="Преобразования через запятую (по умолчанию все)")
+    parser.add_argument("--seed", type=int, default=1, help="Зерно случайного выбора")
+    args = parser.parse_args()
+
+    config.MUTATION_DEPTH = args.depth
+    config.MUTATION_TRANSFORMS = args.transforms.split(",") if args.transforms else None
+    config.SEARCH_SEED = args.seed
+    config.ASYNC_CONCURRENCY = 100
+    bases = list(get_all_payloads())
+
+    server = StubServer().start()
+    try:
+        full_requests, full_found, full_time = run_full(server.url, bases)
+        search, found, search_time = run_search(server.url, bases)
+    finally:
+        server.stop()
+
+    summary = search.as_dict()
+    print(f"[*] Исходных payload: {len(bases)}, глубина {args.depth}")
+    print(f"{'режим':<10} {'запросов':>9} {'обходы для':>11} {'сек':>7}")
+    print(f"{'перебор':<10} {full_requests:>9} {len(full_found):>11} {full_time:>7.2f}")
+    print(f"{'поиск':<10} {summary['requests']:>9} {len(found):>11} {search_time:>7.2f}")
+    print(f"[*] Раундов: {summary['rounds']}, остановка: {summary['stop_reason']}, "
+          f"экономия запросов: x{full_requests / summary['requests']:.1f}, "
+          f"найдено {len(found & full_found)}/{len(full_found)} payload с обходом")
+
+
+if __name__ == "__main__":
+    main()
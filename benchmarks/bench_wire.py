@@ -0,0 +1,117 @@
+# benchmarks/bench_wire.py
+"""
+Процессорное время клиента на запрос: requests против скомпилированных запросов
+
+Заглушка WAF запускается отдельным процессом, поэтому в замер попадает
+только работа клиента. Дополнительно сравнивается подготовка запроса:
+requests.PreparedRequest против вставки маркера в готовый шаблон.
+
+Запуск: python benchmarks/bench_wire.py --count 5000
+"""
+
+import argparse
+import contextlib
+import io
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import requests
+
+import config
+from payloads import get_all_payloads
+from waf_tester import WAFTester
+from wire_request import RequestCompiler
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def build_corpus(count):
+    base = get_all_payloads()
+    return [dict(base[idx % len(base)], id=f"wire_{idx}") for idx in range(count)]
+
+
+def cpu_per_request(engine, url, corpus):
+    with contextlib.redirect_stdout(io.StringIO()):
+        tester = WAFTester(url, "", engine=engine)
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        tester.send_all_payloads(corpus)
+        cpu = time.process_time() - cpu
+        wall = time.perf_counter() - wall
+    stats = tester.get_statistics()
+    return cpu / len(corpus) * 1e6, len(corpus) / wall, stats["total_blocked"]
+
+
+def prepare_cost(url, corpus):
+    # Только подготовка байтов запроса, без сети
+    session = requests.Session()
+    start = time.process_time()
+    for payload in corpus:
+        request = requests.Request("GET", url + payload["endpoint"],
+                                   params={payload["parameter"]: payload["payload"]},
+                                   headers={config.CORRELATION_HEADER: payload["id"]})
+        session.prepare_request(request)
+    prepared = (time.process_time() - start) / len(corpus) * 1e6
+
+    compiler = RequestCompiler(url)
+    templates = [compiler.compile(payload) for payload in corpus]
+    start = time.process_time()
+    for payload, template in zip(corpus, templates):
+        template.buffers(payload["id"])
+    rendered = (time.process_time() - start) / len(corpus) * 1e6
+    return prepared, rendered
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Процессорное время клиента на запрос")
+    parser.add_argument("--count", type=int, default=5000, help="Запросов на движок")
+    parser.add_argument("--threads", type=int, default=config.CONCURRENT_REQUESTS,
+                        help="Потоков для threads и raw")
+    args = parser.parse_args()
+
+    config.CONCURRENT_REQUESTS = args.threads
+    config.ASYNC_CONCURRENCY = args.threads * 4
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, str(ROOT / "stub_server.py"), "--port", str(port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                break
+            except OSError:
+                time.sleep(0.05)
+
+        corpus = build_corpus(args.count)
+        print(f"[*] Запросов на движок: {len(corpus)}, заглушка в отдельном процессе")
+        print(f"{'движок':<10} {'CPU, мкс/запр':>14} {'запр/с':>8} {'блок.':>7}")
+        rows = {}
+        for engine in ("threads", "asyncio", "raw"):
+            cpu, rps, blocked = cpu_per_request(engine, url, corpus)
+            rows[engine] = cpu
+            print(f"{engine:<10} {cpu:>14.1f} {rps:>8.0f} {blocked:>7}")
+        print(f"[*] raw быстрее threads по CPU в {rows['threads'] / rows['raw']:.1f} раза")
+    finally:
+        server.terminate()
+        server.wait()
+
+    prepared, rendered = prepare_cost(url, corpus)
+    print(f"[*] Подготовка запроса: requests {prepared:.1f} мкс, шаблон {rendered:.2f} мкс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# block_detector.py
+"""
+Определение блокировки по ответу сервера без аудит-лога
+"""
+
+import importlib
+import re
+
+import config
+
+# Разделители id правил в заголовке ("942100, 941100" или "942100 941100")
+_RULE_ID_SEPARATOR = re.compile(r"[,;\s]+")
+
+
+def compile_signatures(signatures, ignore_case=True):
+    """
+    Собрать сигнатуры тела ответа в одно регулярное выражение
+
+    Строки ищутся как есть, строки с префиксом "re:" - как регулярные
+    выражения. Все сигнатуры проверяются за один проход по началу тела.
+
+    Args:
+        signatures (List[str]): Сигнатуры страницы блокировки
+        ignore_case (bool): Без учёта регистра
+
+    Returns:
+        re.Pattern: Выражение над bytes или None, если сигнатур нет
+    """
+    parts = []
+    # Длинные строки первыми, чтобы совпадение не обрывалось на префиксе
+    for signature in sorted(signatures, key=len, reverse=True):
+        if signature.startswith("re:"):
+            parts.append(f"(?:{signature[3:]})")
+        elif signature:
+            parts.append(re.escape(signature))
+    if not parts:
+        return None
+    flags = re.IGNORECASE if ignore_case else 0
+    return re.compile("|".join(parts).encode("utf-8"), flags)
+
+
+class BlockDetector:
+    """Вердикт по статусу, заголовкам и началу тела ответа
+
+    Запрос считается заблокированным, если выполнено любое условие:
+    статус из набора, заголовок-маркер или сигнатура страницы блокировки
+    в первых body_bytes байтах тела. Id правил берутся из заголовка и
+    из тела ответа и дополняются данными аудит-лога, если он доступен.
+    """
+
+    def __init__(self, status_codes=None, header_markers=None, body_signatures=None,
+                 body_bytes=None, rule_id_header=None, rule_id_pattern=None):
+        """
+        Инициализация детектора
+
+        Args:
+            status_codes (Iterable[int]): Статусы блокировки (по умолчанию BLOCK_STATUS_CODES)
+            header_markers (Dict[str, str]): Заголовок -> регулярное выражение значения
+                                             (None - достаточно наличия заголовка)
+            body_signatures (List[str]): Сигнатуры страницы блокировки
+            body_bytes (int): Сколько байт тела проверять
+            rule_id_header (str): Заголовок с id сработавших правил
+            rule_id_pattern (str): Выражение с группой id правила в теле ответа
+        """
+        if status_codes is None:
+            status_codes = config.BLOCK_STATUS_CODES
+        if header_markers is None:
+            header_markers = config.BLOCK_HEADER_MARKERS
+        if body_signatures is None:
+            body_signatures = config.BLOCK_BODY_SIGNATURES
+        if rule_id_header is None:
+            rule_id_header = config.BLOCK_RULE_ID_HEADER
+        if rule_id_pattern is None:
+            rule_id_pattern = config.BLOCK_RULE_ID_PATTERN
+
+        self.status_codes = frozenset(status_codes)
+        self.header_markers = [
+            (name.lower(), re.compile(pattern) if pattern else None)
+            for name, pattern in header_markers.items()
+        ]
+        self.rule_id_header = rule_id_header.lower() if rule_id_header else None
+        self.body_pattern = compile_signatures(body_signatures, config.BLOCK_BODY_IGNORE_CASE)
+        self.rule_id_pattern = re.compile(rule_id_pattern.encode("utf-8")) if rule_id_pattern else None
+
+        # Тело читается, только если по нему что-то проверяется
+        needs_body = self.body_pattern is not None or self.rule_id_pattern is not None
+        self.body_bytes = (config.BLOCK_BODY_BYTES if body_bytes is None else body_bytes) if needs_body else 0
+
+    def detect(self, status_code, headers=None, body=b""):
+        """
+        Определить, заблокирован ли запрос
+
+        Args:
+            status_code (int): HTTP статус ответа
+            headers (Mapping): Заголовки ответа (поиск по имени в нижнем регистре)
+            body (bytes): Начало тела ответа (не более body_bytes байт)
+
+        Returns:
+            Tuple[bool, Tuple[str]]: Вердикт и id сработавших правил
+        """
+        blocked = status_code in self.status_codes
+        rule_ids = ()
+        if headers:
+            for name, pattern in self.header_markers:
+                value = headers.get(name)
+                if value is not None and (pattern is None or pattern.search(value)):
+                    blocked = True
+                    break
+            if self.rule_id_header:
+                value = headers.get(self.rule_id_header)
+                if value:
+                    rule_ids = tuple(r for r in _RULE_ID_SEPARATOR.split(value) if r)
+
+        if body:
+            if not blocked and self.body_pattern is not None:
+                blocked = self.body_pattern.search(body) is not None
+            if self.rule_id_pattern is not None:
+                found = [m.group(1).decode("utf-8", errors="replace")
+                         for m in self.rule_id_pattern.finditer(body)]
+                if found:
+                    rule_ids = tuple(dict.fromkeys(rule_ids + tuple(found)))
+        return blocked, rule_ids
+
+
+def load_block_detector():
+    """
+    Создать детектор блокировок по BLOCK_DETECTOR
+
+    Returns:
+        BlockDetector: Встроенный детектор или класс из BLOCK_DETECTOR
+                       ("module.Class") с атрибутом body_bytes и методом detect()
+    """
+    if not config.BLOCK_DETECTOR:
+        return BlockDetector()
+    module_name, _, class_name = config.BLOCK_DETECTOR.replace(":", ".").rpartition(".")
+    if not module_name:
+        raise ValueError(f"BLOCK_DETECTOR должен иметь вид module.Class: {config.BLOCK_DETECTOR}")
+    return getattr(importlib.import_module(module_name), class_name)()
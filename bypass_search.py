@@ -0,0 +1,279 @@
+# bypass_search.py
+"""
+Адаптивный поиск обходов WAF: отбор цепочек преобразований по результатам запросов
+"""
+
+import heapq
+import random
+
+import config
+from mutations import (ORIGINAL, TRANSFORMS, transform_chains, apply_chain, make_variant,
+                       new_dedup_filter, dedup_key)
+from payloads import load_corpus
+
+
+class _Target:
+    """Исходный payload и ещё не опробованные для него цепочки"""
+
+    __slots__ = ("payload", "untried", "bypasses", "done")
+
+    def __init__(self, payload, chains):
+        self.payload = payload
+        self.untried = list(chains)
+        self.bypasses = []
+        self.done = False
+
+
+class BypassSearch:
+    """Поиск обходов раундами с выбором цепочек по сэмплированию Томпсона
+
+    Каждая цепочка преобразований - "рука" бандита отдельно для каждого
+    типа атаки. Награда варианта - 1 за обход, часть SEARCH_RULE_REWARD
+    за блокировку малым числом правил и 0 за остальные блокировки. Оценка
+    цепочки начинается со средней награды её преобразований, поэтому
+    удачное семейство (например, double_url) сразу поднимает все цепочки
+    с ним. Payload перестаёт мутироваться, когда для него найдено
+    SEARCH_BYPASSES_PER_PAYLOAD обходов; цепочки без обходов после
+    SEARCH_PRUNE_AFTER попыток исключаются для типа атаки.
+    """
+
+    def __init__(self, payloads=None, transforms=None, depth=None):
+        """
+        Инициализация поиска
+
+        Args:
+            payloads (Iterable[Dict]): Исходные payload (по умолчанию набор без мутаций)
+            transforms (List[str]): Преобразования (по умолчанию MUTATION_TRANSFORMS или все)
+            depth (int): Максимальная длина цепочки (по умолчанию MUTATION_DEPTH)
+        """
+        names = transforms if transforms is not None else config.MUTATION_TRANSFORMS
+        names = list(names) if names else list(TRANSFORMS)
+        unknown = [name for name in names if name not in TRANSFORMS]
+        if unknown:
+            raise ValueError(f"Неизвестные преобразования: {', '.join(unknown)}")
+        self.chains = transform_chains(names, config.MUTATION_DEPTH if depth is None else depth)
+        self.payloads = load_corpus(mutate=False) if payloads is None else payloads
+        self.random = random.Random(config.SEARCH_SEED)
+
+        self.targets = []
+        # (тип атаки, цепочка) -> [попыток, сумма наград, обходов]
+        self.arms = {}
+        # (тип атаки, преобразование) -> [попыток, сумма наград]
+        self.families = {}
+        self._inflight = {}
+        self._observed = []
+        self.rounds = 0
+        self.requests = 0
+        self.bypasses = 0
+        self.errors = 0
+        self.duplicates = 0
+        self.stop_reason = None
+
+    def observe(self, result):
+        """
+        Запомнить результат варианта текущего раунда (наблюдатель WAFTester)
+
+        Args:
+            result (TestResult): Результат сразу после ответа сервера
+        """
+        entry = self._inflight.pop(result.request_id, None)
+        if entry is not None:
+            self._observed.append((entry, result))
+
+    def _priors(self):
+        # Априорные параметры Beta для каждой пары (тип атаки, цепочка) на раунд
+        family_mean = {
+            key: (reward + 1) / (trials + 2) for key, (trials, reward) in self.families.items()
+        }
+        weight = config.SEARCH_FAMILY_WEIGHT
+        priors = {}
+        for attack_type in {t.payload["attack_type"] for t in self.targets if not t.done}:
+            for chain in self.chains:
+                trials, reward, bypasses = self.arms.get((attack_type, chain), (0, 0.0, 0))
+                if trials >= config.SEARCH_PRUNE_AFTER and not bypasses:
+                    continue
+                mean = sum(family_mean.get((attack_type, name), 0.5) for name in chain) / len(chain)
+                priors[(attack_type, chain)] = (1 + reward + weight * mean,
+                                                1 + trials - reward + weight * (1 - mean))
+        return priors
+
+    def _next_batch(self, seen, budget):
+        priors = self._priors()
+        betavariate = self.random.betavariate
+        batch = []
+        for target in self.targets:
+            if target.done:
+                continue
+            attack_type = target.payload["attack_type"]
+            scored = []
+            for chain in target.untried:
+                prior = priors.get((attack_type, chain))
+                if prior is not None:
+                    scored.append((betavariate(*prior), chain))
+            if not scored:
+                target.done = True
+                continue
+
+            picked = {chain for _, chain in heapq.nlargest(
+                config.SEARCH_ARMS_PER_ROUND, scored, key=lambda item: item[0])}
+            target.untried = [chain for chain in target.untried if chain not in picked]
+            payload = target.payload
+            for chain in picked:
+                value = apply_chain(payload["payload"], chain)
+                if seen is not None and not seen.add(dedup_key(payload, value)):
+                    self.duplicates += 1
+                    continue
+                variant = make_variant(payload, chain, value)
+                self._inflight[variant["id"]] = (target, chain)
+                batch.append(variant)
+            if budget and len(batch) >= budget:
+                for variant in batch[budget:]:
+                    del self._inflight[variant["id"]]
+                return batch[:budget]
+        return batch
+
+    def _learn(self):
+        new_bypasses = 0
+        for (target, chain), result in self._observed:
+            if not isinstance(result.status_code, int):
+                self.errors += 1
+                continue
+            bypassed = not result.was_blocked
+            if bypassed:
+                reward = 1.0
+            elif result.blocked_by_rules:
+                reward = config.SEARCH_RULE_REWARD / len(result.blocked_by_rules)
+            else:
+                reward = 0.0
+
+            if chain:
+                attack_type = target.payload["attack_type"]
+                arm = self.arms.setdefault((attack_type, chain), [0, 0.0, 0])
+                arm[0] += 1
+                arm[1] += reward
+                arm[2] += bypassed
+                for name in chain:
+                    family = self.families.setdefault((attack_type, name), [0, 0.0])
+                    family[0] += 1
+                    family[1] += reward
+
+            if bypassed:
+                new_bypasses += 1
+                target.bypasses.append(result.mutation)
+                self.bypasses += 1
+                limit = config.SEARCH_BYPASSES_PER_PAYLOAD
+                if limit and len(target.bypasses) >= limit:
+                    target.done = True
+        self._observed = []
+        return new_bypasses
+
+    def covered(self):
+        """
+        Число исходных payload с найденным обходом
+
+        Returns:
+            int: Payload, для которых хотя бы один вариант не заблокирован
+        """
+        return sum(1 for target in self.targets if target.bypasses)
+
+    def run(self, tester):
+        """
+        Выполнить поиск, отправляя раунды через движок тестера
+
+        Args:
+            tester (WAFTester): Тестер; результаты проходят его обычный путь
+                                (агрегатор, логи, файл результатов)
+        """
+        self.targets = [_Target(payload, self.chains) for payload in self.payloads]
+        seen = new_dedup_filter()
+        total = len(self.targets)
+        print(f"\n[*] Адаптивный поиск обходов: {total} payload, "
+              f"{len(self.chains)} цепочек на payload "
+              f"(полный перебор - {total * len(self.chains)} запросов)")
+
+        tester.result_observers.append(self.observe)
+        tester.begin_sending()
+        try:
+            # Нулевой раунд - исходные payload: обход без мутаций тоже обход.
+            # Бюджет запросов распространяется и на него
+            if config.MUTATION_INCLUDE_ORIGINAL:
+                batch = []
+                limit = config.SEARCH_MAX_REQUESTS or None
+                for target in self.targets[:limit]:
+                    payload = target.payload
+                    if seen is not None:
+                        seen.add(dedup_key(payload, payload["payload"]))
+                    variant = dict(payload, mutation=ORIGINAL)
+                    self._inflight[variant["id"]] = (target, ())
+                    batch.append(variant)
+                self._run_round(tester, batch)
+
+            idle_rounds = 0
+            while True:
+                if self.covered() >= config.SEARCH_TARGET_COVERAGE * total:
+                    self.stop_reason = "coverage"
+                    break
+                budget = 0
+                if config.SEARCH_MAX_REQUESTS:
+                    budget = config.SEARCH_MAX_REQUESTS - self.requests
+                    if budget <= 0:
+                        self.stop_reason = "budget"
+                        break
+                batch = self._next_batch(seen, budget)
+                if not batch:
+                    self.stop_reason = "exhausted"
+                    break
+                if self._run_round(tester, batch):
+                    idle_rounds = 0
+                else:
+                    idle_rounds += 1
+                    if config.SEARCH_PATIENCE and idle_rounds >= config.SEARCH_PATIENCE:
+                        self.stop_reason = "patience"
+                        break
+        finally:
+            tester.result_observers.remove(self.observe)
+            self._inflight.clear()
+            tester.end_sending()
+
+        print(f"[✓] Поиск завершён ({self.stop_reason}): {self.requests} запросов, "
+              f"обходы найдены для {self.covered()}/{total} payload")
+
+    def _run_round(self, tester, batch):
+        self.rounds += 1
+        self.requests += len(batch)
+        tester.dispatch(batch, len(batch))
+        # Блокировки без id правил в ответе ждут записей аудит-лога
+        if tester.log_followers:
+            tester.wait_for_log(config.SEARCH_LOG_WAIT)
+        new_bypasses = self._learn()
+        print(f"\n[*] Раунд {self.rounds}: {len(batch)} запросов, обходов {new_bypasses}, "
+              f"покрытие {self.covered()}/{len(self.targets)}")
+        return new_bypasses
+
+    def as_dict(self):
+        """
+        Сводка поиска для отчёта
+
+        Returns:
+            Dict: Раунды, запросы, покрытие и экономия относительно полного перебора
+        """
+        total = len(self.targets)
+        space = total * (len(self.chains) + (1 if config.MUTATION_INCLUDE_ORIGINAL else 0))
+        covered = self.covered()
+        return {
+            "rounds": self.rounds,
+            "requests": self.requests,
+            "full_space": space,
+            "savings": space / self.requests if self.requests else 0,
+            "payloads": total,
+            "covered": covered,
+            "coverage": covered / total * 100 if total else 0,
+            "bypasses": self.bypasses,
+            "pruned_chains": sum(
+                1 for trials, _, bypasses in self.arms.values()
+                if trials >= config.SEARCH_PRUNE_AFTER and not bypasses
+            ),
+            "duplicates": self.duplicates,
+            "errors": self.errors,
+            "stop_reason": self.stop_reason,
+        }
@@ -0,0 +1,117 @@
+# checkpoint.py
+"""
+Журнал контрольных точек для продолжения прерванного запуска
+"""
+
+import json
+import os
+import time
+
+import config
+from result_sink import result_to_record
+
+# Версия формата журнала
+JOURNAL_VERSION = 1
+
+
+def load_journal(path):
+    """
+    Прочитать журнал прерванного запуска
+
+    Строка, оборванная при аварийном завершении, и всё после неё
+    отбрасываются.
+
+    Args:
+        path (str): Путь к журналу
+
+    Returns:
+        Tuple[Dict, List[Dict], int]: Заголовок (None - журнал пуст или чужой),
+                                      записи результатов и размер целой части файла
+    """
+    header = None
+    records = []
+    valid_size = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            if header is None:
+                if entry.get("journal") != JOURNAL_VERSION:
+                    return None, [], 0
+                header = entry
+            else:
+                records.append(entry)
+            valid_size += len(line)
+    return header, records, valid_size
+
+
+class CheckpointJournal:
+    """Журнал завершённых payload: JSONL только на дозапись
+
+    Каждый окончательный результат дописывается строкой; буфер сбрасывается
+    на диск с fsync пачками - каждые CHECKPOINT_BATCH результатов или
+    CHECKPOINT_INTERVAL секунд. При аварии теряется не больше одной пачки.
+    """
+
+    def __init__(self, path, run_id, target_url, resume_size=None):
+        """
+        Открыть журнал
+
+        Args:
+            path (str): Путь к журналу
+            run_id (str): ID запуска
+            target_url (str): Целевой сервер
+            resume_size (int): Продолжить журнал с этой позиции (None - начать новый)
+        """
+        self.path = path
+        self.count = 0
+        self._pending = 0
+        self._synced_at = time.monotonic()
+        if resume_size is None:
+            self._file = open(path, 'w', encoding='utf-8')
+            header = {
+                "journal": JOURNAL_VERSION,
+                "run_id": run_id,
+                "target": target_url,
+                "started": time.time(),
+            }
+            self._file.write(json.dumps(header, ensure_ascii=False) + "\n")
+            self._sync()
+        else:
+            # Оборванный хвост прошлого запуска отрезается
+            with open(path, 'r+b') as f:
+                f.truncate(resume_size)
+            self._file = open(path, 'a', encoding='utf-8')
+
+    def add(self, result):
+        """
+        Записать окончательный результат
+
+        Args:
+            result (TestResult): Результат с учётом данных аудит-лога
+        """
+        self._file.write(json.dumps(result_to_record(result), ensure_ascii=False) + "\n")
+        self.count += 1
+        self._pending += 1
+        if (self._pending >= config.CHECKPOINT_BATCH
+                or time.monotonic() - self._synced_at >= config.CHECKPOINT_INTERVAL):
+            self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._synced_at = time.monotonic()
+
+    def close(self):
+        """
+        Сбросить остаток на диск и закрыть журнал
+        """
+        if self._file.closed:
+            return
+        self._sync()
+        self._file.close()
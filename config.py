@@ -5,12 +5,83 @@
 
 # Целевой сервер
 TARGET_URL = "http://192.168.1.25"
+# Путь, glob-шаблон или список через запятую; каталоги - concurrent mode, *.gz - ротированные;
+# .gz и файлы каталогов, не изменявшиеся с начала теста (mtime), не читаются;
+# None - лог недоступен, блокировки определяются только по ответам сервера
 NGINX_LOG_FILE = "/var/log/modsecurity/modsec_audit.log"
 
 # Параметры тестирования
 CONCURRENT_REQUESTS = 5
 REQUEST_TIMEOUT = 10
-DELAY_BETWEEN_REQUESTS = 0.1
+
+# Ограничение скорости отправки
+RATE_LIMIT = 0                         # Глобальный лимит, запросов/сек (0 - без ограничения)
+RATE_BURST = 10                        # Допустимый всплеск запросов
+ENDPOINT_RATE_LIMITS = {}              # Лимиты по endpoint, например {"/login": 5}
+
+# Адаптивный режим: снижение скорости при 429/503 и росте задержек
+ADAPTIVE_RATE = False
+ADAPTIVE_MIN_RATE = 1                  # Нижняя граница, запросов/сек
+ADAPTIVE_MAX_RATE = 500                # Верхняя граница и стартовая скорость без RATE_LIMIT
+ADAPTIVE_BACKOFF = 0.5                 # Множитель скорости при перегрузке
+ADAPTIVE_RECOVERY_STEP = 5             # Прирост скорости, запросов/сек за секунду
+ADAPTIVE_LATENCY_FACTOR = 3.0          # Всплеск задержки относительно базовой
+ADAPTIVE_COOLDOWN = 1.0                # Минимальный интервал между снижениями (сек)
+ADAPTIVE_BACKOFF_STATUSES = [429, 503]
+
+# Движок отправки: "threads" (ThreadPoolExecutor + requests), "asyncio" или
+# "raw" (запросы скомпилированы в wire-формат, пул сокетов, writev)
+ENGINE = "threads"
+ASYNC_CONCURRENCY = 1000               # Одновременных запросов в asyncio движке
+
+# Распределённая отправка (координатор и рабочие)
+DISTRIBUTED_WORKERS = 0                # Локальных рабочих процессов (0 - без распределения)
+DISTRIBUTED_REMOTE = []                # Удалённые рабочие, например ["10.0.0.5:9700"]
+DISTRIBUTED_BATCH_SIZE = 256           # Payload в одной пачке для рабочего
+DISTRIBUTED_TOKEN = None               # Общий секрет координатора и удалённых рабочих
+DISTRIBUTED_LISTEN_HOST = "127.0.0.1"  # Адрес удалённого рабочего (main.py worker)
+DISTRIBUTED_LISTEN_PORT = 9700
+DISTRIBUTED_RETRY_ROUNDS = 1           # Повторов payload рабочих, завершившихся с ошибкой
+
+# Пул HTTP соединений
+HTTP_POOL_SIZE = CONCURRENT_REQUESTS   # Размер пула для общей сессии
+HTTP_SESSION_SCOPE = "thread"          # "thread" - сессия на поток, "shared" - одна общая
+HTTP_KEEP_ALIVE = True                 # Переиспользовать соединения
+HTTP_RETRY_TOTAL = 1                   # Повторы при ошибках соединения
+HTTP_RETRY_BACKOFF = 0.1               # Множитель задержки между повторами (сек)
+HTTP_RETRY_STATUSES = []               # Статусы для повтора (например [502, 504])
+
+# Определение блокировки по ответу сервера (без аудит-лога)
+BLOCK_STATUS_CODES = [403, 406, 418]   # Статусы блокировки
+BLOCK_HEADER_MARKERS = {}              # Заголовок -> regex значения (None - наличие), например {"X-WAF-Block": None}
+BLOCK_BODY_SIGNATURES = []             # Сигнатуры страницы блокировки ("re:" - регулярное выражение)
+BLOCK_BODY_IGNORE_CASE = True
+BLOCK_BODY_BYTES = 4096                # Сколько байт тела проверять
+BLOCK_DRAIN_LIMIT = 64 * 1024          # Остаток тела до N байт дочитывается ради keep-alive, больше - соединение закрывается
+BLOCK_RULE_ID_HEADER = None            # Заголовок с id правил, например "X-WAF-Rule-Id"
+BLOCK_RULE_ID_PATTERN = None           # Regex с группой id правила в теле, например r"Rule ID: (\d+)"
+BLOCK_DETECTOR = None                  # Свой детектор "module.Class" (None - встроенный)
+
+# Маркер корреляции запросов с записями аудит-лога
+CORRELATION_HEADER = "X-WAF-Test-Id"  # Заголовок с маркером (None - не добавлять)
+CORRELATION_PARAM = None               # Параметр query string с маркером, например "waf_test_id"
+CORRELATION_PENDING_TTL = 300          # Сколько секунд хранить запись лога, пришедшую раньше ответа
+CORRELATION_PENDING_MAX = 100000       # Не больше стольких таких записей (старые удаляются)
+
+# Чтение аудит-лога
+LOG_FOLLOW = True                      # Читать лог во время отправки (tail -F)
+LOG_FOLLOW_TIMEOUT = 10                # Сколько ждать недостающих записей после отправки (сек)
+LOG_POLL_INTERVAL = 0.05               # Интервал опроса лога (сек)
+LOG_WAIT_TIME = 2                      # Пауза перед чтением лога без режима follow (сек)
+# Предфильтр строк лога до разбора JSON:
+#   "marker" - только строки с ID запуска (нужен заголовок запроса в аудит-логе, часть B)
+#   "time"   - только записи с timestamp не раньше начала запуска
+#   None     - разбирать все строки
+LOG_PREFILTER = "marker"
+LOG_INGEST_WORKERS = 0                 # Процессов для разбора нескольких логов (0 - по числу CPU)
+LOG_CHUNK_SIZE = 64 * 1024 * 1024      # Размер части большого файла для одного процесса (байт)
+LOG_DIR_BATCH = 500                    # Файлов concurrent mode на одну задачу
+LOG_JSON_BACKEND = "auto"              # "auto" - orjson при наличии, "json" - стандартный
 
 # Типы атак для тестирования
 ATTACK_TYPES = [
@@ -20,6 +91,54 @@ ATTACK_TYPES = [
     "path_traversal"
 ]
 
+# Наборы payload
+USE_BUILTIN_PAYLOADS = True            # Встроенный набор из payloads.py
+PAYLOAD_FILES = []                     # Файлы .jsonl/.csv/.txt с дополнительными payload
+PAYLOAD_ATTACK_TYPES = None            # Отбор по типам атак (None - все)
+PAYLOAD_INDEX_CACHE = True             # Кэшировать индекс файлов на диске
+PAYLOAD_CACHE_DIR = None               # Каталог кэша (None - рядом с файлом набора)
+PAYLOAD_DEFAULT_ENDPOINT = "/"         # Для записей без endpoint
+PAYLOAD_DEFAULT_PARAMETER = "q"        # Для записей без parameter
+
+# Мутации payload (кодирования, регистр, комментарии, пробельные символы)
+MUTATIONS_ENABLED = False
+MUTATION_TRANSFORMS = None             # Имена из mutations.TRANSFORMS (None - все)
+MUTATION_DEPTH = 1                     # Максимальная длина цепочки преобразований
+MUTATION_INCLUDE_ORIGINAL = True       # Отправлять и исходный payload
+MUTATION_DEDUP = "set"                 # "set" - дайджесты BLAKE2b, "bloom" - фиксированная память, None - без фильтра
+MUTATION_BLOOM_CAPACITY = 10000000     # Ожидаемое число уникальных вариантов для "bloom"
+MUTATION_BLOOM_ERROR = 0.001           # Доля ложных срабатываний Bloom фильтра
+
+# Адаптивный поиск обходов: цепочки из MUTATION_TRANSFORMS длиной до MUTATION_DEPTH
+# отбираются раундами по результатам предыдущих запросов
+SEARCH_ENABLED = False
+SEARCH_ARMS_PER_ROUND = 2              # Вариантов одного payload за раунд
+SEARCH_BYPASSES_PER_PAYLOAD = 1        # Найдено обходов - payload больше не мутируется (0 - искать все)
+SEARCH_TARGET_COVERAGE = 1.0           # Доля payload с найденным обходом для остановки
+SEARCH_MAX_REQUESTS = 0                # Бюджет запросов (0 - без ограничения)
+SEARCH_PATIENCE = 3                    # Раундов подряд без новых обходов до остановки (0 - не останавливаться)
+SEARCH_PRUNE_AFTER = 30                # Попыток цепочки без обходов, после которых она исключается для типа атаки
+SEARCH_FAMILY_WEIGHT = 4               # Вес статистики отдельных преобразований в оценке цепочки
+SEARCH_RULE_REWARD = 0.3               # Награда за блокировку одним правилом (делится на число правил)
+SEARCH_LOG_WAIT = 1.0                  # Ожидание записей аудит-лога после раунда (сек)
+SEARCH_SEED = None                     # Зерно случайного выбора (None - случайное)
+
+# Кэш вердиктов между запусками (отпечаток запроса + версия набора правил)
+VERDICT_CACHE = False                  # Не отправлять запросы с действующим вердиктом, объединять одинаковые
+VERDICT_CACHE_FILE = "waf_verdicts.sqlite"  # Файл SQLite (None - только память текущего запуска)
+VERDICT_CACHE_SIZE = 100000            # Вердиктов в памяти (LRU)
+VERDICT_CACHE_TTL = 0                  # Срок действия вердикта (сек, 0 - пока не изменились правила)
+VERDICT_CACHE_MMAP = 256 * 1024 * 1024 # Отображение файла кэша в память (байт)
+VERDICT_CACHE_BATCH = 1000             # Вердиктов в одной транзакции записи
+RULESET_VERSION = None                 # Версия набора правил, например тег релиза
+RULESET_FILES = []                     # Файлы правил для хэша по каждому правилу, например ["/etc/modsecurity/rules/*.conf"]
+
+# История запусков для сравнения (python main.py diff) и трендов (python main.py trends)
+RUN_STORE = False                      # Сохранять результаты каждого запуска
+RUN_STORE_FILE = "waf_runs.sqlite"     # Файл SQLite истории
+RUN_STORE_BATCH = 5000                 # Результатов в одной транзакции записи
+TREND_WINDOW = 5                       # Запусков в скользящем окне тренда
+
 # Пути для тестирования
 TEST_ENDPOINTS = [
     "/",
@@ -27,6 +146,49 @@ TEST_ENDPOINTS = [
     "/login"
 ]
 
+# Обработка результатов
+KEEP_RESULTS_IN_MEMORY = True          # False - только агрегатор и файл (для огромных наборов)
+RESULT_STORAGE = "objects"             # "objects" - список TestResult, "table" - колоночная таблица
+RESULTS_SPILL_FILE = None              # JSONL с результатами, например "waf_results.jsonl"
+SUBMIT_WINDOW = 0                      # Запросов в работе (0 - CONCURRENT_REQUESTS * 4)
+MAX_MISSED_IN_MEMORY = 1000            # Пропущенных атак в отчёте без хранения результатов
+
+# Потоковая выгрузка результатов по запросам (для pandas, Grafana и т.п.)
+EXPORT_FORMATS = []                    # "jsonl", "csv", "parquet", "arrow" (parquet/arrow - нужен pyarrow)
+EXPORT_PREFIX = "waf_results"          # Путь к файлам выгрузки без расширения
+EXPORT_SUMMARY_FILE = "waf_summary.json"  # Сводка запуска без результатов по запросам
+EXPORT_BATCH_ROWS = 65536              # Строк в одной пачке Parquet/Arrow
+
+# Контрольные точки: журнал завершённых payload для продолжения прерванного запуска
+CHECKPOINT = False
+CHECKPOINT_FILE = "waf_checkpoint.jsonl"
+CHECKPOINT_BATCH = 500                 # Результатов между fsync журнала
+CHECKPOINT_INTERVAL = 5.0              # Не реже раза в N секунд (при поступлении результатов)
+CHECKPOINT_RESUME = False              # Продолжить запуск из журнала (--resume)
+
+# Бенчмарк накладных расходов WAF (python main.py benchmark)
+BENCHMARK_LOAD = "open"                # "open" - по расписанию, "fixed" - замкнутый цикл с лимитом
+BENCHMARK_RATE = 200                   # Запросов/сек (0 в режиме fixed - без ограничения)
+BENCHMARK_REQUESTS = 0                 # Атак за прогон (0 - один проход по набору)
+BENCHMARK_CONTROL_RATIO = 1.0          # Контрольных (безопасных) запросов на одну атаку
+BENCHMARK_CONTROL_PARAMETER = "q"
+BENCHMARK_CONTROL_VALUES = [
+    "hello",
+    "product 42",
+    "john.doe@example.com",
+    "2024-01-15",
+    "search term",
+]
+BENCHMARK_WARMUP = 50                  # Первых ответов не учитывать
+BENCHMARK_RESULTS_FILE = "waf_benchmark_report.json"
+
+# Метрики Prometheus/OpenMetrics во время запуска (GET /metrics)
+METRICS_ENABLED = False
+METRICS_HOST = "127.0.0.1"             # "0.0.0.0" - доступно Prometheus с других узлов
+METRICS_PORT = 9108                    # 0 - любой свободный порт
+METRICS_LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]  # Границы корзин задержки (сек)
+METRICS_LINGER = 0                     # Сколько секунд отдавать итоговые метрики после теста
+
 # Вывод и логирование
 VERBOSE = True
 SAVE_RESULTS = True
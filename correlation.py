@@ -0,0 +1,185 @@
+# correlation.py
+"""
+Соотнесение записей аудит-лога ModSecurity с отправленными запросами
+"""
+
+import time
+import uuid
+from urllib.parse import urlsplit, quote, unquote, parse_qsl
+
+import config
+
+# Символы маркера, которые передаются в заголовке без %-кодирования
+_HEADER_SAFE = "!#$&'()*+,-./:;<=>?@[]^_`{|}~"
+
+
+def quote_header_marker(marker):
+    """
+    Закодировать маркер для заголовка корреляции
+
+    Args:
+        marker (str): Маркер корреляции
+
+    Returns:
+        str: Маркер, в котором не-ASCII, пробелы и "%" заменены %-последовательностями
+    """
+    return quote(marker, safe=_HEADER_SAFE)
+
+
+def new_run_id():
+    """
+    Сгенерировать уникальный идентификатор запуска
+
+    Returns:
+        str: Короткий идентификатор запуска
+    """
+    return uuid.uuid4().hex[:12]
+
+
+def extract_rule_ids(transaction):
+    """
+    Извлечь id сработавших правил из транзакции
+
+    Args:
+        transaction (Dict): Секция "transaction" записи аудит-лога
+
+    Returns:
+        List[str]: Идентификаторы правил
+    """
+    rule_ids = []
+    for message in transaction.get('messages') or []:
+        if 'details' in message:
+            rule_id = str(message['details'].get('ruleId', 'unknown'))
+            if rule_id not in rule_ids:
+                rule_ids.append(rule_id)
+    return rule_ids
+
+
+class CorrelationIndex:
+    """Хэш-индекс отправленных запросов по маркеру корреляции и содержимому URI"""
+
+    def __init__(self, run_id, target_url=""):
+        """
+        Инициализация индекса
+
+        Args:
+            run_id (str): Идентификатор запуска
+            target_url (str): URL целевого сервера (для префикса пути)
+        """
+        self.run_id = run_id
+        self.base_path = urlsplit(target_url).path.rstrip("/")
+        self.header = (config.CORRELATION_HEADER or "").lower()
+        self.param = config.CORRELATION_PARAM
+        self.by_marker = {}
+        self.by_request = {}
+        # Записи лога, пришедшие раньше, чем результат запроса:
+        # маркер -> (транзакция, время получения), от старых к новым
+        self.pending = {}
+        self.pending_expired = 0
+
+    def marker_for(self, request_id):
+        """
+        Сформировать маркер корреляции для запроса
+
+        Args:
+            request_id (str): Идентификатор payload
+
+        Returns:
+            str: Значение маркера
+        """
+        return f"{self.run_id}-{request_id}"
+
+    def register(self, result):
+        """
+        Добавить результат в индекс
+
+        Args:
+            result (TestResult): Результат отправки
+        
+        Returns:
+            Dict: Ранее полученная транзакция лога для этого запроса или None
+        """
+        if result.correlation_id:
+            self.by_marker[result.correlation_id] = result
+        key = (self.base_path + result.endpoint, result.parameter, result.payload)
+        self.by_request.setdefault(key, []).append(result)
+        entry = self.pending.pop(result.correlation_id, None)
+        return entry[0] if entry is not None else None
+
+    def unregister(self, result):
+        """
+        Удалить результат из индекса (после окончательной обработки)
+
+        Args:
+            result (TestResult): Результат отправки
+        """
+        self.by_marker.pop(result.correlation_id, None)
+        self.pending.pop(result.correlation_id, None)
+        key = (self.base_path + result.endpoint, result.parameter, result.payload)
+        results = self.by_request.get(key)
+        if results is not None:
+            results[:] = [r for r in results if r is not result]
+            if not results:
+                del self.by_request[key]
+
+    def _add_pending(self, marker, transaction):
+        # Записи без результата (ответ уже обработан или не придёт) удаляются
+        # через CORRELATION_PENDING_TTL секунд или при превышении
+        # CORRELATION_PENDING_MAX - самые старые первыми
+        now = time.monotonic()
+        pending = self.pending
+        pending.pop(marker, None)
+        pending[marker] = (transaction, now)
+        deadline = now - config.CORRELATION_PENDING_TTL
+        expired = []
+        for key, (_, arrived) in pending.items():
+            if len(pending) - len(expired) <= config.CORRELATION_PENDING_MAX and arrived >= deadline:
+                break
+            expired.append(key)
+        for key in expired:
+            del pending[key]
+        self.pending_expired += len(expired)
+
+    def _marker_from(self, request, query_pairs):
+        if self.header:
+            for name, value in (request.get('headers') or {}).items():
+                if name.lower() == self.header:
+                    return unquote(value)
+        if self.param:
+            for name, value in query_pairs:
+                if name == self.param:
+                    return value
+        return None
+
+    def lookup(self, transaction):
+        """
+        Найти результаты, соответствующие транзакции аудит-лога
+
+        Args:
+            transaction (Dict): Секция "transaction" записи аудит-лога
+
+        Returns:
+            List[TestResult]: Найденные результаты (пустой список, если нет)
+        """
+        request = transaction.get('request') or {}
+        parts = urlsplit(request.get('uri', ''))
+        query_pairs = parse_qsl(parts.query, keep_blank_values=True)
+
+        # Точное совпадение по маркеру
+        marker = self._marker_from(request, query_pairs)
+        if marker is not None:
+            result = self.by_marker.get(marker)
+            if result is not None:
+                return [result]
+            if marker.startswith(self.run_id + "-"):
+                # Запрос нашего запуска, ответ на который ещё не обработан
+                self._add_pending(marker, transaction)
+            return []
+
+        # Запасной путь: декодированные путь и параметры URI
+        path = unquote(parts.path)
+        for name, value in query_pairs:
+            results = self.by_request.get((path, name, value))
+            if results:
+                return results
+        return []
@@ -0,0 +1,554 @@
+# distributed.py
+"""
+Распределённая отправка payload: координатор и рабочие процессы/узлы
+"""
+
+import contextlib
+import hmac
+import ipaddress
+import json
+import multiprocessing
+import os
+import queue
+import socket
+import threading
+import time
+
+import config
+
+PROTOCOL_VERSION = 3
+
+# Настройки, которые не передаются рабочим: у них нет логов и файлов результатов
+_LOCAL_ONLY_SETTINGS = {
+    "NGINX_LOG_FILE", "LOG_FOLLOW", "RESULTS_SPILL_FILE", "KEEP_RESULTS_IN_MEMORY",
+    "SAVE_RESULTS", "RESULTS_FILE", "RESULTS_TEXT_FILE",
+    "DISTRIBUTED_WORKERS", "DISTRIBUTED_REMOTE", "DISTRIBUTED_TOKEN",
+    "DISTRIBUTED_LISTEN_HOST", "DISTRIBUTED_LISTEN_PORT", "DISTRIBUTED_RETRY_ROUNDS",
+    "VERDICT_CACHE", "VERDICT_CACHE_FILE", "RULESET_FILES",
+    "EXPORT_FORMATS", "EXPORT_PREFIX", "EXPORT_SUMMARY_FILE",
+    "RUN_STORE", "RUN_STORE_FILE",
+    "METRICS_ENABLED", "METRICS_HOST", "METRICS_PORT", "METRICS_LINGER",
+    "CHECKPOINT", "CHECKPOINT_FILE", "CHECKPOINT_RESUME",
+}
+
+
+def split_address(address):
+    """
+    Разобрать адрес рабочего "host:port", "host", ":port" или "[v6]:port"
+
+    Args:
+        address (str): Адрес
+
+    Returns:
+        Tuple[str, int]: Хост и порт (None - не указаны)
+
+    Raises:
+        ValueError: Неверный порт
+    """
+    address = address.strip()
+    if address.startswith("["):
+        host, sep, rest = address[1:].partition("]")
+        if not sep or (rest and not rest.startswith(":")):
+            raise ValueError(f"Неверный адрес: {address}")
+        port = rest[1:]
+    elif address.count(":") == 1:
+        host, _, port = address.partition(":")
+    else:
+        # Без порта, в том числе IPv6 без скобок
+        host, port = address, ""
+    if not port:
+        return host or None, None
+    if not port.isdigit() or not 0 < int(port) < 65536:
+        raise ValueError(f"Неверный порт в адресе {address}: {port}")
+    return host or None, int(port)
+
+
+def pack_result(result):
+    """
+    Упаковать результат в компактную запись для передачи координатору
+
+    Args:
+        result (TestResult): Результат отправки
+
+    Returns:
+        List: Поля результата по позициям
+    """
+    return [
+        result.request_id, result.attack_type, result.payload, result.endpoint,
+        result.parameter, result.correlation_id, result.status_code, result.was_blocked,
+        result.response_time, result.connect_time, result.sent_ts,
+        list(result.timings) if result.timings is not None else None,
+        list(result.blocked_by_rules), result.mutation,
+    ]
+
+
+def unpack_result(record):
+    """
+    Восстановить результат из компактной записи
+
+    Args:
+        record (List): Запись из pack_result
+
+    Returns:
+        TestResult: Результат отправки
+    """
+    from waf_tester import TestResult
+
+    (request_id, attack_type, payload, endpoint, parameter, correlation_id, status_code,
+     was_blocked, response_time, connect_time, sent_ts, timings, rules, mutation) = record
+    result = TestResult(request_id, attack_type, payload, endpoint, parameter)
+    result.correlation_id = correlation_id
+    result.status_code = status_code
+    result.was_blocked = was_blocked
+    result.response_time = response_time
+    result.connect_time = connect_time
+    result.sent_ts = sent_ts
+    result.timings = tuple(timings) if timings is not None else None
+    result.blocked_by_rules = tuple(rules)
+    result.mutation = mutation
+    return result
+
+
+def shared_settings():
+    """
+    Настройки координатора, передаваемые рабочим
+
+    Returns:
+        Dict: Имя настройки -> значение (только сериализуемые в JSON)
+    """
+    settings = {}
+    for name in dir(config):
+        if not name.isupper() or name in _LOCAL_ONLY_SETTINGS:
+            continue
+        value = getattr(config, name)
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            continue
+        settings[name] = value
+    return settings
+
+
+class SocketChannel:
+    """Канал сообщений поверх TCP: одна JSON запись на строку"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self._reader = sock.makefile('rb')
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        data = json.dumps(message, ensure_ascii=False).encode('utf-8') + b"\n"
+        with self._lock:
+            self.sock.sendall(data)
+
+    def recv(self):
+        line = self._reader.readline()
+        if not line:
+            raise EOFError
+        return json.loads(line)
+
+    def close(self):
+        try:
+            self._reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class _ResultEmitter:
+    """Приёмник результатов рабочего: отправляет их координатору пачками"""
+
+    def __init__(self, channel, batch_size, flush_interval=0.2):
+        self.channel = channel
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.count = 0
+        self._batch = []
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, result):
+        with self._lock:
+            self._batch.append(pack_result(result))
+            self.count += 1
+            if len(self._batch) < self.batch_size and \
+                    time.monotonic() - self._flushed_at < self.flush_interval:
+                return
+            batch, self._batch = self._batch, []
+            self._flushed_at = time.monotonic()
+            self.channel.send(["results", batch])
+
+    def flush(self):
+        with self._lock:
+            batch, self._batch = self._batch, []
+            self._flushed_at = time.monotonic()
+            if batch:
+                self.channel.send(["results", batch])
+
+    def close(self):
+        self.flush()
+
+
+class _ChannelPayloads:
+    """Payload, поступающие от координатора пачками"""
+
+    def __init__(self, channel, emitter, total=0):
+        self.channel = channel
+        self.emitter = emitter
+        self.total = total
+
+    def __len__(self):
+        return self.total
+
+    def __iter__(self):
+        while True:
+            # Перед ожиданием новой пачки отдаём накопленные результаты:
+            # координатор выдаёт работу по мере их получения
+            self.emitter.flush()
+            kind, body = self.channel.recv()
+            if kind == "end":
+                return
+            yield from body
+
+
+def run_worker(channel, quiet=False):
+    """
+    Выполнить одно задание координатора
+
+    Args:
+        channel: Канал с методами send/recv (Pipe или SocketChannel)
+        quiet (bool): Подавить вывод WAFTester
+    """
+    from waf_tester import WAFTester
+
+    kind, job = channel.recv()
+    if kind != "job" or job.get("version") != PROTOCOL_VERSION:
+        channel.send(["error", "Несовместимая версия протокола"])
+        return
+    if config.DISTRIBUTED_TOKEN and not hmac.compare_digest(
+            str(job.get("token") or ""), str(config.DISTRIBUTED_TOKEN)):
+        channel.send(["error", "Неверный токен координатора"])
+        return
+
+    for name, value in job["settings"].items():
+        setattr(config, name, value)
+    # Рабочий сам отправляет запросы и не распределяет их дальше,
+    # кэш, выгрузку, историю, метрики и журнал ведёт координатор
+    config.DISTRIBUTED_WORKERS = 0
+    config.DISTRIBUTED_REMOTE = []
+    config.VERDICT_CACHE = False
+    config.EXPORT_FORMATS = []
+    config.RUN_STORE = False
+    config.METRICS_ENABLED = False
+    config.CHECKPOINT = False
+
+    output = open(os.devnull, 'w', encoding='utf-8') if quiet else None
+    try:
+        with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+            tester = WAFTester(
+                job["target_url"], engine=job["engine"],
+                keep_results=False, run_id=job["run_id"]
+            )
+            emitter = _ResultEmitter(channel, job["batch_size"])
+            tester.result_sinks = [emitter]
+            start = time.perf_counter()
+            tester.send_all_payloads(_ChannelPayloads(channel, emitter))
+            tester.finalize_results()
+            elapsed = time.perf_counter() - start
+    except Exception as e:
+        channel.send(["error", f"{type(e).__name__}: {e}"])
+        return
+    finally:
+        if output is not None:
+            output.close()
+
+    channel.send(["done", {
+        "sent": emitter.count,
+        "elapsed": elapsed,
+        "connection_stats": tester.http_pool.stats.as_dict(),
+        "rate_limit": tester.rate_limiter.as_dict(),
+    }])
+
+
+def _local_worker_main(conn):
+    try:
+        run_worker(conn, quiet=True)
+    except (EOFError, OSError):
+        pass
+    finally:
+        conn.close()
+
+
+def _is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def serve_worker(host=None, port=None):
+    """
+    Запустить удалённого рабочего: принимать задания координаторов по TCP
+
+    Задания выполняются по одному. Координатор передаёт рабочему настройки
+    (в том числе модуль BLOCK_DETECTOR), поэтому вне loopback рабочий
+    принимает задания только с общим токеном.
+
+    Args:
+        host (str): Адрес (по умолчанию config.DISTRIBUTED_LISTEN_HOST)
+        port (int): Порт (по умолчанию config.DISTRIBUTED_LISTEN_PORT)
+
+    Raises:
+        ValueError: Адрес не loopback, а DISTRIBUTED_TOKEN не задан
+    """
+    host = host or config.DISTRIBUTED_LISTEN_HOST
+    port = port or config.DISTRIBUTED_LISTEN_PORT
+    if not config.DISTRIBUTED_TOKEN and not _is_loopback(host):
+        raise ValueError(f"Для адреса {host} нужен DISTRIBUTED_TOKEN "
+                         f"(--set DISTRIBUTED_TOKEN=...)")
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    with socket.create_server((host, port), family=family) as server:
+        print(f"[*] Рабочий ожидает заданий на {host}:{port}")
+        while True:
+            sock, address = server.accept()
+            print(f"[*] Задание от {address[0]}:{address[1]}")
+            channel = SocketChannel(sock)
+            try:
+                run_worker(channel, quiet=True)
+                print(f"[✓] Задание выполнено")
+            except (EOFError, OSError) as e:
+                print(f"[!] Соединение с координатором потеряно: {e}")
+            finally:
+                channel.close()
+
+
+class _WorkerHandle:
+    """Состояние рабочего на стороне координатора"""
+
+    def __init__(self, name, channel, process=None):
+        self.name = name
+        self.channel = channel
+        self.process = process
+        self.outstanding = 0
+        # Выданные, но ещё не выполненные payload: id -> payload
+        self.assigned = {}
+        self.alive = True
+        self.finished = False
+        self.stats = None
+
+
+class DistributedCoordinator:
+    """Координатор: раздаёт payload рабочим и собирает результаты
+
+    Payload раздаются пачками тому рабочему, у которого меньше всего
+    невыполненных запросов, поэтому быстрые рабочие получают больше работы.
+    Результаты возвращаются компактными записями и проходят через обычный
+    конвейер WAFTester (корреляция с логом, агрегатор, гистограммы).
+    Payload рабочего, завершившегося с ошибкой, отправляются повторно
+    рабочими, выполнившими задание (до DISTRIBUTED_RETRY_ROUNDS раз);
+    оставшиеся без результата payload учитываются в lost.
+    """
+
+    def __init__(self, tester, local_workers=None, remote=None, batch_size=None):
+        """
+        Инициализация координатора
+
+        Args:
+            tester (WAFTester): Тестер, в который сводятся результаты
+            local_workers (int): Число локальных процессов (по умолчанию DISTRIBUTED_WORKERS)
+            remote (List[str]): Адреса удалённых рабочих "host:port" (по умолчанию DISTRIBUTED_REMOTE)
+            batch_size (int): Payload в одной пачке (по умолчанию DISTRIBUTED_BATCH_SIZE)
+        """
+        self.tester = tester
+        self.local_workers = config.DISTRIBUTED_WORKERS if local_workers is None else local_workers
+        self.remote = list(config.DISTRIBUTED_REMOTE if remote is None else remote)
+        self.batch_size = batch_size or config.DISTRIBUTED_BATCH_SIZE
+        self.workers = []
+        self.lost = 0
+        self._lost_payloads = []
+        self._events = queue.Queue()
+        self._credit = threading.Condition()
+
+    def _worker_window(self):
+        if self.tester.engine == "asyncio":
+            return config.ASYNC_CONCURRENCY
+        return config.SUBMIT_WINDOW or config.CONCURRENT_REQUESTS * 4
+
+    def _job(self, count):
+        settings = shared_settings()
+        # Общий лимит скорости делится между рабочими
+        if settings.get("RATE_LIMIT"):
+            settings["RATE_LIMIT"] = settings["RATE_LIMIT"] / count
+        settings["ENDPOINT_RATE_LIMITS"] = {
+            endpoint: rate / count for endpoint, rate in settings.get("ENDPOINT_RATE_LIMITS", {}).items()
+        }
+        return {
+            "version": PROTOCOL_VERSION,
+            "token": config.DISTRIBUTED_TOKEN,
+            "target_url": self.tester.target_url,
+            "engine": self.tester.engine,
+            "run_id": self.tester.run_id,
+            "batch_size": self.batch_size,
+            "settings": settings,
+        }
+
+    def _start_workers(self):
+        ctx = multiprocessing.get_context("spawn")
+        for idx in range(self.local_workers):
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(target=_local_worker_main, args=(child_conn,), daemon=True)
+            process.start()
+            child_conn.close()
+            self.workers.append(_WorkerHandle(f"local-{idx}", parent_conn, process))
+
+        for address in self.remote:
+            host, port = split_address(address)
+            port = port or config.DISTRIBUTED_LISTEN_PORT
+            sock = socket.create_connection((host, port), timeout=config.REQUEST_TIMEOUT)
+            sock.settimeout(None)
+            self.workers.append(_WorkerHandle(address, SocketChannel(sock)))
+
+        job = self._job(len(self.workers))
+        for worker in self.workers:
+            worker.channel.send(["job", job])
+
+    def _read(self, worker):
+        # Поток чтения: сообщения рабочего передаются в общую очередь
+        try:
+            while True:
+                message = worker.channel.recv()
+                self._events.put((worker, message))
+                if message[0] in ("done", "error"):
+                    return
+        except (EOFError, OSError) as e:
+            self._events.put((worker, ["error", f"соединение потеряно ({e or 'EOF'})"]))
+
+    def _feed(self, payloads):
+        # Поток раздачи: пачка уходит наименее загруженному живому рабочему
+        limit = self.batch_size * 2 + self._worker_window()
+        batch = []
+
+        def dispatch(batch):
+            with self._credit:
+                while True:
+                    alive = [w for w in self.workers if w.alive]
+                    if not alive:
+                        return False
+                    worker = min(alive, key=lambda w: w.outstanding)
+                    if worker.outstanding + len(batch) <= limit:
+                        break
+                    self._credit.wait(0.5)
+                worker.outstanding += len(batch)
+                for payload in batch:
+                    worker.assigned[payload["id"]] = payload
+            try:
+                worker.channel.send(["payloads", batch])
+            except OSError:
+                pass
+            return True
+
+        payloads = iter(payloads)
+        for payload in payloads:
+            batch.append(payload)
+            if len(batch) >= self.batch_size:
+                if not dispatch(batch):
+                    break
+                batch = []
+        else:
+            if batch and dispatch(batch):
+                batch = []
+        # Все рабочие завершились с ошибкой: остаток набора не отправлен
+        if batch:
+            self._lost_payloads.extend(batch)
+            self._lost_payloads.extend(payloads)
+
+        for worker in self.workers:
+            if worker.alive:
+                try:
+                    worker.channel.send(["end", None])
+                except OSError:
+                    pass
+
+    def run(self, payloads, on_result):
+        """
+        Отправить все payload силами рабочих
+
+        Args:
+            payloads (Iterable[Dict]): Набор payload
+            on_result (Callable): Вызывается для каждого TestResult в потоке вызывающего
+
+        Returns:
+            List[Dict]: Статистика рабочих
+        """
+        stats = self._run_round(payloads, on_result)
+        for _ in range(config.DISTRIBUTED_RETRY_ROUNDS):
+            if not self._lost_payloads:
+                break
+            # Повтор только силами рабочих, выполнивших задание без ошибки
+            survivors = [w for w in self.workers if w.stats is not None]
+            if not survivors:
+                break
+            retry, self._lost_payloads = self._lost_payloads, []
+            self.local_workers = sum(1 for w in survivors if w.process is not None)
+            self.remote = [w.name for w in survivors if w.process is None]
+            print(f"\n[*] Повторная отправка {len(retry)} payload рабочим, выполнившим задание")
+            stats += self._run_round(retry, on_result)
+
+        self.lost = len(self._lost_payloads)
+        if self.lost:
+            print(f"\n[!] Без результата остались {self.lost} payload (рабочие завершились с ошибкой)")
+        return stats
+
+    def _run_round(self, payloads, on_result):
+        self.workers = []
+        self._events = queue.Queue()
+        self._start_workers()
+        try:
+            # Небольшой набор делится между всеми рабочими, а не уходит первому
+            self.batch_size = max(1, min(self.batch_size, -(-len(payloads) // (len(self.workers) * 4))))
+        except TypeError:
+            pass
+        print(f"[*] Рабочих: {len(self.workers)} "
+              f"(локальных {self.local_workers}, удалённых {len(self.remote)})")
+
+        readers = [threading.Thread(target=self._read, args=(w,), daemon=True) for w in self.workers]
+        for reader in readers:
+            reader.start()
+        feeder = threading.Thread(target=self._feed, args=(payloads,), daemon=True)
+        feeder.start()
+
+        pending = len(self.workers)
+        while pending:
+            worker, (kind, body) = self._events.get()
+            if kind == "results":
+                with self._credit:
+                    worker.outstanding -= len(body)
+                    self._credit.notify_all()
+                for record in body:
+                    worker.assigned.pop(record[0], None)
+                    on_result(unpack_result(record))
+            elif kind == "done":
+                worker.stats = dict(body, worker=worker.name)
+                worker.finished = True
+                pending -= 1
+            elif kind == "error":
+                print(f"\n[✗] Рабочий {worker.name}: {body}")
+                with self._credit:
+                    worker.alive = False
+                    self._lost_payloads.extend(worker.assigned.values())
+                    worker.assigned = {}
+                    worker.outstanding = 0
+                    self._credit.notify_all()
+                if not worker.finished:
+                    worker.finished = True
+                    pending -= 1
+
+        feeder.join()
+        for worker in self.workers:
+            if worker.process is not None:
+                worker.process.join(timeout=5)
+            worker.channel.close()
+        return [w.stats for w in self.workers if w.stats is not None]
@@ -0,0 +1,340 @@
+# http_pool.py
+"""
+Пул HTTP сессий с keep-alive и статистикой переиспользования соединений
+"""
+
+import socket
+import threading
+import time
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import (ConnectTimeoutError, InsecureRequestWarning,
+                               ProtocolError, ReadTimeoutError)
+from urllib3.util.retry import Retry
+
+import config
+
+# Сертификаты тестовых серверов не проверяются (session.verify = False)
+urllib3.disable_warnings(InsecureRequestWarning)
+
+
+# Время установки соединений, накопленное текущим потоком
+_thread_timer = threading.local()
+
+
+def _record_connect(elapsed):
+    _thread_timer.connect_time = getattr(_thread_timer, "connect_time", 0.0) + elapsed
+    _thread_timer.connections = getattr(_thread_timer, "connections", 0) + 1
+
+
+def _record_phase(name, elapsed_ns):
+    setattr(_thread_timer, name, getattr(_thread_timer, name, 0) + elapsed_ns)
+
+
+def reset_connect_timer():
+    """
+    Сбросить счётчики установки соединений и фаз запроса текущего потока
+    """
+    _thread_timer.connect_time = 0.0
+    _thread_timer.connections = 0
+    _thread_timer.dns_ns = 0
+    _thread_timer.tcp_ns = 0
+    _thread_timer.tls_ns = 0
+    _thread_timer.headers_ns = None
+
+
+def phase_timer():
+    """
+    Получить время фаз запроса текущего потока
+
+    Returns:
+        Tuple[int, int, int, int]: DNS, TCP и TLS (нс), момент получения заголовков (perf_counter_ns)
+    """
+    return (
+        getattr(_thread_timer, "dns_ns", 0),
+        getattr(_thread_timer, "tcp_ns", 0),
+        getattr(_thread_timer, "tls_ns", 0),
+        getattr(_thread_timer, "headers_ns", None),
+    )
+
+
+def pop_connect_timer():
+    """
+    Получить и сбросить счётчики установки соединений текущего потока
+
+    Returns:
+        Tuple[float, int]: Время handshake (сек) и число новых соединений
+    """
+    connect_time = getattr(_thread_timer, "connect_time", 0.0)
+    connections = getattr(_thread_timer, "connections", 0)
+    reset_connect_timer()
+    return connect_time, connections
+
+
+def read_body_prefix(response, limit, drain_limit=None):
+    """
+    Прочитать начало тела потокового ответа (stream=True), остаток отбросить
+
+    Небольшой остаток дочитывается без сохранения, чтобы соединение
+    вернулось в пул, иначе соединение закрывается.
+
+    Args:
+        response (requests.Response): Ответ, полученный с stream=True
+        limit (int): Сколько байт тела вернуть (0 - тело не нужно)
+        drain_limit (int): Сколько байт остатка дочитывать (по умолчанию BLOCK_DRAIN_LIMIT)
+
+    Returns:
+        bytes: Не более limit первых байт тела
+    """
+    drain_limit = config.BLOCK_DRAIN_LIMIT if drain_limit is None else drain_limit
+    raw = response.raw
+    try:
+        prefix = raw.read(limit, decode_content=True) if limit else b""
+        drained = 0
+        while drained <= drain_limit:
+            chunk = raw.read(64 * 1024, decode_content=False)
+            if not chunk:
+                # Тело прочитано, urllib3 уже вернул соединение в пул
+                return prefix
+            drained += len(chunk)
+    except ReadTimeoutError as e:
+        response.close()
+        raise requests.exceptions.ReadTimeout(e)
+    except ProtocolError as e:
+        response.close()
+        raise requests.exceptions.ConnectionError(e)
+    response.close()
+    return prefix
+
+
+class _PhaseTimingMixin:
+    """Замер фаз DNS, TCP и времени до получения заголовков ответа"""
+
+    def _new_conn(self):
+        # Имя разрешается отдельно, чтобы отделить DNS от TCP handshake
+        host = self._dns_host
+        start = time.perf_counter_ns()
+        try:
+            infos = socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)
+        except OSError:
+            # Ошибку разрешения сформирует urllib3
+            infos = []
+        resolved = time.perf_counter_ns()
+        _record_phase("dns_ns", resolved - start)
+
+        try:
+            if not infos:
+                return super()._new_conn()
+            last_error = None
+            for address in dict.fromkeys(info[4][0] for info in infos):
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except ConnectTimeoutError as e:
+                    last_error = e
+            raise last_error
+        finally:
+            self._dns_host = host
+            _record_phase("tcp_ns", time.perf_counter_ns() - resolved)
+
+    def getresponse(self, *args, **kwargs):
+        response = super().getresponse(*args, **kwargs)
+        _thread_timer.headers_ns = time.perf_counter_ns()
+        return response
+
+
+class _TimedHTTPConnection(_PhaseTimingMixin, HTTPConnection):
+    """HTTP соединение, замеряющее время TCP handshake"""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _record_connect(time.perf_counter() - start)
+
+
+class _TimedHTTPSConnection(_PhaseTimingMixin, HTTPSConnection):
+    """HTTPS соединение, замеряющее время TCP + TLS handshake"""
+
+    def connect(self):
+        start = time.perf_counter()
+        before = getattr(_thread_timer, "dns_ns", 0) + getattr(_thread_timer, "tcp_ns", 0)
+        start_ns = time.perf_counter_ns()
+        try:
+            super().connect()
+        finally:
+            elapsed_ns = time.perf_counter_ns() - start_ns
+            new_conn_ns = getattr(_thread_timer, "dns_ns", 0) + getattr(_thread_timer, "tcp_ns", 0) - before
+            _record_phase("tls_ns", max(elapsed_ns - new_conn_ns, 0))
+            _record_connect(time.perf_counter() - start)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedHTTPAdapter(HTTPAdapter):
+    """Адаптер requests с замером времени установки соединений"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+class PoolStats:
+    """Статистика переиспользования соединений"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+        self.handshake_time = 0.0
+        self.request_time = 0.0
+
+    def record(self, connections, handshake_time, total_time):
+        """
+        Учесть один отправленный запрос
+
+        Args:
+            connections (int): Число новых соединений, открытых для запроса
+            handshake_time (float): Время установки соединений (сек)
+            total_time (float): Полное время запроса (сек)
+        """
+        with self._lock:
+            self.requests += 1
+            self.connections_opened += connections
+            self.handshake_time += handshake_time
+            self.request_time += max(total_time - handshake_time, 0.0)
+
+    def merge(self, stats):
+        """
+        Добавить статистику другого пула (например, рабочего процесса)
+
+        Args:
+            stats (Dict): Статистика в формате as_dict
+        """
+        with self._lock:
+            self.requests += stats["requests"]
+            self.connections_opened += stats["connections_opened"]
+            self.handshake_time += stats["handshake_time_total"]
+            self.request_time += stats["request_time_total"]
+
+    def as_dict(self):
+        """
+        Получить статистику в виде словаря
+
+        Returns:
+            Dict: Статистика соединений
+        """
+        with self._lock:
+            requests_count = self.requests
+            opened = self.connections_opened
+            handshake_time = self.handshake_time
+            request_time = self.request_time
+
+        reused = max(requests_count - opened, 0)
+        return {
+            "requests": requests_count,
+            "connections_opened": opened,
+            "connections_reused": reused,
+            "reuse_rate": (reused / requests_count * 100) if requests_count else 0,
+            "handshake_time_total": handshake_time,
+            "handshake_time_avg": (handshake_time / opened) if opened else 0,
+            "request_time_total": request_time,
+            "request_time_avg": (request_time / requests_count) if requests_count else 0,
+        }
+
+
+class HTTPSessionPool:
+    """Пул requests.Session с keep-alive и политикой повторов"""
+
+    def __init__(self, pool_size=None, scope=None):
+        """
+        Инициализация пула сессий
+
+        Args:
+            pool_size (int): Размер пула соединений (по умолчанию config.HTTP_POOL_SIZE)
+            scope (str): "thread" - сессия на поток, "shared" - одна общая сессия
+        """
+        self.pool_size = pool_size or config.HTTP_POOL_SIZE
+        self.scope = scope or config.HTTP_SESSION_SCOPE
+        self.stats = PoolStats()
+        self._local = threading.local()
+        self._sessions = []
+        self._lock = threading.Lock()
+        self._shared = None
+
+    def _build_retry(self):
+        return Retry(
+            total=config.HTTP_RETRY_TOTAL,
+            connect=config.HTTP_RETRY_TOTAL,
+            read=0,
+            status=config.HTTP_RETRY_TOTAL if config.HTTP_RETRY_STATUSES else 0,
+            backoff_factor=config.HTTP_RETRY_BACKOFF,
+            status_forcelist=config.HTTP_RETRY_STATUSES,
+            allowed_methods=None,
+            raise_on_status=False,
+            respect_retry_after_header=False,
+        )
+
+    def _create_session(self, maxsize):
+        session = requests.Session()
+        adapter = _TimedHTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=maxsize,
+            pool_block=True,
+            max_retries=self._build_retry(),
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.verify = False
+        if not config.HTTP_KEEP_ALIVE:
+            session.headers["Connection"] = "close"
+        return session
+
+    def get_session(self):
+        """
+        Получить сессию для текущего потока
+
+        Returns:
+            requests.Session: Сессия с пулом соединений
+        """
+        if self.scope == "shared":
+            if self._shared is None:
+                with self._lock:
+                    if self._shared is None:
+                        self._shared = self._create_session(self.pool_size)
+                        self._sessions.append(self._shared)
+            return self._shared
+
+        session = getattr(self._local, "session", None)
+        if session is None:
+            # Поток отправляет запросы последовательно - одного соединения достаточно
+            session = self._create_session(1)
+            with self._lock:
+                self._sessions.append(session)
+            self._local.session = session
+        return session
+
+    def close(self):
+        """
+        Закрыть все сессии и соединения пула
+        """
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+            self._shared = None
+        for session in sessions:
+            session.close()
+        self._local = threading.local()
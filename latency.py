@@ -0,0 +1,270 @@
+# latency.py
+"""
+Гистограммы задержек и разбиение времени запроса по фазам
+"""
+
+import threading
+import time
+
+# Фазы запроса (по аналогии с curl -w):
+#   dns     - разрешение имени
+#   connect - TCP handshake
+#   tls     - TLS handshake
+#   ttfb    - от готовности соединения до получения заголовков ответа
+#   body    - чтение тела ответа
+#   total   - полное время запроса
+PHASES = ("dns", "connect", "tls", "ttfb", "body", "total")
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def build_timings(start_ns, end_ns, dns_ns=0, connect_ns=0, tls_ns=0, headers_ns=None, opened=0):
+    """
+    Разложить время запроса по фазам
+
+    Args:
+        start_ns (int): Начало запроса (perf_counter_ns)
+        end_ns (int): Конец запроса (perf_counter_ns)
+        dns_ns (int): Время разрешения имени
+        connect_ns (int): Время TCP handshake
+        tls_ns (int): Время TLS handshake
+        headers_ns (int): Момент получения заголовков ответа (perf_counter_ns)
+        opened (int): Число новых соединений (0 - соединение переиспользовано)
+
+    Returns:
+        Tuple[int]: Время фаз в наносекундах в порядке PHASES (None - фазы не было)
+    """
+    total = max(end_ns - start_ns, 0)
+    if headers_ns is None or not start_ns <= headers_ns <= end_ns:
+        headers_ns = end_ns
+    ttfb = max(headers_ns - start_ns - dns_ns - connect_ns - tls_ns, 0)
+    body = end_ns - headers_ns
+    if not opened:
+        return (None, None, None, ttfb, body, total)
+    return (dns_ns, connect_ns, tls_ns or None, ttfb, body, total)
+
+
+def timings_to_ms(timings):
+    """
+    Представить фазы запроса словарём в миллисекундах
+
+    Args:
+        timings (Tuple[int]): Время фаз из build_timings
+
+    Returns:
+        Dict: Фаза -> время (мс), только состоявшиеся фазы
+    """
+    if timings is None:
+        return None
+    return {
+        phase: round(value / 1e6, 3)
+        for phase, value in zip(PHASES, timings)
+        if value is not None
+    }
+
+
+class LatencyHistogram:
+    """Гистограмма с логарифмическими корзинами в стиле HdrHistogram
+
+    Значение попадает в корзину по старшим SUB_BITS битам, поэтому
+    относительная погрешность не превышает 1 / 2**(SUB_BITS - 1) во всём
+    диапазоне от наносекунд до минут, а память зависит только от разброса
+    значений, а не от их числа.
+    """
+
+    SUB_BITS = 8
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    @classmethod
+    def _bucket(cls, value):
+        shift = value.bit_length() - cls.SUB_BITS
+        if shift <= 0:
+            return value
+        return (shift << cls.SUB_BITS) + (value >> shift)
+
+    @classmethod
+    def _bucket_value(cls, bucket):
+        shift = bucket >> cls.SUB_BITS
+        if shift == 0:
+            return bucket
+        mantissa = bucket & ((1 << cls.SUB_BITS) - 1)
+        # Середина диапазона корзины
+        return (mantissa << shift) + (1 << (shift - 1))
+
+    def record(self, value):
+        """
+        Учесть одно значение
+
+        Args:
+            value (int): Значение в наносекундах
+        """
+        value = max(int(value), 0)
+        bucket = self._bucket(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """
+        Добавить значения другой гистограммы
+
+        Args:
+            other (LatencyHistogram): Гистограмма с теми же корзинами
+        """
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, q):
+        """
+        Значение перцентиля
+
+        Args:
+            q (float): Перцентиль (0-100)
+
+        Returns:
+            int: Значение в наносекундах (0 для пустой гистограммы)
+        """
+        if not self.count:
+            return 0
+        rank = max(1, -(-self.count * q // 100))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(max(self._bucket_value(bucket), self.min), self.max)
+        return self.max
+
+    def summary(self):
+        """
+        Сводка гистограммы в миллисекундах
+
+        Returns:
+            Dict: count, min, mean, max и перцентили
+        """
+        summary = {
+            "count": self.count,
+            "min_ms": (self.min or 0) / 1e6,
+            "mean_ms": (self.total / self.count / 1e6) if self.count else 0,
+            "max_ms": (self.max or 0) / 1e6,
+        }
+        for q in PERCENTILES:
+            summary[f"p{str(q).replace('.', '')}_ms"] = self.percentile(q) / 1e6
+        return summary
+
+
+class LatencyRecorder:
+    """Гистограммы фаз запроса в разрезе типа атаки, endpoint и исхода
+
+    Окончательные результаты поступают через add() как в любой приёмник
+    результатов. Для строки прогресса observe() учитывает полное время
+    сразу после ответа, не дожидаясь сопоставления с логом.
+    """
+
+    def __init__(self):
+        self.phases = {phase: LatencyHistogram() for phase in PHASES}
+        self.by_type = {}
+        self.by_endpoint = {}
+        self.by_outcome = {}
+        self.live = LatencyHistogram()
+        self._lock = threading.Lock()
+        self._line = ""
+        self._line_at = 0.0
+
+    def observe(self, result):
+        """
+        Учесть полное время ответа для текущего прогресса
+
+        Args:
+            result (TestResult): Результат сразу после ответа
+        """
+        timings = result.timings
+        if timings is not None:
+            with self._lock:
+                self.live.record(timings[-1])
+
+    def _record(self, histograms, timings):
+        for phase, value in zip(PHASES, timings):
+            if value is not None:
+                histograms[phase].record(value)
+
+    def add(self, result):
+        """
+        Учесть окончательный результат запроса
+
+        Args:
+            result (TestResult): Результат с учётом данных аудит-лога
+        """
+        timings = result.timings
+        if timings is None:
+            return
+        outcome = "blocked" if result.was_blocked else "allowed"
+        with self._lock:
+            self._record(self.phases, timings)
+            for groups, key in (
+                (self.by_type, result.attack_type),
+                (self.by_endpoint, result.endpoint),
+                (self.by_outcome, outcome),
+            ):
+                histograms = groups.get(key)
+                if histograms is None:
+                    histograms = groups[key] = {phase: LatencyHistogram() for phase in PHASES}
+                self._record(histograms, timings)
+
+    def close(self):
+        pass
+
+    def progress_line(self, interval=0.25):
+        """
+        Краткая строка с текущими перцентилями полного времени ответа
+
+        Args:
+            interval (float): Пересчитывать не чаще раза в interval секунд
+
+        Returns:
+            str: Строка для индикатора прогресса (пустая, пока нет ответов)
+        """
+        now = time.monotonic()
+        if now - self._line_at < interval:
+            return self._line
+        with self._lock:
+            if not self.live.count:
+                return ""
+            p50 = self.live.percentile(50) / 1e6
+            p99 = self.live.percentile(99) / 1e6
+        self._line_at = now
+        self._line = f"p50 {p50:.1f} мс, p99 {p99:.1f} мс"
+        return self._line
+
+    @staticmethod
+    def _summaries(histograms):
+        return {phase: h.summary() for phase, h in histograms.items() if h.count}
+
+    def snapshot(self):
+        """
+        Перцентили по фазам в общем и в разрезах
+
+        Returns:
+            Dict: phases, by_type, by_endpoint, by_outcome
+        """
+        with self._lock:
+            return {
+                "phases": self._summaries(self.phases),
+                "by_type": {k: self._summaries(v) for k, v in self.by_type.items()},
+                "by_endpoint": {k: self._summaries(v) for k, v in self.by_endpoint.items()},
+                "by_outcome": {k: self._summaries(v) for k, v in self.by_outcome.items()},
+            }
@@ -0,0 +1,346 @@
+# log_ingest.py
+"""
+Параллельный разбор нескольких аудит-логов ModSecurity в пуле процессов
+"""
+
+import glob
+import gzip
+import heapq
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import config
+from audit_log import LogPosition, capture_position, find_rotated, iter_entries
+
+# Запас на грубую точность mtime файловой системы: файл, записанный сразу
+# после начала теста, не должен оказаться "старше" теста
+_MTIME_SLACK = 2.0
+
+
+class LogSource:
+    """Источник записей аудит-лога"""
+
+    FILE = "file"   # Обычный файл (serial mode), можно читать с позиции и по частям
+    GZIP = "gzip"   # Сжатый ротированный файл, читается целиком
+    DIR = "dir"     # Каталог concurrent mode: один файл на транзакцию
+
+    def __init__(self, kind, path):
+        self.kind = kind
+        self.path = path
+
+    def __repr__(self):
+        return f"LogSource({self.kind!r}, {self.path!r})"
+
+
+def resolve_log_sources(spec):
+    """
+    Развернуть описание логов в список источников
+
+    Args:
+        spec (str|List[str]): Путь, glob-шаблон, список через запятую или список путей
+
+    Returns:
+        List[LogSource]: Найденные источники (без повторов)
+    """
+    if isinstance(spec, str):
+        patterns = [part.strip() for part in spec.split(",") if part.strip()]
+    else:
+        patterns = list(spec)
+
+    sources = []
+    seen = set()
+    for pattern in patterns:
+        paths = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        for path in paths:
+            if path in seen:
+                continue
+            seen.add(path)
+            if os.path.isdir(path):
+                sources.append(LogSource(LogSource.DIR, path))
+            elif path.endswith(".gz"):
+                sources.append(LogSource(LogSource.GZIP, path))
+            else:
+                sources.append(LogSource(LogSource.FILE, path))
+    return sources
+
+
+def capture_positions(sources):
+    """
+    Запомнить конец каждого обычного файла лога и время начала теста
+
+    Обычные файлы затем читаются с запомненного смещения; у .gz и файлов
+    каталогов concurrent mode смещения нет, поэтому они отбираются по mtime:
+    файлы, изменённые до начала теста, не читаются.
+
+    Args:
+        sources (List[LogSource]): Источники
+
+    Returns:
+        Dict[str, LogPosition]: Позиции по пути источника
+    """
+    since = time.time()
+    return {
+        source.path: (capture_position(source.path) if source.kind == LogSource.FILE
+                      else LogPosition(source.path, since=since))
+        for source in sources
+    }
+
+
+def _modified_since(path, position):
+    # Без позиции (сводка parse-logs) источник читается целиком
+    if position is None or position.since is None:
+        return True
+    try:
+        return os.stat(path).st_mtime >= position.since - _MTIME_SLACK
+    except OSError:
+        return False
+
+
+def _file_ranges(path, position):
+    try:
+        st = os.stat(path)
+    except OSError:
+        st = None
+
+    if position is None or position.inode is None:
+        return [(path, 0, st.st_size)] if st is not None else []
+
+    if st is not None and (st.st_ino, st.st_dev) == (position.inode, position.device):
+        offset = position.offset if st.st_size >= position.offset else 0
+        return [(path, offset, st.st_size)]
+
+    # Файл ротирован во время теста
+    ranges = []
+    rotated = find_rotated(position)
+    if rotated is not None:
+        ranges.append((str(rotated), position.offset, rotated.stat().st_size))
+    if st is not None:
+        ranges.append((path, 0, st.st_size))
+    return ranges
+
+
+def build_tasks(sources, positions=None):
+    """
+    Разбить источники на независимые задачи разбора
+
+    Большие файлы делятся на диапазоны байт по LOG_CHUNK_SIZE, файлы
+    concurrent mode группируются пачками по LOG_DIR_BATCH. С позициями
+    .gz и файлы каталогов, не изменявшиеся с начала теста, пропускаются.
+
+    Args:
+        sources (List[LogSource]): Источники
+        positions (Dict[str, LogPosition]): Позиции начала чтения
+
+    Returns:
+        List[Tuple]: Задачи ("range", path, start, end), ("gzip", path) или ("files", [paths])
+    """
+    positions = positions or {}
+    chunk = max(int(config.LOG_CHUNK_SIZE), 1)
+    tasks = []
+
+    for source in sources:
+        position = positions.get(source.path)
+        if source.kind == LogSource.GZIP:
+            if _modified_since(source.path, position):
+                tasks.append(("gzip", source.path))
+
+        elif source.kind == LogSource.DIR:
+            batch = []
+            for root, _, files in os.walk(source.path):
+                for name in sorted(files):
+                    path = os.path.join(root, name)
+                    if not _modified_since(path, position):
+                        continue
+                    batch.append(path)
+                    if len(batch) >= config.LOG_DIR_BATCH:
+                        tasks.append(("files", batch))
+                        batch = []
+            if batch:
+                tasks.append(("files", batch))
+
+        else:
+            for path, start, end in _file_ranges(source.path, position):
+                while start < end:
+                    stop = min(start + chunk, end)
+                    # Последний диапазон читается до конца файла
+                    tasks.append(("range", path, start, None if stop == end else stop))
+                    start = stop
+    return tasks
+
+
+def _iter_range(path, start, end):
+    with open(path, 'rb') as f:
+        if start > 0:
+            # Строка, пересекающая границу, принадлежит предыдущему диапазону
+            f.seek(start - 1)
+            if f.read(1) != b"\n":
+                f.readline()
+        while end is None or f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            yield line
+
+
+def _iter_task_lines(task):
+    kind = task[0]
+    if kind == "range":
+        yield from _iter_range(task[1], task[2], task[3])
+    elif kind == "gzip":
+        with gzip.open(task[1], 'rb') as f:
+            yield from f
+    elif kind == "files":
+        for path in task[1]:
+            try:
+                with open(path, 'rb') as f:
+                    # В concurrent mode файл содержит одну JSON запись
+                    yield f.read().replace(b"\n", b" ") + b"\n"
+            except OSError:
+                continue
+
+
+def slim_block(entry, header=None):
+    """
+    Оставить в записи лога только поля, нужные для сопоставления
+
+    Args:
+        entry (Dict): Запись аудит-лога
+        header (str): Имя заголовка с маркером корреляции
+
+    Returns:
+        Dict: Компактная запись или None, если в ней нет транзакции
+    """
+    transaction = entry.get('transaction') if isinstance(entry, dict) else None
+    if not transaction:
+        return None
+    request = transaction.get('request') or {}
+    header = (header or "").lower()
+    headers = {
+        name: value
+        for name, value in (request.get('headers') or {}).items()
+        if name.lower() == header
+    }
+    return {
+        "transaction": {
+            "timestamp": transaction.get('timestamp', ''),
+            "request": {"uri": request.get('uri', ''), "headers": headers},
+            "messages": [
+                {"details": {"ruleId": message['details'].get('ruleId', 'unknown')}}
+                for message in transaction.get('messages') or []
+                if 'details' in message
+            ],
+        }
+    }
+
+
+def parse_task(task, prefilter=None, header=None):
+    """
+    Разобрать одну задачу (выполняется в процессе пула)
+
+    Args:
+        task (Tuple): Задача из build_tasks
+        prefilter (LinePrefilter): Предфильтр строк
+        header (str): Имя заголовка с маркером корреляции
+
+    Returns:
+        List[Dict]: Компактные записи лога
+    """
+    blocks = []
+    for entry in iter_entries(_iter_task_lines(task), prefilter):
+        block = slim_block(entry, header)
+        if block is not None:
+            blocks.append(block)
+    return blocks
+
+
+def _parse_task_star(args):
+    return parse_task(*args)
+
+
+def ingest_logs(sources, positions=None, prefilter=None, workers=None):
+    """
+    Разобрать все источники, по возможности параллельно
+
+    Args:
+        sources (List[LogSource]): Источники
+        positions (Dict[str, LogPosition]): Позиции начала чтения обычных файлов
+        prefilter (LinePrefilter): Предфильтр строк
+        workers (int): Число процессов (по умолчанию LOG_INGEST_WORKERS или число CPU)
+
+    Yields:
+        Dict: Компактные записи лога из всех источников
+    """
+    tasks = build_tasks(sources, positions)
+    header = config.CORRELATION_HEADER
+    workers = workers or config.LOG_INGEST_WORKERS or os.cpu_count() or 1
+
+    if len(tasks) <= 1 or workers <= 1:
+        for task in tasks:
+            yield from parse_task(task, prefilter, header)
+        return
+
+    # Частичные результаты задач объединяются по мере готовности
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+        args = [(task, prefilter, header) for task in tasks]
+        for blocks in executor.map(_parse_task_star, args):
+            yield from blocks
+
+
+def summarize_logs(sources, positions=None, prefilter=None, top_n=10):
+    """
+    Сводка по записям аудит-логов без отправки запросов
+
+    Args:
+        sources (List[LogSource]): Источники
+        positions (Dict[str, LogPosition]): Позиции начала чтения обычных файлов
+        prefilter (LinePrefilter): Предфильтр строк (например, по ID запуска)
+        top_n (int): Размер топов правил и путей
+
+    Returns:
+        Dict: Число транзакций, срабатывания правил, запуски тестера и пути
+    """
+    header = (config.CORRELATION_HEADER or "").lower()
+    transactions = 0
+    with_rules = 0
+    rules = {}
+    paths = {}
+    runs = {}
+    first = last = None
+
+    for block in ingest_logs(sources, positions, prefilter):
+        transaction = block["transaction"]
+        transactions += 1
+        timestamp = transaction["timestamp"]
+        if timestamp:
+            first = timestamp if first is None else min(first, timestamp)
+            last = timestamp if last is None else max(last, timestamp)
+
+        rule_ids = {str(m["details"]["ruleId"]) for m in transaction["messages"]}
+        if rule_ids:
+            with_rules += 1
+        for rule_id in rule_ids:
+            rules[rule_id] = rules.get(rule_id, 0) + 1
+
+        request = transaction["request"]
+        path = request["uri"].split("?", 1)[0]
+        paths[path] = paths.get(path, 0) + 1
+        # Маркер корреляции имеет вид <ID запуска>-<ID payload>
+        for name, value in request["headers"].items():
+            if name.lower() == header and "-" in value:
+                run_id = value.split("-", 1)[0]
+                runs[run_id] = runs.get(run_id, 0) + 1
+
+    def top(counts):
+        return heapq.nlargest(top_n, counts.items(), key=lambda x: x[1])
+
+    return {
+        "sources": len(sources),
+        "transactions": transactions,
+        "with_rules": with_rules,
+        "first_timestamp": first,
+        "last_timestamp": last,
+        "top_rules": top(rules),
+        "top_paths": top(paths),
+        "runs": runs,
+    }
@@ -1,62 +1,572 @@
 # main.py
 """
 Главный скрипт системы тестирования WAF ModSecurity
+
+Команды:
+    run         - полный тест правил WAF (по умолчанию)
+    benchmark   - бенчмарк накладных расходов WAF
+    parse-logs  - сводка по аудит-логам без отправки запросов
+    report      - отчёт по сохранённому JSONL файлу результатов
+    diff        - регрессии и улучшения между двумя запусками из истории
+    trends      - тренды доли блокировок по типам атак
+    worker      - удалённый рабочий распределённой отправки
+
+Настройки берутся из config.py, поверх них - из профилей (--profile),
+переопределений --set KEY=VALUE и флагов команды. Модули отправки
+запросов (requests, urllib3) импортируются только командами, которым
+они нужны.
 """
 
+import argparse
 import sys
-from pathlib import Path
+from datetime import datetime
 
-# Отключение предупреждений о сертификатах
-import urllib3
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
-from waf_tester import WAFTester
-from report import print_console_report, save_report_json, save_report_text
 import config
+from profiles import load_profile, parse_assignment, apply_settings
+
+# Флаги команд, напрямую переопределяющие настройки config.py
+_FLAG_SETTINGS = {
+    "target": "TARGET_URL",
+    "log": "NGINX_LOG_FILE",
+    "engine": "ENGINE",
+    "timeout": "REQUEST_TIMEOUT",
+    "log_timeout": "LOG_FOLLOW_TIMEOUT",
+    "rate_limit": "RATE_LIMIT",
+    "payload_files": "PAYLOAD_FILES",
+    "attack_types": "PAYLOAD_ATTACK_TYPES",
+    "builtin": "USE_BUILTIN_PAYLOADS",
+    "mutate": "MUTATIONS_ENABLED",
+    "transforms": "MUTATION_TRANSFORMS",
+    "mutation_depth": "MUTATION_DEPTH",
+    "search": "SEARCH_ENABLED",
+    "search_budget": "SEARCH_MAX_REQUESTS",
+    "coverage": "SEARCH_TARGET_COVERAGE",
+    "cache": "VERDICT_CACHE",
+    "cache_file": "VERDICT_CACHE_FILE",
+    "rules": "RULESET_FILES",
+    "ruleset_version": "RULESET_VERSION",
+    "store": "RUN_STORE",
+    "store_file": "RUN_STORE_FILE",
+    "metrics": "METRICS_ENABLED",
+    "checkpoint": "CHECKPOINT",
+    "checkpoint_file": "CHECKPOINT_FILE",
+    "resume": "CHECKPOINT_RESUME",
+    "metrics_port": "METRICS_PORT",
+    "workers": "DISTRIBUTED_WORKERS",
+    "remote": "DISTRIBUTED_REMOTE",
+    "follow": "LOG_FOLLOW",
+    "spill": "RESULTS_SPILL_FILE",
+    "export": "EXPORT_FORMATS",
+    "export_prefix": "EXPORT_PREFIX",
+    "export_summary": "EXPORT_SUMMARY_FILE",
+    "save": "SAVE_RESULTS",
+    "json_file": "RESULTS_FILE",
+    "text_file": "RESULTS_TEXT_FILE",
+    "load": "BENCHMARK_LOAD",
+    "benchmark_rate": "BENCHMARK_RATE",
+    "requests": "BENCHMARK_REQUESTS",
+    "control_ratio": "BENCHMARK_CONTROL_RATIO",
+    "warmup": "BENCHMARK_WARMUP",
+    "benchmark_file": "BENCHMARK_RESULTS_FILE",
+}
 
 
-def main():
+def _csv_list(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def build_parser():
     """
-    Главная функция программы
+    Собрать парсер аргументов командной строки
+
+    Returns:
+        argparse.ArgumentParser: Парсер с подкомандами
+    """
+    parser = argparse.ArgumentParser(
+        description="WAF ModSecurity Test System",
+        epilog="Без команды выполняется run (с вопросами, если запущен из терминала)"
+    )
+    parser.add_argument("--profile", action="append", default=[], metavar="FILE",
+                        help="профиль настроек .toml/.yaml/.json (можно несколько)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="переопределить настройку config.py")
+
+    # Общие группы флагов
+    target = argparse.ArgumentParser(add_help=False)
+    group = target.add_argument_group("цель и отправка")
+    group.add_argument("--target", metavar="URL", help="адрес целевого сервера")
+    group.add_argument("--engine", choices=["threads", "asyncio", "raw"], help="движок отправки запросов")
+    group.add_argument("--concurrency", type=int, help="число одновременных запросов")
+    group.add_argument("--timeout", type=float, help="таймаут запроса (сек)")
+
+    corpus = argparse.ArgumentParser(add_help=False)
+    group = corpus.add_argument_group("набор payload")
+    group.add_argument("--payload-file", dest="payload_files", action="append", metavar="FILE",
+                       help="файл набора .jsonl/.csv/.txt (можно несколько)")
+    group.add_argument("--attack-types", type=_csv_list, metavar="TYPES",
+                       help="типы атак через запятую")
+    group.add_argument("--no-builtin", dest="builtin", action="store_false", default=None,
+                       help="не использовать встроенный набор")
+    group.add_argument("--mutate", action="store_true", default=None,
+                       help="расширить набор мутациями (кодирования, регистр, комментарии)")
+    group.add_argument("--transforms", type=_csv_list, metavar="NAMES",
+                       help="преобразования через запятую (по умолчанию все)")
+    group.add_argument("--mutation-depth", type=int, metavar="N",
+                       help="максимальная длина цепочки преобразований")
+
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    run = commands.add_parser("run", parents=[target, corpus], help="полный тест правил WAF")
+    run.add_argument("--log", metavar="SPEC", help="лог ModSecurity: путь, glob или список через запятую")
+    run.add_argument("--no-log", dest="log", action="store_const", const="",
+                     help="без аудит-лога: блокировки только по ответам сервера")
+    run.add_argument("--rate", dest="rate_limit", type=float, help="лимит запросов/сек")
+    run.add_argument("--log-timeout", type=float, help="ожидание записей лога после отправки (сек)")
+    run.add_argument("--no-follow", dest="follow", action="store_false", default=None,
+                     help="читать лог после отправки, а не во время")
+    run.add_argument("--run-id", help="ID запуска (маркер корреляции)")
+    run.add_argument("--spill", metavar="FILE", help="записывать все результаты в JSONL файл")
+    run.add_argument("--export", type=_csv_list, metavar="FORMATS",
+                     help="потоковая выгрузка результатов: jsonl,csv,parquet,arrow")
+    run.add_argument("--export-prefix", metavar="PATH", help="путь к файлам выгрузки без расширения")
+    run.add_argument("--summary", dest="export_summary", metavar="FILE",
+                     help="файл сводки запуска при выгрузке")
+    run.add_argument("--json", dest="json_file", metavar="FILE", help="файл JSON отчёта")
+    run.add_argument("--text", dest="text_file", metavar="FILE", help="файл текстового отчёта")
+    run.add_argument("--no-save", dest="save", action="store_false", default=None,
+                     help="не сохранять отчёты")
+    run.add_argument("--fail-under", type=float, metavar="PERCENT",
+                     help="код завершения 3, если доля блокировок ниже порога")
+    run.add_argument("-i", "--interactive", action="store_true",
+                     help="спросить адрес сервера и путь к логу")
+    group = run.add_argument_group("адаптивный поиск обходов")
+    group.add_argument("--search", action="store_true", default=None,
+                       help="отбирать мутации по результатам вместо полного перебора")
+    group.add_argument("--search-budget", type=int, metavar="N", help="не больше N запросов")
+    group.add_argument("--coverage", type=float, metavar="0..1",
+                       help="остановиться, когда обход найден для этой доли payload")
+    group = run.add_argument_group("кэш вердиктов")
+    group.add_argument("--cache", action="store_true", default=None,
+                       help="не отправлять запросы с действующим вердиктом прошлых запусков")
+    group.add_argument("--cache-file", metavar="FILE", help="файл SQLite кэша вердиктов")
+    group.add_argument("--rules", action="append", metavar="GLOB",
+                       help="файлы правил ModSecurity для версии набора (можно несколько)")
+    group.add_argument("--ruleset-version", metavar="VERSION", help="версия набора правил")
+    group = run.add_argument_group("история запусков")
+    group.add_argument("--store", action="store_true", default=None,
+                       help="сохранить результаты запуска для diff и trends")
+    group.add_argument("--store-file", metavar="FILE", help="файл SQLite истории запусков")
+    group = run.add_argument_group("контрольные точки")
+    group.add_argument("--checkpoint", action="store_true", default=None,
+                       help="вести журнал завершённых payload")
+    group.add_argument("--checkpoint-file", metavar="FILE", help="файл журнала")
+    group.add_argument("--resume", action="store_true", default=None,
+                       help="продолжить прерванный запуск из журнала")
+    group = run.add_argument_group("метрики")
+    group.add_argument("--metrics", action="store_true", default=None,
+                       help="отдавать метрики Prometheus во время теста (GET /metrics)")
+    group.add_argument("--metrics-port", type=int, metavar="PORT", help="порт сервера метрик")
+    group = run.add_argument_group("распределённая отправка")
+    group.add_argument("--workers", type=int, help="число локальных рабочих процессов")
+    group.add_argument("--remote", type=_csv_list, metavar="HOST:PORT,...",
+                       help="удалённые рабочие через запятую")
+
+    bench = commands.add_parser("benchmark", parents=[target, corpus],
+                                help="бенчмарк накладных расходов WAF")
+    bench.add_argument("--load", choices=["open", "fixed"], help="open - по расписанию, fixed - замкнутый цикл")
+    bench.add_argument("--rate", dest="benchmark_rate", type=float, help="запросов в секунду")
+    bench.add_argument("--requests", type=int, help="число атак (0 - один проход по набору)")
+    bench.add_argument("--control-ratio", type=float, help="контрольных запросов на одну атаку")
+    bench.add_argument("--warmup", type=int, help="сколько первых ответов не учитывать")
+    bench.add_argument("--json", dest="benchmark_file", metavar="FILE", help="файл JSON отчёта")
+    bench.add_argument("--no-save", dest="save", action="store_false", default=None,
+                       help="не сохранять отчёт")
+    bench.add_argument("--stub", action="store_true",
+                       help="запустить локальную заглушку WAF вместо целевого сервера")
+    bench.add_argument("--stub-delay", type=float, default=0.0, help="задержка ответа заглушки (сек)")
+    bench.add_argument("--stub-attack-delay", type=float, default=0.0,
+                       help="дополнительная задержка заглушки для атак (сек)")
+
+    logs = commands.add_parser("parse-logs", help="сводка по аудит-логам без отправки запросов")
+    logs.add_argument("--log", metavar="SPEC", help="лог ModSecurity: путь, glob или список через запятую")
+    logs.add_argument("--run-id", help="только записи запуска с этим ID")
+    logs.add_argument("--since", type=datetime.fromisoformat, metavar="ISO_TIME",
+                      help="только записи не раньше момента")
+    logs.add_argument("--top", type=int, default=10, help="размер топов правил и путей")
+    logs.add_argument("--json", dest="summary_file", metavar="FILE", help="сохранить сводку в JSON")
+
+    report = commands.add_parser("report", help="отчёт по JSONL файлам результатов (RESULTS_SPILL_FILE)")
+    report.add_argument("inputs", nargs="+", metavar="RESULTS.jsonl", help="файлы результатов")
+    report.add_argument("--json", dest="json_file", metavar="FILE", help="сохранить JSON отчёт")
+    report.add_argument("--text", dest="text_file", metavar="FILE", help="сохранить текстовый отчёт")
+    report.add_argument("--export", type=_csv_list, metavar="FORMATS",
+                        help="перевести результаты в csv,parquet,arrow")
+    report.add_argument("--export-prefix", metavar="PATH", help="путь к файлам выгрузки без расширения")
+
+    diff = commands.add_parser("diff", help="регрессии и улучшения между двумя запусками")
+    diff.add_argument("base", nargs="?", default="previous",
+                      help="прежний запуск: ID, previous, latest или -N (по умолчанию previous)")
+    diff.add_argument("head", nargs="?", default="latest", help="новый запуск (по умолчанию latest)")
+    diff.add_argument("--store-file", metavar="FILE", help="файл SQLite истории запусков")
+    diff.add_argument("--attack-type", help="только этот тип атаки")
+    diff.add_argument("--endpoint", help="только этот endpoint")
+    diff.add_argument("--rule", metavar="ID", help="только payload, заблокированные этим правилом")
+    diff.add_argument("--limit", type=int, default=20, help="сколько payload показать")
+    diff.add_argument("--json", dest="diff_file", metavar="FILE", help="сохранить сравнение в JSON")
+    diff.add_argument("--fail-on-regression", action="store_true",
+                      help="код завершения 3, если есть регрессии")
+
+    trends = commands.add_parser("trends", help="тренды доли блокировок по типам атак")
+    trends.add_argument("--store-file", metavar="FILE", help="файл SQLite истории запусков")
+    trends.add_argument("--runs", type=int, default=20, help="сколько последних запусков")
+    trends.add_argument("--window", type=int, help="запусков в скользящем окне (TREND_WINDOW)")
+
+    worker = commands.add_parser("worker", help="удалённый рабочий распределённой отправки")
+    worker.add_argument("listen", nargs="?", default="", metavar="HOST:PORT",
+                        help="адрес для координатора (по умолчанию DISTRIBUTED_LISTEN_*)")
+    return parser
+
+
+def apply_overrides(args, command):
     """
+    Применить профили, --set и флаги команды к config.py
+
+    Args:
+        args (argparse.Namespace): Аргументы командной строки
+        command (str): Выполняемая команда
+    """
+    for path in args.profile:
+        apply_settings(load_profile(path, command))
+    apply_settings(dict(parse_assignment(item) for item in args.set))
+
+    settings = {
+        name: getattr(args, dest)
+        for dest, name in _FLAG_SETTINGS.items()
+        if getattr(args, dest, None) is not None
+    }
+    apply_settings(settings)
+
+    # Параллельность относится к выбранному движку
+    concurrency = getattr(args, "concurrency", None)
+    if concurrency:
+        name = "ASYNC_CONCURRENCY" if config.ENGINE == "asyncio" else "CONCURRENT_REQUESTS"
+        apply_settings({name: concurrency})
+
+
+def print_banner():
     print("\n╔════════════════════════════════════════════╗")
     print("║  WAF ModSecurity Test System v1.0          ║")
     print("║  Прототип для тестирования правил WAF      ║")
     print("╚════════════════════════════════════════════╝\n")
-    
-    # Запрос параметров у пользователя
-    target_url = input(f"Введите адрес сервера (по умолчанию {config.TARGET_URL}): ").strip()
-    if not target_url:
-        target_url = config.TARGET_URL
-    
-    log_file = input(f"Введите путь к логу ModSecurity (по умолчанию {config.NGINX_LOG_FILE}): ").strip()
-    if not log_file:
-        log_file = config.NGINX_LOG_FILE
-    
+
+
+def run_test(args, interactive=False):
+    """
+    Запустить полный тест правил WAF
+
+    Args:
+        args (argparse.Namespace): Аргументы командной строки
+        interactive (bool): Спросить адрес сервера и путь к логу
+
+    Returns:
+        int: Код завершения
+    """
+    from waf_tester import WAFTester
+    from report import print_console_report, save_report_json, save_report_text, save_summary_json
+
+    print_banner()
+    target_url = config.TARGET_URL
+    log_file = config.NGINX_LOG_FILE
+    if interactive:
+        # Запрос параметров у пользователя
+        target_url = input(f"Введите адрес сервера (по умолчанию {target_url}): ").strip() or target_url
+        log_file = input(f"Введите путь к логу ModSecurity (по умолчанию {log_file}): ").strip() or log_file
+        print()
+
     # Создание и запуск тестера
-    print()
-    tester = WAFTester(target_url, log_file)
-    
+    tester = WAFTester(target_url, log_file, run_id=getattr(args, "run_id", None))
+
     # Запуск полного теста
-    if tester.run_full_test():
-        # Получение статистики
-        stats = tester.get_statistics()
-        
-        # Вывод отчёта в консоль
-        print_console_report(stats)
-        
-        # Сохранение отчётов
-        if config.SAVE_RESULTS:
-            save_report_json(stats, config.RESULTS_FILE)
-            save_report_text(stats, config.RESULTS_TEXT_FILE)
-        
-        print("[✓] Тестирование завершено успешно!")
-        return 0
-    else:
+    try:
+        completed = tester.run_full_test()
+    except KeyboardInterrupt:
+        tester.close_checkpoint()
+        print("\n[!] Тестирование прервано")
+        if tester.checkpoint is not None:
+            print(f"[*] Продолжить: python main.py run --resume --checkpoint-file {tester.checkpoint.path}")
+        return 130
+    if not completed:
         print("[✗] Тестирование завершено с ошибкой!")
         return 1
 
+    # Получение статистики
+    stats = tester.get_statistics()
+
+    # Вывод отчёта в консоль
+    print_console_report(stats)
+
+    # Сохранение отчётов
+    if config.SAVE_RESULTS:
+        save_report_json(stats, config.RESULTS_FILE)
+        save_report_text(stats, config.RESULTS_TEXT_FILE)
+        if stats['exports']:
+            save_summary_json(stats, config.EXPORT_SUMMARY_FILE)
+
+    if stats['lost_payloads']:
+        print(f"[✗] Без результата остались {stats['lost_payloads']} payload: рабочие завершились с ошибкой")
+        return 4
+
+    fail_under = getattr(args, "fail_under", None)
+    if fail_under is not None and stats['detection_rate'] < fail_under:
+        print(f"[✗] Доля блокировок {stats['detection_rate']:.1f}% ниже порога {fail_under:.1f}%")
+        return 3
+
+    print("[✓] Тестирование завершено успешно!")
+    return 0
+
+
+def run_benchmark(args):
+    """
+    Запустить бенчмарк накладных расходов WAF
+
+    Args:
+        args (argparse.Namespace): Аргументы командной строки
+
+    Returns:
+        int: Код завершения
+    """
+    from waf_tester import WAFTester
+    from benchmark import BenchmarkRunner
+    from report import print_benchmark_report, save_benchmark_json
+
+    print_banner()
+    stub = None
+    target_url = config.TARGET_URL
+    if args.stub:
+        from stub_server import StubServer
+        stub = StubServer(delay=args.stub_delay, attack_delay=args.stub_attack_delay).start()
+        target_url = stub.url
+        print(f"[*] Локальная заглушка WAF: {target_url}")
+
+    try:
+        tester = WAFTester(target_url, keep_results=False)
+        if not tester.check_connection():
+            return 1
+        summary = BenchmarkRunner(tester).run()
+    finally:
+        if stub is not None:
+            stub.stop()
+
+    print_benchmark_report(summary)
+    if config.SAVE_RESULTS:
+        save_benchmark_json(summary, config.BENCHMARK_RESULTS_FILE)
+    return 0
+
+
+def run_parse_logs(args):
+    """
+    Вывести сводку по аудит-логам без отправки запросов
+
+    Args:
+        args (argparse.Namespace): Аргументы командной строки
+
+    Returns:
+        int: Код завершения
+    """
+    from pathlib import Path
+    from audit_log import LinePrefilter
+    from log_ingest import resolve_log_sources, summarize_logs
+    from report import print_log_summary, save_log_summary_json
+
+    sources = [s for s in resolve_log_sources(config.NGINX_LOG_FILE) if Path(s.path).exists()]
+    if not sources:
+        print(f"[✗] Файл логов не найден: {config.NGINX_LOG_FILE}")
+        return 1
+
+    if args.run_id:
+        prefilter = LinePrefilter(run_id=args.run_id, mode="marker")
+    elif args.since:
+        prefilter = LinePrefilter(since=args.since, mode="time")
+    else:
+        prefilter = None
+
+    print(f"[*] Разбор {len(sources)} источников лога...")
+    summary = summarize_logs(sources, prefilter=prefilter, top_n=args.top)
+    print_log_summary(summary)
+    if args.summary_file:
+        save_log_summary_json(summary, args.summary_file)
+    return 0
+
+
+def run_report(args):
+    """
+    Построить отчёт по JSONL файлам результатов
+
+    Args:
+        args (argparse.Namespace): Аргументы командной строки
+
+    Returns:
+        int: Код завершения
+    """
+    from latency import LatencyRecorder
+    from report import print_console_report, save_report_json, save_report_text, open_exporters
+    from result_sink import load_results
+    from stats import StatsAggregator
+
+    aggregator = StatsAggregator(max_missed=config.MAX_MISSED_IN_MEMORY)
+    latency = LatencyRecorder()
+    try:
+        exporters = open_exporters(config.EXPORT_PREFIX, args.export or [])
+    except (OSError, ValueError) as e:
+        print(f"[✗] Ошибка выгрузки: {e}")
+        return 2
+    sinks = [aggregator, latency] + exporters
+    for filename in args.inputs:
+        for result in load_results(filename):
+            for sink in sinks:
+                sink.add(result)
+    for exporter in exporters:
+        exporter.close()
+        print(f"[✓] Выгрузка сохранена: {exporter.filename}")
+
+    stats = aggregator.snapshot()
+    stats["latency"] = latency.snapshot()
+    print_console_report(stats)
+    if args.json_file:
+        save_report_json(stats, args.json_file)
+    if args.text_file:
+        save_report_text(stats, args.text_file)
+    return 0
+
+
+def run_diff(args):
+    """
+    Сравнить два запуска из истории
+
+    Args:
+        args (argparse.Namespace): Аргументы командной строки
+
+    Returns:
+        int: Код завершения
+    """
+    from pathlib import Path
+    from run_store import RunStore
+    from report import print_diff_report, save_diff_json
+
+    if not Path(config.RUN_STORE_FILE).exists():
+        print(f"[✗] История запусков не найдена: {config.RUN_STORE_FILE}")
+        return 1
+    store = RunStore()
+    try:
+        diff = store.diff(args.base, args.head, attack_type=args.attack_type,
+                          endpoint=args.endpoint, rule_id=args.rule)
+    except ValueError as e:
+        print(f"[✗] {e}")
+        return 1
+    finally:
+        store.close()
+
+    print_diff_report(diff, args.limit)
+    if args.diff_file:
+        save_diff_json(diff, args.diff_file)
+    if args.fail_on_regression and diff['regressions']:
+        print(f"[✗] Регрессий: {len(diff['regressions'])}")
+        return 3
+    return 0
+
+
+def run_trends(args):
+    """
+    Вывести тренды доли блокировок по истории запусков
+
+    Args:
+        args (argparse.Namespace): Аргументы командной строки
+
+    Returns:
+        int: Код завершения
+    """
+    from pathlib import Path
+    from run_store import RunStore
+    from report import print_trends
+
+    if not Path(config.RUN_STORE_FILE).exists():
+        print(f"[✗] История запусков не найдена: {config.RUN_STORE_FILE}")
+        return 1
+    window = args.window or config.TREND_WINDOW
+    store = RunStore()
+    try:
+        runs = store.runs(args.runs)
+        trends = store.trends(window, args.runs)
+    finally:
+        store.close()
+
+    if not runs:
+        print("[!] В истории нет завершённых запусков")
+        return 1
+    print_trends(runs, trends, window)
+    return 0
+
+
+def run_worker(args):
+    """
+    Работать удалённым рабочим и ждать заданий координатора
+
+    Args:
+        args (argparse.Namespace): Аргументы командной строки
+
+    Returns:
+        int: Код завершения
+    """
+    from distributed import serve_worker, split_address
+
+    try:
+        host, port = split_address(args.listen)
+        serve_worker(host, port)
+    except ValueError as e:
+        print(f"[✗] {e}")
+        return 2
+    except KeyboardInterrupt:
+        print("\n[*] Остановлено")
+    return 0
+
+
+def main(argv=None):
+    """
+    Главная функция программы
+
+    Args:
+        argv (List[str]): Аргументы (по умолчанию sys.argv)
+
+    Returns:
+        int: Код завершения
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    command = args.command or "run"
+
+    try:
+        apply_overrides(args, command)
+    except (OSError, ValueError) as e:
+        print(f"[✗] Ошибка настроек: {e}")
+        return 2
+
+    if command == "benchmark":
+        return run_benchmark(args)
+    if command == "parse-logs":
+        return run_parse_logs(args)
+    if command == "report":
+        return run_report(args)
+    if command == "diff":
+        return run_diff(args)
+    if command == "trends":
+        return run_trends(args)
+    if command == "worker":
+        return run_worker(args)
+
+    # Без команды - прежний интерактивный режим, если есть терминал
+    interactive = args.interactive if args.command else sys.stdin.isatty()
+    return run_test(args, interactive)
+
 
 if __name__ == "__main__":
     sys.exit(main())
-
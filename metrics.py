@@ -0,0 +1,297 @@
+# metrics.py
+"""
+Метрики запуска в формате Prometheus/OpenMetrics во время теста
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+
+PROMETHEUS_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+OPENMETRICS_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Счётчики: имя семейства -> (описание, имена меток)
+COUNTERS = {
+    "waf_requests": ("Ответы на отправленные запросы по типу атаки и статусу", ("attack_type", "status")),
+    "waf_errors": ("Запросы без ответа: TIMEOUT, CONNECTION_ERROR, ERROR", ("error",)),
+    "waf_results": ("Окончательные вердикты (с учётом аудит-лога) по типу атаки", ("attack_type", "outcome")),
+    "waf_rule_hits": ("Срабатывания правил WAF в окончательных вердиктах", ("rule_id",)),
+}
+HISTOGRAM = "waf_response_seconds"
+HISTOGRAM_HELP = "Полное время ответа по типу атаки"
+
+
+def _status_label(status_code):
+    if isinstance(status_code, int):
+        return str(status_code)
+    if status_code in ("TIMEOUT", "CONNECTION_ERROR"):
+        return status_code
+    return "ERROR"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs):
+    text = ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return "{" + text + "}" if text else ""
+
+
+def _number(value):
+    if isinstance(value, float):
+        if value == float("inf"):
+            return "+Inf"
+        return repr(value)
+    return str(value)
+
+
+class _Shard:
+    """Метрики одного потока: пишет только владелец, без блокировок"""
+
+    __slots__ = ("counters", "buckets", "sums")
+
+    def __init__(self):
+        # (семейство, значения меток...) -> значение
+        self.counters = {}
+        # тип атаки -> число ответов по корзинам (последняя - больше всех границ)
+        self.buckets = {}
+        self.sums = {}
+
+
+class RunMetrics:
+    """Счётчики и гистограмма задержек запуска
+
+    Каждый поток, через который проходят результаты, пишет в свой набор
+    счётчиков без блокировок; сервер метрик суммирует наборы при запросе.
+    Копия словаря под GIL делается одной операцией, поэтому чтение не
+    мешает отправке. observe() подключается к result_observers (сразу после
+    ответа), add() - к приёмникам результатов (окончательный вердикт).
+    """
+
+    def __init__(self, buckets=None):
+        """
+        Инициализация метрик
+
+        Args:
+            buckets (List[float]): Границы корзин задержки в секундах
+                                   (по умолчанию METRICS_LATENCY_BUCKETS)
+        """
+        self.bounds = tuple(sorted(buckets or config.METRICS_LATENCY_BUCKETS))
+        self.gauges = {}
+        self._local = threading.local()
+        self._shards = []
+        # Только для регистрации набора нового потока
+        self._shards_lock = threading.Lock()
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def observe(self, result):
+        """
+        Учесть ответ сразу после получения
+
+        Args:
+            result (TestResult): Результат отправки
+        """
+        shard = self._shard()
+        counters = shard.counters
+        attack_type = result.attack_type
+        status_code = result.status_code
+        # Ключ - семейство и значения меток в порядке COUNTERS
+        if status_code.__class__ is not int:
+            status = _status_label(status_code)
+            key = ("waf_requests", attack_type, status)
+            counters[key] = counters.get(key, 0) + 1
+            key = ("waf_errors", status)
+            counters[key] = counters.get(key, 0) + 1
+            return
+        key = ("waf_requests", attack_type, status_code)
+        counters[key] = counters.get(key, 0) + 1
+
+        timings = result.timings
+        seconds = timings[-1] / 1e9 if timings else result.response_time
+        buckets = shard.buckets.get(attack_type)
+        if buckets is None:
+            buckets = shard.buckets[attack_type] = [0] * (len(self.bounds) + 1)
+            shard.sums[attack_type] = 0.0
+        buckets[bisect_left(self.bounds, seconds)] += 1
+        shard.sums[attack_type] += seconds
+
+    def add(self, result):
+        """
+        Учесть окончательный вердикт (приёмник результатов)
+
+        Args:
+            result (TestResult): Результат с учётом данных аудит-лога
+        """
+        counters = self._shard().counters
+        if result.status_code.__class__ is not int:
+            outcome = "error"
+        else:
+            outcome = "blocked" if result.was_blocked else "missed"
+        key = ("waf_results", result.attack_type, outcome)
+        counters[key] = counters.get(key, 0) + 1
+        for rule_id in result.blocked_by_rules:
+            key = ("waf_rule_hits", rule_id)
+            counters[key] = counters.get(key, 0) + 1
+
+    def close(self):
+        pass
+
+    def add_gauge(self, name, help_text, callback, labels=()):
+        """
+        Добавить показатель, вычисляемый при каждом запросе метрик
+
+        Args:
+            name (str): Имя метрики
+            help_text (str): Описание
+            callback (Callable[[], float]): Текущее значение
+            labels (Tuple): Пары (метка, значение)
+        """
+        self.gauges[name] = (help_text, callback, tuple(labels))
+
+    def _merge(self):
+        counters = {}
+        buckets = {}
+        sums = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for key, value in list(shard.counters.items()):
+                counters[key] = counters.get(key, 0) + value
+            for attack_type, counts in list(shard.buckets.items()):
+                merged = buckets.setdefault(attack_type, [0] * len(counts))
+                for idx, count in enumerate(list(counts)):
+                    merged[idx] += count
+            for attack_type, value in list(shard.sums.items()):
+                sums[attack_type] = sums.get(attack_type, 0.0) + value
+        return counters, buckets, sums
+
+    def render(self, openmetrics=False):
+        """
+        Текст метрик для Prometheus
+
+        Args:
+            openmetrics (bool): Формат OpenMetrics вместо текстового формата Prometheus
+
+        Returns:
+            str: Метрики в формате экспозиции
+        """
+        counters, buckets, sums = self._merge()
+        lines = []
+
+        by_family = {}
+        for key, value in counters.items():
+            by_family.setdefault(key[0], []).append((tuple(map(str, key[1:])), value))
+        for family, (help_text, label_names) in COUNTERS.items():
+            name = family if openmetrics else family + "_total"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for values, value in sorted(by_family.get(family, ())):
+                lines.append(f"{family}_total{_labels(zip(label_names, values))} {value}")
+
+        lines.append(f"# HELP {HISTOGRAM} {HISTOGRAM_HELP}")
+        lines.append(f"# TYPE {HISTOGRAM} histogram")
+        for attack_type, counts in sorted(buckets.items()):
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), counts):
+                cumulative += count
+                labels = _labels((("attack_type", attack_type), ("le", _number(float(bound)))))
+                lines.append(f"{HISTOGRAM}_bucket{labels} {cumulative}")
+            labels = _labels((("attack_type", attack_type),))
+            lines.append(f"{HISTOGRAM}_sum{labels} {_number(sums[attack_type])}")
+            lines.append(f"{HISTOGRAM}_count{labels} {cumulative}")
+
+        for name, (help_text, callback, labels) in self.gauges.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name}{_labels(labels)} {_number(callback())}")
+
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Ответ на запросы Prometheus"""
+
+    metrics = None
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+        body = self.metrics.render(openmetrics).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", OPENMETRICS_TYPE if openmetrics else PROMETHEUS_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    """HTTP сервер метрик в фоновом потоке (GET /metrics)"""
+
+    def __init__(self, metrics, host=None, port=None):
+        """
+        Инициализация сервера
+
+        Args:
+            metrics (RunMetrics): Метрики запуска
+            host (str): Адрес (по умолчанию METRICS_HOST)
+            port (int): Порт (по умолчанию METRICS_PORT, 0 - любой свободный)
+        """
+        self.metrics = metrics
+        self.host = config.METRICS_HOST if host is None else host
+        self.port = config.METRICS_PORT if port is None else port
+        self.server = None
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self):
+        """
+        Запустить сервер
+
+        Returns:
+            MetricsServer: self
+        """
+        handler = type("Handler", (_MetricsHandler,), {"metrics": self.metrics})
+        self.server = ThreadingHTTPServer((self.host, self.port), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, linger=0):
+        """
+        Остановить сервер
+
+        Args:
+            linger (float): Сколько секунд ещё отдавать итоговые метрики
+        """
+        if self.server is None:
+            return
+        if linger:
+            time.sleep(linger)
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.server = None
@@ -0,0 +1,330 @@
+# mutations.py
+"""
+Мутации payload: кодирования и подстановки для поиска обходов WAF
+"""
+
+import hashlib
+import math
+import re
+from itertools import permutations
+
+import config
+
+ORIGINAL = "original"
+
+# Символы, которые кодируются преобразованиями url, double_url и unicode
+_SPECIAL = [chr(c) for c in range(0x20, 0x7f) if not chr(c).isalnum() and chr(c) not in "-_.~"]
+
+# Таблицы str.translate строятся один раз: замена выполняется в C за проход по строке
+_URL_TABLE = str.maketrans({c: f"%{ord(c):02X}" for c in _SPECIAL})
+_URL_ALL_TABLE = str.maketrans({chr(c): f"%{c:02X}" for c in range(0x80)})
+_DOUBLE_URL_TABLE = str.maketrans({c: f"%25{ord(c):02X}" for c in _SPECIAL})
+_UNICODE_TABLE = str.maketrans({c: f"%u{ord(c):04X}" for c in _SPECIAL})
+_FULLWIDTH_TABLE = str.maketrans({chr(c): chr(c + 0xFEE0) for c in range(0x21, 0x7f)})
+_HTML_ENTITY_TABLE = str.maketrans({c: f"&#x{ord(c):x};" for c in "<>\"'()/=`"})
+_COMMENT_TABLE = str.maketrans({" ": "/**/"})
+_TAB_TABLE = str.maketrans({" ": "\t"})
+_NEWLINE_TABLE = str.maketrans({" ": "\n"})
+
+_SQL_KEYWORD = re.compile(
+    r"\b(select|union|insert|update|delete|drop|from|where|and|or|sleep|exec)\b",
+    re.IGNORECASE
+)
+
+
+def _case_alt(value):
+    # Чередование регистра срезами, без цикла по символам
+    chars = list(value.lower())
+    chars[::2] = value[::2].upper()
+    return "".join(chars)
+
+
+def _comment_keywords(value):
+    return _SQL_KEYWORD.sub(lambda m: m.group(0)[0] + "/**/" + m.group(0)[1:], value)
+
+
+# Имя -> функция преобразования строки (одна строка на выходе)
+TRANSFORMS = {
+    "url": lambda v: v.translate(_URL_TABLE),
+    "url_all": lambda v: v.translate(_URL_ALL_TABLE),
+    "double_url": lambda v: v.translate(_DOUBLE_URL_TABLE),
+    "unicode": lambda v: v.translate(_UNICODE_TABLE),
+    "fullwidth": lambda v: v.translate(_FULLWIDTH_TABLE),
+    "html_entity": lambda v: v.translate(_HTML_ENTITY_TABLE),
+    "upper": str.upper,
+    "lower": str.lower,
+    "case_alt": _case_alt,
+    "sql_comment": lambda v: v.translate(_COMMENT_TABLE),
+    "comment_keywords": _comment_keywords,
+    "ws_tab": lambda v: v.translate(_TAB_TABLE),
+    "ws_newline": lambda v: v.translate(_NEWLINE_TABLE),
+}
+
+
+def transform_chains(names, depth):
+    """
+    Все цепочки из различных преобразований длиной до depth
+
+    Args:
+        names (List[str]): Имена преобразований
+        depth (int): Максимальная длина цепочки
+
+    Returns:
+        List[Tuple[str]]: Цепочки в порядке применения
+    """
+    chains = []
+    for length in range(1, depth + 1):
+        chains.extend(permutations(names, length))
+    return chains
+
+
+def chain_name(chain):
+    """
+    Имя цепочки преобразований для отчёта и id payload
+
+    Args:
+        chain (Tuple[str]): Цепочка преобразований
+
+    Returns:
+        str: Имена через "+" ("original" для пустой цепочки)
+    """
+    return "+".join(chain) if chain else ORIGINAL
+
+
+def apply_chain(value, chain):
+    """
+    Применить цепочку преобразований к строке
+
+    Args:
+        value (str): Исходный payload
+        chain (Tuple[str]): Цепочка преобразований
+
+    Returns:
+        str: Изменённый payload
+    """
+    for name in chain:
+        value = TRANSFORMS[name](value)
+    return value
+
+
+def make_variant(payload, chain, value):
+    """
+    Собрать вариант payload с цепочкой преобразований
+
+    Args:
+        payload (Dict): Исходный payload
+        chain (Tuple[str]): Применённая цепочка (пустая - исходный payload)
+        value (str): Строка после преобразований
+
+    Returns:
+        Dict: Копия payload с полем mutation и id вида "{id}~{цепочка}"
+    """
+    name = chain_name(chain)
+    variant = dict(payload, payload=value, mutation=name)
+    if chain:
+        variant["id"] = f"{payload['id']}~{name}"
+    return variant
+
+
+def dedup_key(payload, value):
+    """
+    Ключ кандидата для фильтра повторов
+
+    Одна и та же строка в другом месте запроса или с другим методом
+    проверяется другими правилами и повтором не считается.
+
+    Args:
+        payload (Dict): Исходный payload
+        value (str): Строка после преобразований
+
+    Returns:
+        Tuple: Метод, место payload, endpoint, параметр и строка
+    """
+    return (payload.get("method") or "GET", payload.get("location") or "query",
+            payload["endpoint"], payload["parameter"], value)
+
+
+def split_chain(name):
+    """
+    Разложить имя цепочки на преобразования
+
+    Args:
+        name (str): Имя из chain_name
+
+    Returns:
+        List[str]: Имена преобразований
+    """
+    return name.split("+")
+
+
+class SeenSet:
+    """Фильтр повторов: множество 128-битных дайджестов BLAKE2b кандидатов
+
+    Сами строки не хранятся; вероятность совпадения дайджестов разных
+    кандидатов пренебрежимо мала (~n²/2^129), в отличие от 64-битного hash().
+    """
+
+    def __init__(self):
+        self._seen = set()
+
+    def add(self, key):
+        """
+        Запомнить кандидата
+
+        Args:
+            key (Hashable): Ключ кандидата
+
+        Returns:
+            bool: True если кандидат встретился впервые
+        """
+        # repr кортежа строк однозначен, суррогаты в нём экранированы
+        digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).digest()
+        if digest in self._seen:
+            return False
+        self._seen.add(digest)
+        return True
+
+
+class BloomFilter:
+    """Вероятностный фильтр повторов фиксированного размера
+
+    Память не растёт с числом кандидатов; ложное срабатывание с
+    вероятностью error отбрасывает уникального кандидата, но повтор
+    никогда не пропускается.
+    """
+
+    def __init__(self, capacity, error=0.001):
+        """
+        Инициализация фильтра
+
+        Args:
+            capacity (int): Ожидаемое число уникальных кандидатов
+            error (float): Допустимая доля ложных срабатываний
+        """
+        self.size = max(64, int(-capacity * math.log(error) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, key):
+        """
+        Запомнить кандидата
+
+        Args:
+            key (Hashable): Ключ кандидата
+
+        Returns:
+            bool: True если кандидат (вероятно) встретился впервые
+        """
+        # Двойное хэширование: k позиций из одного 64-битного хэша
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        bits = self._bits
+        new = False
+        for i in range(self.hashes):
+            pos = (h1 + i * h2) % self.size
+            byte, mask = pos >> 3, 1 << (pos & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                new = True
+        return new
+
+
+def new_dedup_filter(mode=None):
+    """
+    Создать фильтр повторов по MUTATION_DEDUP
+
+    Args:
+        mode (str): "set", "bloom" или None (без фильтра)
+
+    Returns:
+        SeenSet|BloomFilter: Фильтр или None
+    """
+    mode = config.MUTATION_DEDUP if mode is None else mode
+    if mode == "set":
+        return SeenSet()
+    if mode == "bloom":
+        return BloomFilter(config.MUTATION_BLOOM_CAPACITY, config.MUTATION_BLOOM_ERROR)
+    return None
+
+
+def _expand(value, names, depth, prefix):
+    # Обход в глубину: результат префикса цепочки вычисляется один раз
+    for name in names:
+        if name in prefix:
+            continue
+        chain = prefix + (name,)
+        mutated = TRANSFORMS[name](value)
+        yield chain, mutated
+        if len(chain) < depth:
+            yield from _expand(mutated, names, depth, chain)
+
+
+class MutatedCorpus:
+    """Набор payload, расширенный цепочками преобразований
+
+    Варианты создаются лениво при обходе, повторы (одинаковая строка для
+    того же метода, места в запросе, endpoint и параметра) отбрасываются
+    фильтром повторов.
+    """
+
+    def __init__(self, base, transforms=None, depth=None, include_original=None, dedup=None):
+        """
+        Инициализация набора
+
+        Args:
+            base (Iterable[Dict]): Исходные payload (должен допускать повторный проход)
+            transforms (List[str]): Преобразования (по умолчанию MUTATION_TRANSFORMS или все)
+            depth (int): Максимальная длина цепочки (по умолчанию MUTATION_DEPTH)
+            include_original (bool): Отправлять и исходный payload
+            dedup (str): "set", "bloom" или None
+        """
+        self.base = base
+        names = transforms if transforms is not None else config.MUTATION_TRANSFORMS
+        self.transforms = list(names) if names else list(TRANSFORMS)
+        unknown = [name for name in self.transforms if name not in TRANSFORMS]
+        if unknown:
+            raise ValueError(f"Неизвестные преобразования: {', '.join(unknown)}")
+        self.depth = config.MUTATION_DEPTH if depth is None else depth
+        self.include_original = (config.MUTATION_INCLUDE_ORIGINAL
+                                 if include_original is None else include_original)
+        self.dedup = dedup
+        self.produced = 0
+        self.duplicates = 0
+
+    def chains_per_payload(self):
+        """
+        Число вариантов на один исходный payload (без учёта повторов)
+
+        Returns:
+            int: Число цепочек (+1 за исходный payload)
+        """
+        n = len(self.transforms)
+        chains = sum(math.perm(n, k) for k in range(1, min(self.depth, n) + 1))
+        return chains + (1 if self.include_original else 0)
+
+    # len() - верхняя граница: повторы станут известны только при обходе,
+    # точное число вариантов после обхода - в produced
+    approximate_len = True
+
+    def __len__(self):
+        return len(self.base) * self.chains_per_payload()
+
+    def __iter__(self):
+        seen = new_dedup_filter(self.dedup)
+        self.produced = 0
+        self.duplicates = 0
+        for payload in self.base:
+            variants = _expand(payload["payload"], self.transforms, self.depth, ())
+            if self.include_original:
+                variants = _with_original(payload["payload"], variants)
+            for chain, value in variants:
+                if seen is not None and not seen.add(dedup_key(payload, value)):
+                    self.duplicates += 1
+                    continue
+                self.produced += 1
+                yield make_variant(payload, chain, value)
+
+
+def _with_original(value, variants):
+    yield (), value
+    yield from variants
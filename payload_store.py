@@ -0,0 +1,314 @@
+# payload_store.py
+"""
+Хранилище payload в файлах JSONL/CSV/TXT с ленивым чтением и индексом
+"""
+
+import csv
+import hashlib
+import io
+import json
+import os
+import sys
+from array import array
+from pathlib import Path
+
+import config
+
+INDEX_VERSION = 2
+
+
+def _normalize(record, default_id, attack_type=None):
+    payload = {
+        "id": str(record.get("id") or default_id),
+        "attack_type": record.get("attack_type") or attack_type or "unknown",
+        "payload": record["payload"],
+        "endpoint": record.get("endpoint") or config.PAYLOAD_DEFAULT_ENDPOINT,
+        "method": (record.get("method") or "GET").upper(),
+        "parameter": record.get("parameter") or config.PAYLOAD_DEFAULT_PARAMETER,
+        "description": record.get("description") or "",
+    }
+    # Необязательные поля: место payload в запросе и отправка без кодирования
+    if record.get("location"):
+        payload["location"] = record["location"].lower()
+    if str(record.get("raw", "")).lower() in ("1", "true", "yes"):
+        payload["raw"] = True
+    return payload
+
+
+class PayloadStore:
+    """Набор payload в файле с индексом по типу атаки и id
+
+    Поддерживаемые форматы (по расширению):
+        .jsonl - одна JSON запись на строку (поля как в payloads.get_all_payloads)
+        .csv   - заголовок с теми же полями, записи без переносов строк внутри полей
+        .txt   - один payload на строку (формат SecLists), тип атаки задаётся явно
+    """
+
+    def __init__(self, path, attack_type=None):
+        """
+        Инициализация хранилища
+
+        Args:
+            path (str): Путь к файлу набора
+            attack_type (str): Тип атаки для .txt (по умолчанию - имя файла)
+        """
+        self.path = Path(path)
+        self.format = self.path.suffix.lower().lstrip(".")
+        if self.format not in ("jsonl", "csv", "txt"):
+            raise ValueError(f"Неподдерживаемый формат набора payload: {self.path}")
+        self.attack_type = attack_type or (self.path.stem if self.format == "txt" else None)
+        self._csv_header = None
+        self._index = None
+
+    # Индекс
+
+    def _cache_path(self):
+        cache_dir = config.PAYLOAD_CACHE_DIR
+        if not cache_dir:
+            return self.path.with_name(self.path.name + ".idx")
+        digest = hashlib.sha1(str(self.path.resolve()).encode()).hexdigest()[:16]
+        return Path(cache_dir) / f"{self.path.name}.{digest}.idx"
+
+    # Файл кэша: строка JSON с заголовком (версия, размер и mtime набора,
+    # типы атак, id) и следом массивы смещений array('Q') в том же порядке.
+    # Только данные - подменённый файл не может выполнить код.
+
+    def _load_cached_index(self, st):
+        cache = self._cache_path()
+        try:
+            with open(cache, 'rb') as f:
+                header = json.loads(f.readline())
+                if (header.get("version"), header.get("size"), header.get("mtime_ns"),
+                        header.get("byteorder")) != \
+                        (INDEX_VERSION, st.st_size, st.st_mtime_ns, sys.byteorder):
+                    return None
+
+                def read_offsets(count):
+                    offsets = array('Q')
+                    offsets.fromfile(f, count)
+                    return offsets
+
+                offsets = read_offsets(header["count"])
+                by_type = {
+                    attack_type: read_offsets(count) for attack_type, count in header["types"]
+                }
+                ids = header["ids"]
+                by_id = dict(zip(ids, read_offsets(len(ids))))
+        except (OSError, EOFError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+        return {
+            "offsets": offsets,
+            "by_type": by_type,
+            "by_id": by_id,
+            "csv_header": header["csv_header"],
+            "version": INDEX_VERSION,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+        }
+
+    def _save_cached_index(self, index):
+        cache = self._cache_path()
+        header = {
+            "version": INDEX_VERSION,
+            "size": index["size"],
+            "mtime_ns": index["mtime_ns"],
+            "byteorder": sys.byteorder,
+            "csv_header": index["csv_header"],
+            "count": len(index["offsets"]),
+            "types": [[attack_type, len(offsets)] for attack_type, offsets in index["by_type"].items()],
+            "ids": list(index["by_id"]),
+        }
+        try:
+            cache.parent.mkdir(parents=True, exist_ok=True)
+            tmp = cache.with_name(cache.name + ".tmp")
+            with open(tmp, 'wb') as f:
+                f.write(json.dumps(header).encode("ascii") + b"\n")
+                index["offsets"].tofile(f)
+                for offsets in index["by_type"].values():
+                    offsets.tofile(f)
+                array('Q', index["by_id"].values()).tofile(f)
+            os.replace(tmp, cache)
+        except OSError:
+            pass
+
+    def _scan(self):
+        by_type = {}
+        by_id = {}
+        offsets = array('Q')
+        header = None
+
+        with open(self.path, 'rb') as f:
+            offset = f.tell()
+            for raw in iter(f.readline, b""):
+                line_offset, offset = offset, offset + len(raw)
+                if not raw.strip():
+                    continue
+                if self.format == "csv" and header is None:
+                    header = next(csv.reader([raw.decode('utf-8')]))
+                    continue
+
+                record = self._decode(raw, line_offset, header)
+                if record is None:
+                    continue
+                offsets.append(line_offset)
+                by_type.setdefault(record["attack_type"], array('Q')).append(line_offset)
+                by_id[record["id"]] = line_offset
+
+        return {
+            "offsets": offsets,
+            "by_type": by_type,
+            "by_id": by_id,
+            "csv_header": header,
+        }
+
+    @property
+    def index(self):
+        """
+        Индекс набора: смещения записей по типу атаки и id
+
+        Строится одним проходом по файлу и кэшируется на диске, пока файл
+        не изменится (проверяются размер и mtime).
+
+        Returns:
+            Dict: Индекс набора
+        """
+        if self._index is None:
+            st = self.path.stat()
+            index = self._load_cached_index(st) if config.PAYLOAD_INDEX_CACHE else None
+            if index is None:
+                index = self._scan()
+                index.update(version=INDEX_VERSION, size=st.st_size, mtime_ns=st.st_mtime_ns)
+                if config.PAYLOAD_INDEX_CACHE:
+                    self._save_cached_index(index)
+            self._index = index
+            self._csv_header = index["csv_header"]
+        return self._index
+
+    # Чтение записей
+
+    def _decode(self, raw, offset, header=None):
+        text = raw.decode('utf-8', errors='replace').rstrip("\r\n")
+        # Записи без id получают id по смещению строки в файле
+        default_id = f"{self.path.stem}_{offset}"
+        try:
+            if self.format == "jsonl":
+                return _normalize(json.loads(text), default_id, self.attack_type)
+            if self.format == "csv":
+                row = next(csv.reader(io.StringIO(text)))
+                return _normalize(dict(zip(header, row)), default_id, self.attack_type)
+            return _normalize({"payload": text}, default_id, self.attack_type)
+        except (ValueError, KeyError, StopIteration):
+            return None
+
+    def _iter_sequential(self):
+        header = None
+        with open(self.path, 'rb') as f:
+            offset = 0
+            for raw in iter(f.readline, b""):
+                line_offset, offset = offset, offset + len(raw)
+                if not raw.strip():
+                    continue
+                if self.format == "csv" and header is None:
+                    header = next(csv.reader([raw.decode('utf-8')]))
+                    continue
+                record = self._decode(raw, line_offset, header)
+                if record is not None:
+                    yield record
+
+    def _read_at(self, f, offset):
+        f.seek(offset)
+        return self._decode(f.readline(), offset, self._csv_header)
+
+    def __len__(self):
+        return len(self.index["offsets"])
+
+    def count(self, attack_types=None):
+        """
+        Число записей выбранных типов
+
+        Args:
+            attack_types (Iterable[str]): Типы атак (None - все)
+
+        Returns:
+            int: Число записей
+        """
+        if attack_types is None:
+            return len(self)
+        by_type = self.index["by_type"]
+        return sum(len(by_type.get(t, ())) for t in attack_types)
+
+    def attack_types(self):
+        """
+        Типы атак, присутствующие в наборе
+
+        Returns:
+            List[str]: Типы атак
+        """
+        return sorted(self.index["by_type"])
+
+    def iter_payloads(self, attack_types=None, ids=None):
+        """
+        Лениво читать payload из файла
+
+        Args:
+            attack_types (Iterable[str]): Только эти типы атак (через индекс)
+            ids (Iterable[str]): Только эти id (через индекс)
+
+        Yields:
+            Dict: Payload в формате payloads.get_all_payloads
+        """
+        if ids is None and attack_types is None:
+            # Полный проход - последовательное чтение без индекса
+            yield from self._iter_sequential()
+            return
+
+        index = self.index
+        if ids is not None:
+            offsets = sorted(index["by_id"][i] for i in ids if i in index["by_id"])
+        else:
+            selected = [index["by_type"].get(t, array('Q')) for t in attack_types]
+            offsets = sorted(o for group in selected for o in group)
+
+        with open(self.path, 'rb') as f:
+            for offset in offsets:
+                record = self._read_at(f, offset)
+                if record is not None:
+                    yield record
+
+    def __iter__(self):
+        return self.iter_payloads()
+
+
+class PayloadCorpus:
+    """Набор payload из нескольких источников с известным размером"""
+
+    def __init__(self, sources, attack_types=None):
+        """
+        Инициализация набора
+
+        Args:
+            sources (List): Источники: PayloadStore или списки payload
+            attack_types (Iterable[str]): Только эти типы атак (None - все)
+        """
+        self.sources = sources
+        self.attack_types = list(attack_types) if attack_types is not None else None
+
+    def __len__(self):
+        total = 0
+        for source in self.sources:
+            if isinstance(source, PayloadStore):
+                total += source.count(self.attack_types)
+            elif self.attack_types is None:
+                total += len(source)
+            else:
+                total += sum(1 for p in source if p["attack_type"] in self.attack_types)
+        return total
+
+    def __iter__(self):
+        for source in self.sources:
+            if isinstance(source, PayloadStore):
+                yield from source.iter_payloads(self.attack_types)
+            elif self.attack_types is None:
+                yield from source
+            else:
+                yield from (p for p in source if p["attack_type"] in self.attack_types)
@@ -3,6 +3,13 @@
 Набор тестовых payload для различных типов атак
 """
 
+from functools import lru_cache
+
+import config
+from payload_store import PayloadStore, PayloadCorpus
+from mutations import MutatedCorpus
+
+
 def get_all_payloads():
     """
     Возвращает список всех тестовых payload
@@ -10,6 +17,12 @@ def get_all_payloads():
     Returns:
         List[Dict]: Список словарей с информацией о payload
     """
+    return [dict(p) for p in _builtin_payloads()]
+
+
+@lru_cache(maxsize=None)
+def _builtin_payloads():
+    # Встроенный набор строится один раз за процесс
     payloads = []
     payload_id = 0
     
@@ -116,7 +129,15 @@ def get_all_payloads():
             "description": f"Path Traversal attempt {path_id}"
         })
     
-    return payloads
+    return tuple(payloads)
+
+
+@lru_cache(maxsize=None)
+def _builtin_by_type():
+    by_type = {}
+    for p in _builtin_payloads():
+        by_type.setdefault(p["attack_type"], []).append(p)
+    return by_type
 
 
 def get_payloads_by_type(attack_type):
@@ -129,6 +150,33 @@ def get_payloads_by_type(attack_type):
     Returns:
         List[Dict]: Отфильтрованный список payload
     """
-    all_payloads = get_all_payloads()
-    return [p for p in all_payloads if p["attack_type"] == attack_type]
+    return [dict(p) for p in _builtin_by_type().get(attack_type, [])]
+
+
+def load_corpus(attack_types=None, files=None, mutate=None):
+    """
+    Собрать набор payload из встроенных и файловых источников
+    
+    Файлы читаются лениво, отбор по типам атак идёт через индекс.
+    При MUTATIONS_ENABLED каждый payload расширяется цепочками преобразований.
+    
+    Args:
+        attack_types (Iterable[str]): Типы атак (по умолчанию config.PAYLOAD_ATTACK_TYPES)
+        files (List[str]): Файлы наборов (по умолчанию config.PAYLOAD_FILES)
+        mutate (bool): Расширять мутациями (по умолчанию config.MUTATIONS_ENABLED)
+    
+    Returns:
+        PayloadCorpus|MutatedCorpus: Итерируемый набор с известным размером
+    """
+    attack_types = config.PAYLOAD_ATTACK_TYPES if attack_types is None else attack_types
+    files = config.PAYLOAD_FILES if files is None else files
+    
+    sources = []
+    if config.USE_BUILTIN_PAYLOADS:
+        sources.append(get_all_payloads())
+    sources.extend(PayloadStore(path) for path in files)
+    corpus = PayloadCorpus(sources, attack_types)
+    if config.MUTATIONS_ENABLED if mutate is None else mutate:
+        return MutatedCorpus(corpus)
+    return corpus
 
@@ -0,0 +1,150 @@
+# profiles.py
+"""
+Профили запуска: переопределение настроек config.py из файла и командной строки
+"""
+
+import json
+from pathlib import Path
+
+import config
+
+# Разделы профиля с настройками отдельных команд CLI
+COMMANDS = ("run", "benchmark", "parse-logs", "report", "diff", "trends", "worker")
+
+# Настройки, значения по умолчанию которых вычисляются из других настроек
+_DERIVED_SETTINGS = {
+    "HTTP_POOL_SIZE": "CONCURRENT_REQUESTS",
+}
+
+# Настройки, принимающие и строку, и список
+_STR_OR_LIST_SETTINGS = {"NGINX_LOG_FILE"}
+
+
+def _load_toml(path):
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            raise ValueError("Для профилей TOML на Python < 3.11 установите tomli")
+    with open(path, 'rb') as f:
+        return tomllib.load(f)
+
+
+def _load_yaml(path):
+    try:
+        import yaml
+    except ImportError:
+        raise ValueError("Для профилей YAML установите PyYAML")
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            return yaml.safe_load(f) or {}
+        except yaml.YAMLError as e:
+            raise ValueError(f"Ошибка разбора профиля {path}: {e}")
+
+
+def load_profile(path, command=None):
+    """
+    Прочитать профиль запуска
+
+    Профиль - плоский набор настроек config.py (регистр имён не важен).
+    Разделы с именами команд CLI ([run], [benchmark], ...) применяются
+    только для своей команды поверх общих настроек.
+
+    Args:
+        path (str): Файл .toml, .yaml/.yml или .json
+        command (str): Команда CLI, раздел которой нужно применить
+
+    Returns:
+        Dict: Имя настройки -> значение
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix == ".toml":
+        data = _load_toml(path)
+    elif suffix in (".yaml", ".yml"):
+        data = _load_yaml(path)
+    elif suffix == ".json":
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    else:
+        raise ValueError(f"Неизвестный формат профиля: {path} (нужен .toml, .yaml или .json)")
+    if not isinstance(data, dict):
+        raise ValueError(f"Профиль {path} должен содержать набор настроек")
+
+    settings = {key: value for key, value in data.items() if key not in COMMANDS}
+    section = data.get(command) if command else None
+    if section is not None:
+        if not isinstance(section, dict):
+            raise ValueError(f"Раздел [{command}] профиля {path} должен содержать набор настроек")
+        settings.update(section)
+    return settings
+
+
+def parse_assignment(text):
+    """
+    Разобрать переопределение вида KEY=VALUE из командной строки
+
+    Значение разбирается как JSON (числа, true/false, null, списки),
+    если не получается - берётся как строка.
+
+    Args:
+        text (str): Строка KEY=VALUE
+
+    Returns:
+        Tuple[str, Any]: Имя настройки и значение
+    """
+    key, sep, raw = text.partition("=")
+    if not sep or not key.strip():
+        raise ValueError(f"Ожидалось KEY=VALUE: {text}")
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        value = raw
+    return key.strip(), value
+
+
+def _check_type(name, current, value):
+    if current is None or value is None:
+        return
+    if name in _STR_OR_LIST_SETTINGS and isinstance(value, (str, list)):
+        return
+    if isinstance(current, bool) or isinstance(value, bool):
+        if isinstance(current, bool) != isinstance(value, bool):
+            raise ValueError(f"{name}: ожидалось true/false, получено {value!r}")
+        return
+    if isinstance(current, (int, float)) and isinstance(value, (int, float)):
+        return
+    if isinstance(current, (list, tuple)) and isinstance(value, (list, tuple)):
+        return
+    if type(current) is not type(value):
+        raise ValueError(f"{name}: ожидалось {type(current).__name__}, получено {value!r}")
+
+
+def apply_settings(settings):
+    """
+    Переопределить настройки модуля config
+
+    Args:
+        settings (Dict): Имя настройки -> значение
+
+    Returns:
+        List[str]: Имена изменённых настроек
+    """
+    updates = {}
+    for key, value in settings.items():
+        name = str(key).upper().replace("-", "_")
+        if name.startswith("_") or not hasattr(config, name):
+            raise ValueError(f"Неизвестная настройка: {key}")
+        _check_type(name, getattr(config, name), value)
+        updates[name] = list(value) if isinstance(value, tuple) else value
+
+    # Производные настройки следуют за исходными, если не заданы явно
+    for derived, source in _DERIVED_SETTINGS.items():
+        if source in updates and derived not in updates:
+            if getattr(config, derived) == getattr(config, source):
+                updates[derived] = updates[source]
+
+    for name, value in updates.items():
+        setattr(config, name, value)
+    return list(updates)
@@ -0,0 +1,237 @@
+# rate_limiter.py
+"""
+Ограничение скорости отправки: token bucket, лимиты по endpoint и адаптивный режим
+"""
+
+import asyncio
+import threading
+import time
+
+import config
+
+
+class TokenBucket:
+    """Потокобезопасный token bucket с резервированием слотов"""
+
+    def __init__(self, rate, burst=1):
+        """
+        Инициализация корзины
+
+        Args:
+            rate (float): Скорость пополнения (токенов в секунду)
+            burst (int): Ёмкость корзины
+        """
+        self.rate = float(rate)
+        self.burst = max(float(burst), 1.0)
+        self.tokens = self.burst
+        self.last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate):
+        """
+        Изменить скорость пополнения
+
+        Args:
+            rate (float): Новая скорость (токенов в секунду)
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def reserve(self):
+        """
+        Зарезервировать один токен
+
+        Returns:
+            float: Сколько секунд нужно подождать перед отправкой
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            # Долг по токенам выстраивает ожидающих в очередь
+            return -self.tokens / self.rate
+
+
+class AdaptiveController:
+    """AIMD регулятор скорости по статусам и задержкам ответов"""
+
+    def __init__(self, bucket, min_rate, max_rate):
+        """
+        Инициализация регулятора
+
+        Args:
+            bucket (TokenBucket): Корзина, скорость которой регулируется
+            min_rate (float): Нижняя граница скорости
+            max_rate (float): Верхняя граница скорости
+        """
+        self.bucket = bucket
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.baseline_latency = None
+        self.recent_latency = None
+        self.backoffs = 0
+        self._last_backoff = 0.0
+        self._lock = threading.Lock()
+
+    def _backoff(self, now):
+        # Не чаще одного снижения за период "остывания"
+        if now - self._last_backoff < config.ADAPTIVE_COOLDOWN:
+            return
+        self._last_backoff = now
+        self.backoffs += 1
+        self.bucket.set_rate(max(self.min_rate, self.bucket.rate * config.ADAPTIVE_BACKOFF))
+
+    def feedback(self, status_code, response_time):
+        """
+        Учесть ответ сервера
+
+        Args:
+            status_code (int|str): HTTP статус или код ошибки ("TIMEOUT", ...)
+            response_time (float): Время ответа в секундах
+        """
+        now = time.monotonic()
+        with self._lock:
+            if status_code in config.ADAPTIVE_BACKOFF_STATUSES or status_code == "TIMEOUT":
+                self._backoff(now)
+                return
+            if not isinstance(status_code, int):
+                return
+
+            # Быстрая и медленная скользящие средние задержки
+            if self.baseline_latency is None:
+                self.baseline_latency = self.recent_latency = response_time
+            else:
+                self.recent_latency += 0.3 * (response_time - self.recent_latency)
+                self.baseline_latency += 0.02 * (response_time - self.baseline_latency)
+
+            if self.recent_latency > self.baseline_latency * config.ADAPTIVE_LATENCY_FACTOR:
+                self._backoff(now)
+                return
+
+            # Аддитивный рост: около ADAPTIVE_RECOVERY_STEP запр/с за секунду
+            rate = self.bucket.rate
+            if rate < self.max_rate:
+                self.bucket.set_rate(min(self.max_rate, rate + config.ADAPTIVE_RECOVERY_STEP / rate))
+
+
+class RateLimiter:
+    """Глобальный и по-endpoint лимиты скорости отправки"""
+
+    def __init__(self, rate=None, burst=None, endpoint_limits=None, adaptive=None):
+        """
+        Инициализация ограничителя
+
+        Args:
+            rate (float): Глобальный лимит запросов в секунду (0 - без ограничения)
+            burst (int): Допустимый всплеск запросов
+            endpoint_limits (Dict[str, float]): Лимиты для отдельных endpoint
+            adaptive (bool): Включить адаптивный режим
+        """
+        rate = config.RATE_LIMIT if rate is None else rate
+        burst = burst or config.RATE_BURST
+        endpoint_limits = config.ENDPOINT_RATE_LIMITS if endpoint_limits is None else endpoint_limits
+        adaptive = config.ADAPTIVE_RATE if adaptive is None else adaptive
+
+        self.global_bucket = None
+        self.adaptive = None
+        self.throttled_time = 0.0
+        self._stats_lock = threading.Lock()
+
+        if adaptive:
+            start_rate = rate or config.ADAPTIVE_MAX_RATE
+            self.global_bucket = TokenBucket(start_rate, burst)
+            self.adaptive = AdaptiveController(
+                self.global_bucket, config.ADAPTIVE_MIN_RATE, config.ADAPTIVE_MAX_RATE
+            )
+        elif rate:
+            self.global_bucket = TokenBucket(rate, burst)
+
+        self.endpoint_buckets = {
+            endpoint: TokenBucket(limit, burst)
+            for endpoint, limit in endpoint_limits.items()
+            if limit
+        }
+
+    @property
+    def enabled(self):
+        return self.global_bucket is not None or bool(self.endpoint_buckets)
+
+    def reserve(self, endpoint=None):
+        """
+        Зарезервировать слот для запроса
+
+        Args:
+            endpoint (str): Endpoint запроса
+
+        Returns:
+            float: Время ожидания в секундах
+        """
+        wait = 0.0
+        if self.global_bucket is not None:
+            wait = self.global_bucket.reserve()
+        bucket = self.endpoint_buckets.get(endpoint)
+        if bucket is not None:
+            wait = max(wait, bucket.reserve())
+        if wait:
+            with self._stats_lock:
+                self.throttled_time += wait
+        return wait
+
+    def acquire(self, endpoint=None):
+        """
+        Дождаться разрешения на отправку (блокирующий вызов)
+
+        Args:
+            endpoint (str): Endpoint запроса
+        """
+        if not self.enabled:
+            return
+        wait = self.reserve(endpoint)
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self, endpoint=None):
+        """
+        Дождаться разрешения на отправку в asyncio
+
+        Args:
+            endpoint (str): Endpoint запроса
+        """
+        if not self.enabled:
+            return
+        wait = self.reserve(endpoint)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def feedback(self, status_code, response_time):
+        """
+        Передать результат запроса адаптивному регулятору
+
+        Args:
+            status_code (int|str): HTTP статус или код ошибки
+            response_time (float): Время ответа в секундах
+        """
+        if self.adaptive is not None:
+            self.adaptive.feedback(status_code, response_time)
+
+    def as_dict(self):
+        """
+        Получить состояние ограничителя
+
+        Returns:
+            Dict: Текущая скорость и статистика ограничения
+        """
+        return {
+            "enabled": self.enabled,
+            "rate": self.global_bucket.rate if self.global_bucket else 0,
+            "endpoint_limits": {e: b.rate for e, b in self.endpoint_buckets.items()},
+            "adaptive": self.adaptive is not None,
+            "backoffs": self.adaptive.backoffs if self.adaptive else 0,
+            "throttled_time": self.throttled_time,
+        }
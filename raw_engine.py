@@ -0,0 +1,344 @@
+# raw_engine.py
+"""
+Отправка скомпилированных запросов через пул сокетов без requests
+"""
+
+import socket
+import ssl
+import threading
+import time
+from urllib.parse import urlsplit
+
+import config
+from latency import build_timings
+from wire_request import RequestCompiler
+
+
+class HTTPResponseError(Exception):
+    """Некорректный HTTP ответ сервера"""
+
+
+def _read_exactly(reader, size):
+    data = reader.read(size)
+    if len(data) < size:
+        raise ConnectionError("Соединение закрыто до конца ответа")
+    return data
+
+
+def _skip(reader, size):
+    # Остаток тела читается частями без сохранения
+    while size:
+        chunk = reader.read(min(size, 64 * 1024))
+        if not chunk:
+            raise ConnectionError("Соединение закрыто до конца ответа")
+        size -= len(chunk)
+
+
+def read_response(reader, body_limit=None):
+    """
+    Прочитать HTTP/1.1 ответ из буферизованного сокета
+
+    Args:
+        reader (io.BufferedReader): Поток чтения сокета
+        body_limit (int): Сколько байт тела сохранить (None - всё тело)
+
+    Returns:
+        Tuple: Статус, заголовки (имена в нижнем регистре), начало тела,
+               можно ли переиспользовать соединение, момент получения заголовков
+    """
+    status_line = reader.readline(65537)
+    if not status_line:
+        raise ConnectionError("Сервер закрыл соединение")
+    parts = status_line.split(None, 2)
+    if len(parts) < 2 or not parts[0].startswith(b"HTTP/"):
+        raise HTTPResponseError(f"Некорректная строка статуса: {status_line[:100]!r}")
+    status_code = int(parts[1])
+
+    headers = {}
+    while True:
+        line = reader.readline(65537)
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    headers_ns = time.perf_counter_ns()
+
+    # Как в asyncio движке: остаток тела больше BLOCK_DRAIN_LIMIT не дочитывается
+    limit = float("inf") if body_limit is None else body_limit
+    drain_limit = float("inf") if body_limit is None else config.BLOCK_DRAIN_LIMIT
+    keep_alive = headers.get("connection", "").lower() != "close"
+    body = bytearray()
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        discarded = 0
+        while True:
+            if discarded > drain_limit:
+                keep_alive = False
+                break
+            size = int(reader.readline(65537).split(b";", 1)[0].strip() or b"0", 16)
+            if size == 0:
+                while reader.readline(65537) not in (b"\r\n", b"\n", b""):
+                    pass
+                break
+            keep = min(size, max(limit - len(body), 0))
+            body += _read_exactly(reader, keep)
+            _skip(reader, size - keep)
+            discarded += size - keep
+            _read_exactly(reader, 2)
+    elif "content-length" in headers:
+        length = int(headers["content-length"])
+        keep = min(length, limit)
+        body += _read_exactly(reader, keep)
+        if length - keep > drain_limit:
+            keep_alive = False
+        else:
+            _skip(reader, length - keep)
+    elif status_code in (204, 304) or 100 <= status_code < 200:
+        pass
+    else:
+        body += reader.read() if body_limit is None else reader.read(body_limit)
+        keep_alive = False
+
+    return status_code, headers, bytes(body), keep_alive, headers_ns
+
+
+class _Connection:
+    """Открытый keep-alive сокет с буферизованным чтением"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.reader = sock.makefile("rb", buffering=64 * 1024)
+        self.requests = 0
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RawHTTPClient:
+    """Блокирующий HTTP/1.1 клиент: одно keep-alive соединение на поток"""
+
+    def __init__(self, target_url):
+        """
+        Инициализация клиента
+
+        Args:
+            target_url (str): URL целевого сервера
+        """
+        parts = urlsplit(target_url)
+        self.scheme = parts.scheme or "http"
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.scheme == "https" else 80)
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+        self.ssl_context = None
+        if self.scheme == "https":
+            self.ssl_context = ssl.create_default_context()
+            self.ssl_context.check_hostname = False
+            self.ssl_context.verify_mode = ssl.CERT_NONE
+
+    def _open(self):
+        start = time.perf_counter_ns()
+        infos = socket.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM)
+        resolved = time.perf_counter_ns()
+        last_error = None
+        for family, kind, proto, _, address in infos:
+            sock = socket.socket(family, kind, proto)
+            sock.settimeout(config.REQUEST_TIMEOUT)
+            try:
+                sock.connect(address)
+                break
+            except OSError as e:
+                sock.close()
+                last_error = e
+        else:
+            raise last_error or OSError(f"Не удалось разрешить {self.host}")
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connected = time.perf_counter_ns()
+
+        tls_ns = 0
+        if self.ssl_context:
+            sock = self.ssl_context.wrap_socket(sock, server_hostname=self.host)
+            tls_ns = time.perf_counter_ns() - connected
+
+        conn = _Connection(sock)
+        with self._lock:
+            self._connections.append(conn)
+        phases = (resolved - start, connected - resolved, tls_ns)
+        return conn, (connected + tls_ns - start) / 1e9, phases
+
+    def _release(self, conn):
+        conn.close()
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+
+    @staticmethod
+    def _send(conn, buffers):
+        # Части запроса уходят одним writev; TLS сокет не поддерживает sendmsg
+        if isinstance(conn.sock, ssl.SSLSocket):
+            conn.sock.sendall(b"".join(buffers))
+            return
+        sent = conn.sock.sendmsg(buffers)
+        total = sum(len(part) for part in buffers)
+        if sent < total:
+            conn.sock.sendall(b"".join(buffers)[sent:])
+
+    def request(self, buffers, body_limit=None):
+        """
+        Отправить готовый запрос и прочитать ответ
+
+        Args:
+            buffers (List[bytes]): Части запроса (RequestTemplate.buffers)
+            body_limit (int): Сколько байт тела сохранить (None - всё тело)
+
+        Returns:
+            Tuple: Статус, заголовки, начало тела, момент получения заголовков,
+                   время установки соединений, число новых соединений, фазы (DNS, TCP, TLS)
+        """
+        connect_time = 0.0
+        connections = 0
+        dns_ns = tcp_ns = tls_ns = 0
+
+        # Одна повторная попытка, если сервер закрыл простаивающее соединение
+        for attempt in range(2):
+            conn = getattr(self._local, "conn", None)
+            self._local.conn = None
+            if conn is None:
+                conn, elapsed, (dns, tcp, tls) = self._open()
+                connect_time += elapsed
+                connections += 1
+                dns_ns += dns
+                tcp_ns += tcp
+                tls_ns += tls
+
+            try:
+                self._send(conn, buffers)
+                status_code, headers, body, keep_alive, headers_ns = \
+                    read_response(conn.reader, body_limit)
+            except (ConnectionError, BrokenPipeError):
+                self._release(conn)
+                if conn.requests == 0 or attempt == 1:
+                    raise
+                continue
+            except BaseException:
+                self._release(conn)
+                raise
+
+            conn.requests += 1
+            if keep_alive and config.HTTP_KEEP_ALIVE:
+                self._local.conn = conn
+            else:
+                self._release(conn)
+            break
+
+        return (status_code, headers, body, headers_ns,
+                connect_time, connections, (dns_ns, tcp_ns, tls_ns))
+
+    def close(self):
+        """
+        Закрыть все соединения клиента
+        """
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+class RawEngine:
+    """Отправка payload, заранее скомпилированных в wire-формат
+
+    Запрос собирается один раз при компиляции; на отправку остаются
+    вставка маркера корреляции и один writev в сокет потока. Некорректные
+    запросы ("raw" payload) уходят байт в байт.
+    """
+
+    def __init__(self, tester):
+        """
+        Инициализация движка
+
+        Args:
+            tester (WAFTester): Тестер, для которого формируются результаты
+        """
+        self.tester = tester
+        self.compiler = RequestCompiler(tester.target_url)
+        self.client = RawHTTPClient(tester.target_url)
+
+    def compiled(self, payloads):
+        """
+        Скомпилировать набор до передачи в пул потоков
+
+        Args:
+            payloads (Iterable[Dict]): Набор payload
+
+        Yields:
+            Tuple[Dict, RequestTemplate]: Payload и его шаблон запроса
+        """
+        compile_request = self.compiler.compile
+        for payload_dict in payloads:
+            yield payload_dict, compile_request(payload_dict)
+
+    def send_compiled(self, item):
+        """
+        Отправить скомпилированный payload
+
+        Args:
+            item (Tuple[Dict, RequestTemplate]): Payload и шаблон из compiled()
+
+        Returns:
+            TestResult: Результат отправки
+        """
+        payload_dict, template = item
+        return self.send_payload(payload_dict, template)
+
+    def send_payload(self, payload_dict, template=None):
+        """
+        Отправить один payload запрос
+
+        Args:
+            payload_dict (Dict): Словарь с информацией о payload
+            template (RequestTemplate): Готовый шаблон (None - скомпилировать)
+
+        Returns:
+            TestResult: Результат отправки
+        """
+        tester = self.tester
+        result = tester.new_result(payload_dict)
+        try:
+            if template is None:
+                template = self.compiler.compile(payload_dict)
+            buffers = template.buffers(result.correlation_id)
+            tester.rate_limiter.acquire(payload_dict["endpoint"])
+            start_ns = time.perf_counter_ns()
+            (status_code, headers, body, headers_ns,
+             connect_time, connections, phases) = self.client.request(
+                buffers, tester.block_detector.body_bytes)
+            end_ns = time.perf_counter_ns()
+            response_time = (end_ns - start_ns) / 1e9
+            tester.http_pool.stats.record(connections, connect_time, response_time)
+
+            result.sent_ts = time.time()
+            result.connect_time = connect_time
+            result.timings = build_timings(start_ns, end_ns, *phases, headers_ns, connections)
+            tester.apply_response(result, status_code, response_time, headers, body)
+
+        except socket.timeout:
+            result.status_code = "TIMEOUT"
+            tester.rate_limiter.feedback(result.status_code, config.REQUEST_TIMEOUT)
+        except OSError:
+            result.status_code = "CONNECTION_ERROR"
+        except Exception as e:
+            result.status_code = f"ERROR: {str(e)}"
+
+        return result
+
+    def close(self):
+        """
+        Закрыть соединения движка
+        """
+        self.client.close()
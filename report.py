@@ -3,9 +3,30 @@
 Генерация отчётов о результатах тестирования
 """
 
+import csv
 import json
 from datetime import datetime
 
+import config
+from latency import PHASES
+from mutations import ORIGINAL
+from result_sink import ResultSpill
+
+# Форматы потоковой выгрузки результатов и расширения файлов
+EXPORT_FORMATS = {
+    "jsonl": ".jsonl",
+    "csv": ".csv",
+    "parquet": ".parquet",
+    "arrow": ".arrow",
+}
+
+# Плоские колонки выгрузки: статус отдельно от текста ошибки, фазы - по колонке
+EXPORT_COLUMNS = [
+    "request_id", "attack_type", "endpoint", "parameter", "payload", "mutation",
+    "status_code", "error", "was_blocked", "blocked_by_rules", "log_matched",
+    "response_time", "connect_time", "sent_time",
+] + [f"{phase}_ms" for phase in PHASES]
+
 
 def print_console_report(stats):
     """
@@ -65,6 +86,25 @@ def print_console_report(stats):
         for idx, (rule_id, count) in enumerate(top_rules, 1):
             print(f"{idx:2d}. Rule {rule_id}: {count} срабатываний")
     
+    # Мутации
+    if stats.get('stats_by_transform'):
+        print(f"\n🧬 ДОЛЯ БЛОКИРОВОК ПО ПРЕОБРАЗОВАНИЯМ:")
+        print_transform_rows(stats['stats_by_transform'], print)
+    
+    # Адаптивный поиск
+    search = stats.get('search')
+    if search:
+        print(f"\n🔎 АДАПТИВНЫЙ ПОИСК ОБХОДОВ:")
+        print_search_rows(search, print)
+    
+    # Кэш вердиктов
+    cache = stats.get('cache')
+    if cache:
+        print(f"\n💾 КЭШ ВЕРДИКТОВ:")
+        print(f"├─ Из кэша: {cache['hits']} (устарело после изменения правил: {cache['stale']})")
+        print(f"├─ Копий запросов без отправки: {cache['waited']}")
+        print(f"└─ Сохранено вердиктов: {cache['stored']} (набор правил {cache['ruleset']})")
+    
     # Пропущенные атаки
     missed_attacks = stats['missed_attacks']
     if missed_attacks:
@@ -73,6 +113,54 @@ def print_console_report(stats):
             print(f"{idx}. Тип: {attack.attack_type}")
             print(f"   Payload: {attack.payload[:60]}...")
             print(f"   Endpoint: {attack.endpoint}")
+            if attack.mutation:
+                print(f"   Мутация: {attack.mutation}")
+        if len(missed_attacks) > 5 and stats.get('exports'):
+            print(f"   ... остальные - в выгрузке результатов")
+    
+    # Выгрузка результатов
+    if stats.get('exports'):
+        print(f"\n📦 ВЫГРУЗКА РЕЗУЛЬТАТОВ:")
+        for idx, filename in enumerate(stats['exports'], 1):
+            print(f"{'└─' if idx == len(stats['exports']) else '├─'} {filename}")
+    
+    # История запусков
+    run_store = stats.get('run_store')
+    if run_store:
+        print(f"\n🗄 ИСТОРИЯ ЗАПУСКОВ:")
+        print(f"├─ Сохранено результатов: {run_store['stored']} ({run_store['file']})")
+        print(f"└─ Сравнение с прошлым запуском: python main.py diff previous {run_store['run_id']}")
+    
+    # Соединения
+    conn = stats.get('connection_stats')
+    if conn and conn['requests']:
+        print(f"\n🔌 СОЕДИНЕНИЯ:")
+        print(f"├─ Открыто соединений: {conn['connections_opened']}")
+        print(f"├─ Переиспользовано: {conn['connections_reused']} ({conn['reuse_rate']:.1f}%)")
+        print(f"├─ Handshake: {conn['handshake_time_total']:.2f} сек "
+              f"(в среднем {conn['handshake_time_avg'] * 1000:.1f} мс)")
+        print(f"└─ Запросы: {conn['request_time_total']:.2f} сек "
+              f"(в среднем {conn['request_time_avg'] * 1000:.1f} мс)")
+    
+    # Задержки
+    latency = stats.get('latency')
+    if latency and latency['phases']:
+        print(f"\n⏲ ЗАДЕРЖКИ (p50 / p90 / p99 / p99.9, мс):")
+        print_latency_rows(latency['phases'], print)
+        outcome = latency.get('by_outcome', {})
+        if 'blocked' in outcome and 'allowed' in outcome:
+            blocked = outcome['blocked']['total']['p50_ms']
+            allowed = outcome['allowed']['total']['p50_ms']
+            print(f"   Медиана: заблокированные {blocked:.1f} мс, пропущенные {allowed:.1f} мс")
+    
+    # Ограничение скорости
+    rate_limit = stats.get('rate_limit')
+    if rate_limit and rate_limit['enabled']:
+        print(f"\n🚦 ОГРАНИЧЕНИЕ СКОРОСТИ:")
+        print(f"├─ Итоговый лимит: {rate_limit['rate']:.1f} запр/сек"
+              f"{' (адаптивный)' if rate_limit['adaptive'] else ''}")
+        print(f"├─ Снижений скорости: {rate_limit['backoffs']}")
+        print(f"└─ Суммарное ожидание: {rate_limit['throttled_time']:.2f} сек")
     
     # Время выполнения
     exec_time = stats.get('execution_time', 0)
@@ -81,13 +169,64 @@ def print_console_report(stats):
     print("="*50 + "\n")
 
 
-def save_report_json(stats, filename):
+def print_latency_rows(phases, write):
     """
-    Сохранить отчёт в JSON формат
+    Вывести перцентили по фазам запроса
+    
+    Args:
+        phases (Dict): Сводки гистограмм по фазам
+        write (Callable): Функция вывода строки
+    """
+    names = [phase for phase in PHASES if phase in phases]
+    for idx, phase in enumerate(names):
+        h = phases[phase]
+        branch = "└─" if idx == len(names) - 1 else "├─"
+        write(f"{branch} {phase:<8} {h['p50_ms']:8.2f} {h['p90_ms']:8.2f} "
+              f"{h['p99_ms']:8.2f} {h['p999_ms']:8.2f}")
+
+
+def print_transform_rows(by_transform, write):
+    """
+    Вывести долю блокировок по преобразованиям, начиная с наименьшей
+    
+    Args:
+        by_transform (Dict): Статистика по преобразованиям
+        write (Callable): Функция вывода строки
+    """
+    # Исходные payload - база для сравнения, идут первыми
+    names = sorted(by_transform, key=lambda n: (n != ORIGINAL, by_transform[n]['detection_rate']))
+    for idx, name in enumerate(names):
+        entry = by_transform[name]
+        branch = "└─" if idx == len(names) - 1 else "├─"
+        write(f"{branch} {name:<18} {entry['blocked']:>8}/{entry['sent']:<8} "
+              f"({entry['detection_rate']:.1f}%)")
+
+
+def print_search_rows(search, write):
+    """
+    Вывести итоги адаптивного поиска обходов
+    
+    Args:
+        search (Dict): Сводка BypassSearch.as_dict()
+        write (Callable): Функция вывода строки
+    """
+    write(f"├─ Запросов: {search['requests']} из {search['full_space']} "
+          f"при полном переборе (в {search['savings']:.1f} раза меньше)")
+    write(f"├─ Раундов: {search['rounds']}, остановка: {search['stop_reason']}")
+    write(f"├─ Исключено цепочек: {search['pruned_chains']}")
+    write(f"└─ Обходы найдены для {search['covered']}/{search['payloads']} payload "
+          f"({search['coverage']:.1f}%), всего обходов: {search['bypasses']}")
+
+
+def build_report_summary(stats):
+    """
+    Сводная часть отчёта без списка пропущенных атак
     
     Args:
         stats (Dict): Статистика
-        filename (str): Имя файла
+    
+    Returns:
+        Dict: Сводка для JSON отчёта
     """
     report = {
         "timestamp": datetime.now().isoformat(),
@@ -98,29 +237,83 @@ def save_report_json(stats, filename):
             "detection_rate": round(stats['detection_rate'], 2)
         },
         "by_attack_type": stats['stats_by_type'],
+        "by_endpoint": stats.get('stats_by_endpoint', {}),
+        "by_parameter": stats.get('stats_by_parameter', {}),
+        "status_codes": {str(code): count for code, count in stats.get('status_codes', {}).items()},
         "top_rules": [
             {
                 "rule_id": rule_id,
                 "count": count
             }
             for rule_id, count in stats['top_rules']
-        ],
-        "missed_attacks": [
-            {
-                "type": attack.attack_type,
-                "payload": attack.payload,
-                "endpoint": attack.endpoint
-            }
-            for attack in stats['missed_attacks']
         ]
     }
     
+    if stats.get('stats_by_transform'):
+        report["by_transform"] = stats['stats_by_transform']
+        report["by_mutation"] = stats['stats_by_mutation']
+    if stats.get('search'):
+        report["search"] = stats['search']
+    if stats.get('cache'):
+        report["cache"] = stats['cache']
+    if stats.get('connection_stats'):
+        report["connections"] = stats['connection_stats']
+    if stats.get('rate_limit'):
+        report["rate_limit"] = stats['rate_limit']
+    if stats.get('latency'):
+        report["latency"] = stats['latency']
+    if stats.get('exports'):
+        report["exports"] = stats['exports']
+    if stats.get('lost_payloads'):
+        report["summary"]["lost_payloads"] = stats['lost_payloads']
+    return report
+
+
+def save_report_json(stats, filename):
+    """
+    Сохранить отчёт в JSON формат
+    
+    Args:
+        stats (Dict): Статистика
+        filename (str): Имя файла
+    """
+    report = build_report_summary(stats)
+    report["missed_attacks"] = [
+        {
+            "type": attack.attack_type,
+            "payload": attack.payload,
+            "endpoint": attack.endpoint,
+            "mutation": attack.mutation
+        }
+        for attack in stats['missed_attacks']
+    ]
+    
     with open(filename, 'w', encoding='utf-8') as f:
         json.dump(report, f, ensure_ascii=False, indent=2)
     
     print(f"[✓] JSON отчёт сохранён: {filename}")
 
 
+def save_summary_json(stats, filename):
+    """
+    Сохранить небольшую сводку запуска рядом с потоковой выгрузкой
+    
+    Результаты по запросам лежат в файлах выгрузки, поэтому размер
+    сводки не зависит от числа запросов.
+    
+    Args:
+        stats (Dict): Статистика
+        filename (str): Имя файла
+    """
+    report = build_report_summary(stats)
+    report["summary"]["missed_listed"] = len(stats['missed_attacks'])
+    
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    
+    print(f"[✓] Сводка сохранена: {filename}")
+
+
 def save_report_text(stats, filename):
     """
     Сохранить отчёт в текстовый формат
@@ -143,6 +336,24 @@ def save_report_text(stats, filename):
         f.write(f"├─ Пропущено: {stats['total_missed']} запросов ({100-stats['detection_rate']:.1f}%)\n")
         f.write(f"└─ Время выполнения: {stats.get('execution_time', 0):.2f} сек\n\n")
         
+        # Соединения
+        conn = stats.get('connection_stats')
+        if conn and conn['requests']:
+            f.write("СОЕДИНЕНИЯ:\n")
+            f.write(f"├─ Открыто соединений: {conn['connections_opened']}\n")
+            f.write(f"├─ Переиспользовано: {conn['connections_reused']} ({conn['reuse_rate']:.1f}%)\n")
+            f.write(f"├─ Handshake: {conn['handshake_time_total']:.2f} сек "
+                    f"(в среднем {conn['handshake_time_avg'] * 1000:.1f} мс)\n")
+            f.write(f"└─ Запросы: {conn['request_time_total']:.2f} сек "
+                    f"(в среднем {conn['request_time_avg'] * 1000:.1f} мс)\n\n")
+        
+        # Задержки
+        latency = stats.get('latency')
+        if latency and latency['phases']:
+            f.write("ЗАДЕРЖКИ (p50 / p90 / p99 / p99.9, мс):\n")
+            print_latency_rows(latency['phases'], lambda line: f.write(line + "\n"))
+            f.write("\n")
+        
         # По типам атак
         f.write("СТАТИСТИКА ПО ТИПАМ АТАК:\n")
         for attack_type, type_stats in stats['stats_by_type'].items():
@@ -151,6 +362,23 @@ def save_report_text(stats, filename):
             f.write(f"│  ├─ Заблокировано: {type_stats['blocked']} ({type_stats['detection_rate']:.1f}%)\n")
             f.write(f"│  └─ Пропущено: {type_stats['missed']}\n")
         
+        # По endpoint
+        if stats.get('stats_by_endpoint'):
+            f.write("\nСТАТИСТИКА ПО ENDPOINT:\n")
+            for endpoint, endpoint_stats in stats['stats_by_endpoint'].items():
+                f.write(f"├─ {endpoint}: {endpoint_stats['blocked']}/{endpoint_stats['sent']} "
+                        f"({endpoint_stats['detection_rate']:.1f}%)\n")
+        
+        # По преобразованиям
+        if stats.get('stats_by_transform'):
+            f.write("\nДОЛЯ БЛОКИРОВОК ПО ПРЕОБРАЗОВАНИЯМ:\n")
+            print_transform_rows(stats['stats_by_transform'], lambda line: f.write(line + "\n"))
+        
+        # Адаптивный поиск
+        if stats.get('search'):
+            f.write("\nАДАПТИВНЫЙ ПОИСК ОБХОДОВ:\n")
+            print_search_rows(stats['search'], lambda line: f.write(line + "\n"))
+        
         # Топ правил
         f.write("\nТОП ПРАВИЛ:\n")
         for idx, (rule_id, count) in enumerate(stats['top_rules'], 1):
@@ -164,3 +392,380 @@ def save_report_text(stats, filename):
     
     print(f"[✓] Текстовый отчёт сохранён: {filename}")
 
+
+
+def export_row(result):
+    """
+    Плоская строка выгрузки в порядке EXPORT_COLUMNS
+    
+    Args:
+        result (TestResult): Окончательный результат запроса
+    
+    Returns:
+        List: Значения колонок
+    """
+    status_code = result.status_code
+    error = None
+    if not isinstance(status_code, int):
+        status_code, error = None, status_code
+    timings = result.timings or (None,) * len(PHASES)
+    return [
+        result.request_id, result.attack_type, result.endpoint, result.parameter,
+        result.payload, result.mutation, status_code, error, result.was_blocked,
+        ";".join(result.blocked_by_rules), result.log_matched,
+        result.response_time, result.connect_time, result.sent_time,
+    ] + [None if value is None else value / 1e6 for value in timings]
+
+
+class CsvExporter:
+    """Потоковая запись результатов в CSV (строка на запрос)"""
+    
+    def __init__(self, filename):
+        """
+        Инициализация записи
+        
+        Args:
+            filename (str): Путь к файлу
+        """
+        self.filename = filename
+        self.count = 0
+        self._file = open(filename, 'w', encoding='utf-8', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(EXPORT_COLUMNS)
+    
+    def add(self, result):
+        """
+        Записать результат
+        
+        Args:
+            result (TestResult): Окончательный результат запроса
+        """
+        self._writer.writerow(export_row(result))
+        self.count += 1
+    
+    def close(self):
+        """
+        Закрыть файл
+        """
+        if not self._file.closed:
+            self._file.close()
+
+
+class ColumnarExporter:
+    """Запись результатов в Parquet или Arrow IPC пачками по колонкам
+    
+    Строки копятся в колонках до EXPORT_BATCH_ROWS и уходят в файл одной
+    пачкой (row group), поэтому память не зависит от размера прогона.
+    Нужен pyarrow.
+    """
+    
+    def __init__(self, filename, kind="parquet", batch_rows=None):
+        """
+        Инициализация записи
+        
+        Args:
+            filename (str): Путь к файлу
+            kind (str): "parquet" или "arrow"
+            batch_rows (int): Строк в одной пачке (по умолчанию EXPORT_BATCH_ROWS)
+        """
+        try:
+            import pyarrow
+        except ImportError:
+            raise ValueError(f"Для выгрузки {kind} установите pyarrow")
+        self.pa = pyarrow
+        self.filename = filename
+        self.kind = kind
+        self.batch_rows = batch_rows or config.EXPORT_BATCH_ROWS
+        self.count = 0
+        self.schema = pyarrow.schema(
+            [
+                ("request_id", pyarrow.string()),
+                ("attack_type", pyarrow.string()),
+                ("endpoint", pyarrow.string()),
+                ("parameter", pyarrow.string()),
+                ("payload", pyarrow.string()),
+                ("mutation", pyarrow.string()),
+                ("status_code", pyarrow.int32()),
+                ("error", pyarrow.string()),
+                ("was_blocked", pyarrow.bool_()),
+                ("blocked_by_rules", pyarrow.string()),
+                ("log_matched", pyarrow.bool_()),
+                ("response_time", pyarrow.float64()),
+                ("connect_time", pyarrow.float64()),
+                ("sent_time", pyarrow.timestamp("us")),
+            ] + [(f"{phase}_ms", pyarrow.float64()) for phase in PHASES]
+        )
+        if kind == "parquet":
+            import pyarrow.parquet
+            self._writer = pyarrow.parquet.ParquetWriter(filename, self.schema)
+        else:
+            import pyarrow.ipc
+            self._writer = pyarrow.ipc.new_file(filename, self.schema)
+        self._columns = [[] for _ in EXPORT_COLUMNS]
+    
+    def add(self, result):
+        """
+        Добавить результат в текущую пачку
+        
+        Args:
+            result (TestResult): Окончательный результат запроса
+        """
+        for column, value in zip(self._columns, export_row(result)):
+            column.append(value)
+        self.count += 1
+        if len(self._columns[0]) >= self.batch_rows:
+            self._flush()
+    
+    def _flush(self):
+        batch = self.pa.RecordBatch.from_arrays(
+            [self.pa.array(column, type=field.type)
+             for column, field in zip(self._columns, self.schema)],
+            schema=self.schema
+        )
+        self._writer.write_batch(batch)
+        self._columns = [[] for _ in EXPORT_COLUMNS]
+    
+    def close(self):
+        """
+        Записать последнюю пачку и закрыть файл
+        """
+        if self._writer is None:
+            return
+        if self._columns[0]:
+            self._flush()
+        self._writer.close()
+        self._writer = None
+
+
+def open_exporters(prefix, formats):
+    """
+    Открыть потоковые выгрузки результатов (приёмники для result_sinks)
+    
+    Args:
+        prefix (str): Путь к файлам без расширения
+        formats (List[str]): Форматы из EXPORT_FORMATS
+    
+    Returns:
+        List: Открытые выгрузки с методами add() и close()
+    """
+    exporters = []
+    try:
+        for kind in formats:
+            if kind not in EXPORT_FORMATS:
+                raise ValueError(f"Неизвестный формат выгрузки: {kind}")
+            filename = prefix + EXPORT_FORMATS[kind]
+            if kind == "jsonl":
+                exporters.append(ResultSpill(filename))
+            elif kind == "csv":
+                exporters.append(CsvExporter(filename))
+            else:
+                exporters.append(ColumnarExporter(filename, kind))
+    except (OSError, ValueError):
+        for exporter in exporters:
+            exporter.close()
+        raise
+    return exporters
+
+
+def print_benchmark_report(summary):
+    """
+    Вывести итоги бенчмарка накладных расходов WAF
+    
+    Args:
+        summary (Dict): Итоги из BenchmarkStats.summary
+    """
+    print("\n" + "="*50)
+    print("  WAF Overhead Benchmark")
+    print("="*50)
+    
+    target = f"{summary['target_rate']:.0f} запр/сек" if summary['target_rate'] else "без ограничения"
+    print(f"\n🚀 ПРОПУСКНАЯ СПОСОБНОСТЬ:")
+    print(f"├─ Заданная скорость: {target}")
+    print(f"├─ Достигнутая: {summary['throughput']:.1f} запр/сек")
+    for kind, counts in summary['counts'].items():
+        print(f"├─ {kind}: {counts['sent']} запросов, заблокировано {counts['blocked']}, "
+              f"ошибок {counts['errors']}")
+    print(f"└─ Длительность: {summary['elapsed']:.2f} сек")
+    
+    print(f"\n⏲ ЗАДЕРЖКА (p50 / p90 / p99 / p99.9, мс):")
+    for kind, h in summary['latency'].items():
+        print(f"├─ {kind:<8} {h['p50_ms']:8.2f} {h['p90_ms']:8.2f} "
+              f"{h['p99_ms']:8.2f} {h['p999_ms']:8.2f}")
+    
+    overhead = summary.get('overhead', {})
+    if 'overhead_p50_ms' in overhead:
+        print(f"└─ Прирост для атак: p50 {overhead['overhead_p50_ms']:+.2f} мс, "
+              f"p99 {overhead['overhead_p99_ms']:+.2f} мс")
+    
+    def print_deltas(title, entries):
+        entries = {k: v for k, v in entries.items() if 'overhead_p50_ms' in v}
+        if not entries:
+            return
+        print(f"\n{title} (прирост p50 / p99, мс):")
+        for idx, (key, h) in enumerate(entries.items()):
+            branch = "└─" if idx == len(entries) - 1 else "├─"
+            base = " *" if h.get('baseline') == "all_control" else ""
+            print(f"{branch} {key}: {h['overhead_p50_ms']:+.2f} / {h['overhead_p99_ms']:+.2f}"
+                  f" (n={h['count']}){base}")
+    
+    print_deltas("📍 ПО ENDPOINT", summary['by_endpoint'])
+    print_deltas("📈 ПО ТИПАМ АТАК", summary['by_type'])
+    if any(h.get('baseline') == "all_control" for h in summary['by_endpoint'].values()):
+        print("   * нет контрольных запросов к endpoint, база - весь контрольный трафик")
+    
+    print("="*50 + "\n")
+
+
+def save_benchmark_json(summary, filename):
+    """
+    Сохранить итоги бенчмарка в JSON
+    
+    Args:
+        summary (Dict): Итоги из BenchmarkStats.summary
+        filename (str): Имя файла
+    """
+    report = {"timestamp": datetime.now().isoformat()}
+    report.update(summary)
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    
+    print(f"[✓] JSON отчёт бенчмарка сохранён: {filename}")
+
+
+def print_log_summary(summary):
+    """
+    Вывести сводку по аудит-логам
+    
+    Args:
+        summary (Dict): Сводка из log_ingest.summarize_logs
+    """
+    print("\n" + "="*50)
+    print("  ModSecurity Audit Log Summary")
+    print("="*50)
+    
+    print(f"\n📄 ЗАПИСИ:")
+    print(f"├─ Источников: {summary['sources']}")
+    print(f"├─ Транзакций: {summary['transactions']}")
+    print(f"├─ Со срабатываниями правил: {summary['with_rules']}")
+    print(f"└─ Период: {summary['first_timestamp'] or '-'} … {summary['last_timestamp'] or '-'}")
+    
+    if summary['top_rules']:
+        print(f"\n🎯 ТОП СРАБАТЫВАЕМЫХ ПРАВИЛ:")
+        for idx, (rule_id, count) in enumerate(summary['top_rules'], 1):
+            print(f"{idx:2d}. Rule {rule_id}: {count} срабатываний")
+    
+    if summary['top_paths']:
+        print(f"\n📍 ТОП ПУТЕЙ:")
+        for idx, (path, count) in enumerate(summary['top_paths'], 1):
+            print(f"{idx:2d}. {path}: {count}")
+    
+    if summary['runs']:
+        print(f"\n🏷 ЗАПУСКИ ТЕСТЕРА:")
+        for run_id, count in summary['runs'].items():
+            print(f"├─ {run_id}: {count} транзакций")
+    
+    print("="*50 + "\n")
+
+
+def save_log_summary_json(summary, filename):
+    """
+    Сохранить сводку по аудит-логам в JSON
+    
+    Args:
+        summary (Dict): Сводка из log_ingest.summarize_logs
+        filename (str): Имя файла
+    """
+    report = {"timestamp": datetime.now().isoformat()}
+    report.update(summary)
+    report["top_rules"] = [{"rule_id": r, "count": c} for r, c in summary['top_rules']]
+    report["top_paths"] = [{"path": p, "count": c} for p, c in summary['top_paths']]
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    
+    print(f"[✓] JSON сводка логов сохранена: {filename}")
+
+
+def _run_title(run):
+    started = datetime.fromtimestamp(run['started']).strftime('%Y-%m-%d %H:%M')
+    ruleset = f", правила {run['ruleset']}" if run.get('ruleset') else ""
+    return (f"{run['run_id']} ({started}{ruleset}): "
+            f"{run['blocked']}/{run['sent']} ({run['detection_rate']:.1f}%)")
+
+
+def print_diff_report(diff, limit=20):
+    """
+    Вывести сравнение двух запусков
+    
+    Args:
+        diff (Dict): Результат RunStore.diff
+        limit (int): Сколько payload показать в каждом списке
+    """
+    print("\n" + "="*50)
+    print("  WAF Run Diff")
+    print("="*50)
+    
+    print(f"\n🏷 ЗАПУСКИ:")
+    print(f"├─ Прежний: {_run_title(diff['base'])}")
+    print(f"└─ Новый:   {_run_title(diff['head'])}")
+    
+    for title, entries in (("⚠ РЕГРЕССИИ (были заблокированы, теперь пропущены)", diff['regressions']),
+                           ("✅ УЛУЧШЕНИЯ (были пропущены, теперь заблокированы)", diff['improvements'])):
+        print(f"\n{title}: {len(entries)}")
+        for idx, entry in enumerate(entries[:limit], 1):
+            rules = f" [{', '.join(entry['rules'])}]" if entry['rules'] else ""
+            base_status, head_status = entry['status']
+            print(f"{idx:2d}. {entry['request_id']} {entry['attack_type']} {entry['endpoint']} "
+                  f"{base_status} → {head_status}{rules}")
+            print(f"    Payload: {entry['payload'][:60]}")
+        if len(entries) > limit:
+            print(f"    ... и ещё {len(entries) - limit}")
+    
+    print("="*50 + "\n")
+
+
+def save_diff_json(diff, filename):
+    """
+    Сохранить сравнение двух запусков в JSON
+    
+    Args:
+        diff (Dict): Результат RunStore.diff
+        filename (str): Имя файла
+    """
+    report = {"timestamp": datetime.now().isoformat()}
+    report.update(diff)
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    
+    print(f"[✓] JSON сравнение сохранено: {filename}")
+
+
+def print_trends(runs, trends, window):
+    """
+    Вывести историю запусков и тренды доли блокировок по типам атак
+    
+    Args:
+        runs (List[Dict]): Запуски из RunStore.runs (от новых к старым)
+        trends (Dict): Результат RunStore.trends
+        window (int): Запусков в скользящем окне
+    """
+    print("\n" + "="*50)
+    print("  WAF Detection Trends")
+    print("="*50)
+    
+    print(f"\n🏷 ЗАПУСКИ ({len(runs)}):")
+    for idx, run in enumerate(runs):
+        print(f"{'└─' if idx == len(runs) - 1 else '├─'} {_run_title(run)}")
+    
+    print(f"\n📈 ДОЛЯ БЛОКИРОВОК ПО ТИПАМ АТАК (запуск / среднее за {window}):")
+    for attack_type, points in trends.items():
+        last = points[-1]
+        change = ""
+        if len(points) > 1:
+            delta = last['detection_rate'] - points[-2]['detection_rate']
+            change = f", изменение {delta:+.1f}%"
+        history = " ".join(f"{point['detection_rate']:.0f}" for point in points)
+        print(f"├─ {attack_type.upper().replace('_', ' ')}: {last['detection_rate']:.1f}% / "
+              f"{last['rolling_rate']:.1f}%{change}")
+        print(f"│  └─ {history}")
+    
+    print("="*50 + "\n")
@@ -0,0 +1,126 @@
+# result_sink.py
+"""
+Потоковая запись результатов тестирования на диск
+"""
+
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+from latency import PHASES, timings_to_ms
+
+
+def result_to_record(result):
+    """
+    Преобразовать результат в словарь для сериализации
+
+    Args:
+        result (TestResult): Результат отправки
+
+    Returns:
+        Dict: Плоская запись результата
+    """
+    return {
+        "request_id": result.request_id,
+        "attack_type": result.attack_type,
+        "endpoint": result.endpoint,
+        "parameter": result.parameter,
+        "payload": result.payload,
+        "mutation": result.mutation,
+        "status_code": result.status_code,
+        "was_blocked": result.was_blocked,
+        "blocked_by_rules": list(result.blocked_by_rules),
+        "log_matched": result.log_matched,
+        "response_time": result.response_time,
+        "connect_time": result.connect_time,
+        "timings_ms": timings_to_ms(result.timings),
+        "sent_time": result.sent_time.isoformat() if result.sent_time else None,
+    }
+
+
+def record_to_result(record):
+    """
+    Восстановить результат из записи result_to_record
+
+    Args:
+        record (Dict): Запись из JSONL файла результатов
+
+    Returns:
+        SimpleNamespace: Объект с полями TestResult
+    """
+    timings_ms = record.get("timings_ms")
+    timings = None
+    if timings_ms is not None:
+        timings = tuple(
+            int(timings_ms[phase] * 1e6) if phase in timings_ms else None
+            for phase in PHASES
+        )
+    sent_time = record.get("sent_time")
+    return SimpleNamespace(
+        request_id=record["request_id"],
+        attack_type=record["attack_type"],
+        endpoint=record["endpoint"],
+        parameter=record.get("parameter"),
+        payload=record["payload"],
+        mutation=record.get("mutation"),
+        status_code=record.get("status_code"),
+        was_blocked=record.get("was_blocked", False),
+        blocked_by_rules=tuple(record.get("blocked_by_rules") or ()),
+        log_matched=record.get("log_matched", False),
+        response_time=record.get("response_time", 0),
+        connect_time=record.get("connect_time", 0),
+        timings=timings,
+        sent_time=datetime.fromisoformat(sent_time) if sent_time else None,
+    )
+
+
+def load_results(filename):
+    """
+    Прочитать результаты из JSONL файла (RESULTS_SPILL_FILE)
+
+    Args:
+        filename (str): Путь к файлу
+
+    Yields:
+        SimpleNamespace: Результаты в порядке записи
+    """
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield record_to_result(json.loads(line))
+
+
+class ResultSpill:
+    """Запись результатов в JSONL файл по одному на строку"""
+
+    def __init__(self, filename, flush_every=1000):
+        """
+        Инициализация записи
+
+        Args:
+            filename (str): Путь к файлу
+            flush_every (int): Сбрасывать буфер на диск каждые N записей
+        """
+        self.filename = filename
+        self.flush_every = flush_every
+        self.count = 0
+        self._file = open(filename, 'w', encoding='utf-8')
+
+    def add(self, result):
+        """
+        Записать результат
+
+        Args:
+            result (TestResult): Окончательный результат запроса
+        """
+        self._file.write(json.dumps(result_to_record(result), ensure_ascii=False) + "\n")
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self._file.flush()
+
+    def close(self):
+        """
+        Закрыть файл
+        """
+        if not self._file.closed:
+            self._file.close()
@@ -0,0 +1,235 @@
+# result_table.py
+"""
+Компактное колоночное хранение результатов тестирования
+"""
+
+import sys
+from array import array
+from datetime import datetime
+
+# Нечисловые статусы кодируются отрицательными числами
+_STATUS_CODES = {"TIMEOUT": -1, "CONNECTION_ERROR": -2}
+_STATUS_NAMES = {code: name for name, code in _STATUS_CODES.items()}
+_STATUS_ERROR = -3
+_STATUS_NONE = -4
+
+
+class _Interner:
+    """Таблица строк: строка <-> небольшой целый номер"""
+
+    def __init__(self):
+        self.values = []
+        self.ids = {}
+
+    def id_for(self, value):
+        idx = self.ids.get(value)
+        if idx is None:
+            idx = self.ids[value] = len(self.values)
+            self.values.append(sys.intern(value) if isinstance(value, str) else value)
+        return idx
+
+
+class ResultView:
+    """Представление строки таблицы с интерфейсом TestResult (только чтение)"""
+
+    __slots__ = ("_table", "_idx")
+
+    def __init__(self, table, idx):
+        self._table = table
+        self._idx = idx
+
+    @property
+    def request_id(self):
+        return self._table.request_ids[self._idx]
+
+    @property
+    def payload(self):
+        return self._table.payloads[self._idx]
+
+    @property
+    def attack_type(self):
+        return self._table.strings.values[self._table.attack_types[self._idx]]
+
+    @property
+    def endpoint(self):
+        return self._table.strings.values[self._table.endpoints[self._idx]]
+
+    @property
+    def parameter(self):
+        return self._table.strings.values[self._table.parameters[self._idx]]
+
+    @property
+    def mutation(self):
+        return self._table.strings.values[self._table.mutations[self._idx]]
+
+    @property
+    def correlation_id(self):
+        return None
+
+    @property
+    def was_blocked(self):
+        return bool(self._table.flags[self._idx] & ResultTable.FLAG_BLOCKED)
+
+    @property
+    def log_matched(self):
+        return bool(self._table.flags[self._idx] & ResultTable.FLAG_LOG_MATCHED)
+
+    @property
+    def status_code(self):
+        return self._table.status_of(self._idx)
+
+    @property
+    def response_time(self):
+        return self._table.response_times[self._idx]
+
+    @property
+    def connect_time(self):
+        return self._table.connect_times[self._idx]
+
+    @property
+    def sent_ts(self):
+        ts = self._table.sent_ts[self._idx]
+        return ts or None
+
+    @property
+    def sent_time(self):
+        ts = self._table.sent_ts[self._idx]
+        return datetime.fromtimestamp(ts) if ts else None
+
+    @property
+    def timings(self):
+        # Фазы запроса в таблице не хранятся, они учтены в гистограммах
+        return None
+
+    @property
+    def blocked_by_rules(self):
+        return self._table.rules_of(self._idx)
+
+
+class ResultTable:
+    """Результаты в массивах array: по несколько байт на поле вместо объекта на запрос
+
+    Строковые поля с малым числом значений (тип атаки, endpoint, параметр,
+    цепочка мутаций) интернируются в номера uint32, статусы хранятся как int16, id правил упакованы в общий
+    целочисленный массив со смещениями. Строки payload не копируются - таблица
+    хранит ссылки на строки из набора payload.
+    """
+
+    FLAG_BLOCKED = 1
+    FLAG_LOG_MATCHED = 2
+
+    def __init__(self):
+        self.request_ids = []
+        self.payloads = []
+        # Номера строк общей таблицы: uint32, т.к. у больших наборов
+        # endpoint и параметров вместе может быть больше 65535
+        self.strings = _Interner()
+        self.attack_types = array('I')
+        self.endpoints = array('I')
+        self.parameters = array('I')
+        self.mutations = array('I')
+        self.flags = array('B')
+        self.status_codes = array('h')
+        self.response_times = array('f')
+        self.connect_times = array('f')
+        self.sent_ts = array('d')
+        # Правила строки i: rule_values[rule_offsets[i]:rule_offsets[i + 1]]
+        self.rule_offsets = array('I', [0])
+        self.rule_values = array('q')
+        self.rule_names = _Interner()
+        self.error_messages = {}
+
+    def __len__(self):
+        return len(self.flags)
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        return ResultView(self, idx)
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield ResultView(self, idx)
+
+    def _encode_status(self, idx, status_code):
+        if isinstance(status_code, int):
+            return status_code
+        if status_code is None:
+            return _STATUS_NONE
+        if status_code in _STATUS_CODES:
+            return _STATUS_CODES[status_code]
+        self.error_messages[idx] = status_code
+        return _STATUS_ERROR
+
+    def _encode_rule(self, rule_id):
+        # Числовые id правил хранятся как есть, прочие - через таблицу строк.
+        # Число - только если оно восстанавливается в ту же строку: "0123"
+        # и цифры Unicode ("²") идут в таблицу строк
+        if rule_id.isascii() and rule_id.isdigit():
+            value = int(rule_id)
+            if value < 2 ** 63 and str(value) == rule_id:
+                return value
+        return -1 - self.rule_names.id_for(rule_id)
+
+    def append(self, result):
+        """
+        Добавить результат в таблицу
+
+        Args:
+            result (TestResult): Окончательный результат запроса
+        """
+        idx = len(self)
+        self.request_ids.append(result.request_id)
+        self.payloads.append(result.payload)
+        self.attack_types.append(self.strings.id_for(result.attack_type))
+        self.endpoints.append(self.strings.id_for(result.endpoint))
+        self.parameters.append(self.strings.id_for(result.parameter))
+        self.mutations.append(self.strings.id_for(result.mutation))
+        self.flags.append(
+            (self.FLAG_BLOCKED if result.was_blocked else 0)
+            | (self.FLAG_LOG_MATCHED if result.log_matched else 0)
+        )
+        self.status_codes.append(self._encode_status(idx, result.status_code))
+        self.response_times.append(result.response_time or 0.0)
+        self.connect_times.append(result.connect_time or 0.0)
+        self.sent_ts.append(result.sent_ts or 0.0)
+        for rule_id in result.blocked_by_rules:
+            self.rule_values.append(self._encode_rule(rule_id))
+        self.rule_offsets.append(len(self.rule_values))
+
+    def status_of(self, idx):
+        """
+        Восстановить статус ответа строки
+
+        Args:
+            idx (int): Номер строки
+
+        Returns:
+            int|str: HTTP статус или код ошибки
+        """
+        code = self.status_codes[idx]
+        if code >= 0:
+            return code
+        if code == _STATUS_ERROR:
+            return self.error_messages.get(idx, "ERROR")
+        if code == _STATUS_NONE:
+            return None
+        return _STATUS_NAMES[code]
+
+    def rules_of(self, idx):
+        """
+        Восстановить id сработавших правил строки
+
+        Args:
+            idx (int): Номер строки
+
+        Returns:
+            Tuple[str]: Идентификаторы правил
+        """
+        values = self.rule_values[self.rule_offsets[idx]:self.rule_offsets[idx + 1]]
+        return tuple(
+            str(v) if v >= 0 else self.rule_names.values[-1 - v]
+            for v in values
+        )
@@ -0,0 +1,361 @@
+# run_store.py
+"""
+История запусков в SQLite: сравнение запусков и тренды доли блокировок
+"""
+
+import sqlite3
+import threading
+import time
+
+import config
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    target TEXT NOT NULL,
+    ruleset TEXT,
+    started REAL NOT NULL,
+    finished REAL,
+    sent INTEGER NOT NULL DEFAULT 0,
+    blocked INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs (started);
+CREATE TABLE IF NOT EXISTS results (
+    run_id TEXT NOT NULL,
+    request_id TEXT NOT NULL,
+    attack_type TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    parameter TEXT,
+    mutation TEXT,
+    payload TEXT NOT NULL,
+    status_code INTEGER,
+    error TEXT,
+    blocked INTEGER NOT NULL,
+    rules TEXT NOT NULL,
+    response_time REAL,
+    PRIMARY KEY (run_id, request_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_results_payload ON results (request_id, run_id);
+CREATE INDEX IF NOT EXISTS idx_results_endpoint ON results (endpoint, run_id);
+CREATE TABLE IF NOT EXISTS result_rules (
+    rule_id TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    request_id TEXT NOT NULL,
+    PRIMARY KEY (rule_id, run_id, request_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS run_types (
+    run_id TEXT NOT NULL,
+    attack_type TEXT NOT NULL,
+    sent INTEGER NOT NULL,
+    blocked INTEGER NOT NULL,
+    PRIMARY KEY (run_id, attack_type)
+) WITHOUT ROWID;
+"""
+
+# Изменившиеся вердикты одним запросом по первичному ключу обоих запусков;
+# ошибки отправки (status_code NULL) не сравниваются
+_DIFF_QUERY = """
+SELECT head.request_id, head.attack_type, head.endpoint, head.parameter, head.mutation,
+       head.payload, base.status_code, head.status_code, base.rules, head.rules, head.blocked
+FROM results AS head
+JOIN results AS base ON base.run_id = :base AND base.request_id = head.request_id
+WHERE head.run_id = :head
+  AND head.blocked != base.blocked
+  AND head.status_code IS NOT NULL AND base.status_code IS NOT NULL
+  {filters}
+ORDER BY head.blocked, head.attack_type, head.request_id
+"""
+
+# Доля блокировок по типу атаки и скользящая доля за окно запусков
+_TRENDS_QUERY = """
+SELECT runs.run_id, runs.started, run_types.attack_type, run_types.sent, run_types.blocked,
+       SUM(run_types.blocked) OVER recent, SUM(run_types.sent) OVER recent
+FROM run_types
+JOIN runs ON runs.run_id = run_types.run_id
+WHERE runs.run_id IN (
+    SELECT run_id FROM runs WHERE finished IS NOT NULL ORDER BY started DESC LIMIT :limit
+)
+WINDOW recent AS (
+    PARTITION BY run_types.attack_type ORDER BY runs.started
+    ROWS BETWEEN :preceding PRECEDING AND CURRENT ROW
+)
+ORDER BY run_types.attack_type, runs.started
+"""
+
+
+class RunStore:
+    """Результаты всех запусков в одном файле SQLite
+
+    Результаты текущего запуска копятся пачками (RUN_STORE_BATCH) и
+    записываются одной транзакцией. Индексы по id payload, endpoint, id
+    правила и запуску позволяют сравнить два запуска одним запросом.
+    """
+
+    def __init__(self, path=None):
+        """
+        Открыть хранилище
+
+        Args:
+            path (str): Файл SQLite (по умолчанию RUN_STORE_FILE)
+        """
+        self.path = path or config.RUN_STORE_FILE
+        self.run_id = None
+        self.stored = 0
+        self._rows = []
+        self._rules = []
+        self._lock = threading.Lock()
+
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_SCHEMA)
+        self.db.commit()
+
+    def start_run(self, run_id, target_url, ruleset=None):
+        """
+        Начать запись запуска (после этого хранилище - приёмник результатов)
+
+        Args:
+            run_id (str): ID запуска
+            target_url (str): Целевой сервер
+            ruleset (str): Версия или хэш набора правил
+        """
+        self.run_id = run_id
+        with self._lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO runs (run_id, target, ruleset, started) VALUES (?, ?, ?, ?)",
+                (run_id, target_url, ruleset, time.time())
+            )
+            self.db.commit()
+
+    def add(self, result):
+        """
+        Добавить результат текущего запуска
+
+        Args:
+            result (TestResult): Окончательный результат запроса
+        """
+        status_code = result.status_code
+        error = None
+        if not isinstance(status_code, int):
+            status_code, error = None, status_code
+        rules = result.blocked_by_rules
+        with self._lock:
+            self._rows.append((
+                self.run_id, result.request_id, result.attack_type, result.endpoint,
+                result.parameter, result.mutation, result.payload, status_code, error,
+                int(result.was_blocked), ",".join(rules), result.response_time,
+            ))
+            for rule_id in rules:
+                self._rules.append((rule_id, self.run_id, result.request_id))
+            if len(self._rows) >= config.RUN_STORE_BATCH:
+                self._flush()
+
+    def _flush(self):
+        self.db.executemany(
+            "INSERT OR REPLACE INTO results (run_id, request_id, attack_type, endpoint, parameter, "
+            "mutation, payload, status_code, error, blocked, rules, response_time) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            self._rows
+        )
+        self.db.executemany(
+            "INSERT OR IGNORE INTO result_rules (rule_id, run_id, request_id) VALUES (?, ?, ?)",
+            self._rules
+        )
+        self.db.commit()
+        self.stored += len(self._rows)
+        self._rows = []
+        self._rules = []
+
+    def close(self):
+        """
+        Записать оставшиеся результаты, итоги запуска и закрыть файл
+        """
+        with self._lock:
+            if self.db is None:
+                return
+            if self.run_id is not None:
+                self._flush()
+                self.db.execute("DELETE FROM run_types WHERE run_id = ?", (self.run_id,))
+                self.db.execute(
+                    "INSERT INTO run_types (run_id, attack_type, sent, blocked) "
+                    "SELECT run_id, attack_type, COUNT(*), SUM(blocked) FROM results "
+                    "WHERE run_id = ? GROUP BY attack_type",
+                    (self.run_id,)
+                )
+                self.db.execute(
+                    "UPDATE runs SET finished = ?, "
+                    "sent = (SELECT COALESCE(SUM(sent), 0) FROM run_types WHERE run_id = ?), "
+                    "blocked = (SELECT COALESCE(SUM(blocked), 0) FROM run_types WHERE run_id = ?) "
+                    "WHERE run_id = ?",
+                    (time.time(), self.run_id, self.run_id, self.run_id)
+                )
+                self.db.commit()
+            self.db.close()
+            self.db = None
+
+    @staticmethod
+    def _run_dict(row):
+        run_id, target, ruleset, started, sent, blocked = row
+        return {
+            "run_id": run_id,
+            "target": target,
+            "ruleset": ruleset,
+            "started": started,
+            "sent": sent,
+            "blocked": blocked,
+            "detection_rate": blocked / sent * 100 if sent else 0,
+        }
+
+    def runs(self, limit=20):
+        """
+        Последние завершённые запуски
+
+        Args:
+            limit (int): Сколько запусков вернуть
+
+        Returns:
+            List[Dict]: Запуски от новых к старым
+        """
+        rows = self.db.execute(
+            "SELECT run_id, target, ruleset, started, sent, blocked FROM runs "
+            "WHERE finished IS NOT NULL ORDER BY started DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+        return [self._run_dict(row) for row in rows]
+
+    def run_info(self, run_id):
+        """
+        Итоги одного запуска
+
+        Args:
+            run_id (str): ID запуска
+
+        Returns:
+            Dict: Запуск (как в runs())
+        """
+        row = self.db.execute(
+            "SELECT run_id, target, ruleset, started, sent, blocked FROM runs WHERE run_id = ?",
+            (run_id,)
+        ).fetchone()
+        return self._run_dict(row)
+
+    def resolve(self, ref):
+        """
+        Найти запуск по ID или по номеру с конца
+
+        Args:
+            ref (str): ID запуска, "latest", "previous" или "-N" (N-й с конца)
+
+        Returns:
+            str: ID запуска
+
+        Raises:
+            ValueError: Запуск не найден
+        """
+        aliases = {"latest": "-1", "previous": "-2"}
+        ref = aliases.get(ref, ref)
+        if ref.startswith("-") and ref[1:].isdigit():
+            row = self.db.execute(
+                "SELECT run_id FROM runs WHERE finished IS NOT NULL "
+                "ORDER BY started DESC LIMIT 1 OFFSET ?",
+                (int(ref[1:]) - 1,)
+            ).fetchone()
+        else:
+            row = self.db.execute("SELECT run_id FROM runs WHERE run_id = ?", (ref,)).fetchone()
+        if row is None:
+            raise ValueError(f"Запуск не найден: {ref}")
+        return row[0]
+
+    def diff(self, base, head, attack_type=None, endpoint=None, rule_id=None):
+        """
+        Payload, вердикт которых изменился между двумя запусками
+
+        Args:
+            base (str): Ссылка на прежний запуск (см. resolve)
+            head (str): Ссылка на новый запуск
+            attack_type (str): Только этот тип атаки
+            endpoint (str): Только этот endpoint
+            rule_id (str): Только payload, заблокированные этим правилом в одном из запусков
+
+        Returns:
+            Dict: Запуски, регрессии (были заблокированы, стали пропущены) и улучшения
+        """
+        params = {"base": self.resolve(base), "head": self.resolve(head)}
+        filters = []
+        if attack_type:
+            filters.append("AND head.attack_type = :attack_type")
+            params["attack_type"] = attack_type
+        if endpoint:
+            filters.append("AND head.endpoint = :endpoint")
+            params["endpoint"] = endpoint
+        if rule_id:
+            filters.append(
+                "AND EXISTS (SELECT 1 FROM result_rules WHERE rule_id = :rule_id "
+                "AND run_id IN (:base, :head) AND request_id = head.request_id)"
+            )
+            params["rule_id"] = rule_id
+        rows = self.db.execute(_DIFF_QUERY.format(filters=" ".join(filters)), params).fetchall()
+
+        regressions = []
+        improvements = []
+        for (request_id, attack_type_, endpoint_, parameter, mutation, payload,
+             base_status, head_status, base_rules, head_rules, blocked) in rows:
+            entry = {
+                "request_id": request_id,
+                "attack_type": attack_type_,
+                "endpoint": endpoint_,
+                "parameter": parameter,
+                "mutation": mutation,
+                "payload": payload,
+                "status": [base_status, head_status],
+                "rules": base_rules.split(",") if base_rules else head_rules.split(",") if head_rules else [],
+            }
+            (improvements if blocked else regressions).append(entry)
+
+        return {
+            "base": self.run_info(params["base"]),
+            "head": self.run_info(params["head"]),
+            "regressions": regressions,
+            "improvements": improvements,
+        }
+
+    def trends(self, window=None, limit=20):
+        """
+        Доля блокировок по типам атак в последних запусках
+
+        Args:
+            window (int): Запусков в скользящем окне (по умолчанию TREND_WINDOW)
+            limit (int): Сколько последних запусков показать
+
+        Returns:
+            Dict[str, List[Dict]]: Тип атаки -> запуски от старых к новым
+        """
+        window = window or config.TREND_WINDOW
+        rows = self.db.execute(
+            _TRENDS_QUERY, {"limit": limit, "preceding": max(window - 1, 0)}
+        ).fetchall()
+        trends = {}
+        for run_id, started, attack_type, sent, blocked, window_blocked, window_sent in rows:
+            trends.setdefault(attack_type, []).append({
+                "run_id": run_id,
+                "started": started,
+                "sent": sent,
+                "blocked": blocked,
+                "detection_rate": blocked / sent * 100 if sent else 0,
+                "rolling_rate": window_blocked / window_sent * 100 if window_sent else 0,
+            })
+        return trends
+
+    def as_dict(self):
+        """
+        Сводка записи текущего запуска для отчёта
+
+        Returns:
+            Dict: ID запуска, файл и число сохранённых результатов
+        """
+        return {
+            "run_id": self.run_id,
+            "file": self.path,
+            "stored": self.stored + len(self._rows),
+        }
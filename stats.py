@@ -0,0 +1,154 @@
+# stats.py
+"""
+Инкрементальная статистика по результатам тестирования
+"""
+
+import heapq
+import threading
+
+import config
+from mutations import split_chain
+
+
+def _rate_entry(sent, blocked):
+    return {
+        "sent": sent,
+        "blocked": blocked,
+        "missed": sent - blocked,
+        "detection_rate": (blocked / sent * 100) if sent else 0
+    }
+
+
+class StatsAggregator:
+    """Счётчики, обновляемые по мере поступления результатов
+
+    Каждый результат учитывается за один проход по типу атаки, endpoint,
+    параметру, цепочке мутаций, статусу ответа и правилам. Снимок не
+    перебирает результаты, его стоимость зависит только от числа различных
+    ключей.
+    """
+
+    def __init__(self, max_missed=None, top_n=10):
+        """
+        Инициализация агрегатора
+
+        Args:
+            max_missed (int): Сколько пропущенных атак хранить для отчёта (None - все)
+            top_n (int): Размер топа правил
+        """
+        self.max_missed = max_missed
+        self.top_n = top_n
+        self.total_sent = 0
+        self.total_blocked = 0
+        # Типы из конфигурации идут первыми, остальные - по мере появления
+        self.by_type = {attack_type: [0, 0] for attack_type in config.ATTACK_TYPES}
+        self.by_endpoint = {}
+        self.by_parameter = {}
+        # Только для вариантов из MutatedCorpus
+        self.by_mutation = {}
+        self.status_codes = {}
+        self.rule_stats = {}
+        self.missed_attacks = []
+        self._lock = threading.Lock()
+
+    def add(self, result):
+        """
+        Учесть окончательный результат запроса
+
+        Args:
+            result (TestResult): Результат с учётом данных аудит-лога
+        """
+        blocked = 1 if result.was_blocked else 0
+        status = result.status_code if isinstance(result.status_code, int) else str(result.status_code)
+
+        with self._lock:
+            self.total_sent += 1
+            self.total_blocked += blocked
+
+            for counters, key in (
+                (self.by_type, result.attack_type),
+                (self.by_endpoint, result.endpoint),
+                (self.by_parameter, result.parameter),
+            ):
+                entry = counters.get(key)
+                if entry is None:
+                    entry = counters[key] = [0, 0]
+                entry[0] += 1
+                entry[1] += blocked
+
+            mutation = result.mutation
+            if mutation is not None:
+                entry = self.by_mutation.get(mutation)
+                if entry is None:
+                    entry = self.by_mutation[mutation] = [0, 0]
+                entry[0] += 1
+                entry[1] += blocked
+
+            self.status_codes[status] = self.status_codes.get(status, 0) + 1
+
+            for rule_id in result.blocked_by_rules:
+                self.rule_stats[rule_id] = self.rule_stats.get(rule_id, 0) + 1
+
+            if not blocked and (self.max_missed is None or len(self.missed_attacks) < self.max_missed):
+                self.missed_attacks.append(result)
+
+    def close(self):
+        pass
+
+    def top_rules(self, n=None):
+        """
+        Наиболее часто срабатывающие правила
+
+        Args:
+            n (int): Размер топа (по умолчанию top_n)
+
+        Returns:
+            List[Tuple[str, int]]: Пары (id правила, число срабатываний)
+        """
+        with self._lock:
+            items = list(self.rule_stats.items())
+        return heapq.nlargest(n or self.top_n, items, key=lambda x: x[1])
+
+    def snapshot(self):
+        """
+        Получить статистику в формате WAFTester.get_statistics
+
+        Можно вызывать во время прогона из другого потока.
+
+        Returns:
+            Dict: Словарь со статистикой
+        """
+        with self._lock:
+            total_sent = self.total_sent
+            total_blocked = self.total_blocked
+            by_type = {k: _rate_entry(*v) for k, v in self.by_type.items()}
+            by_endpoint = {k: _rate_entry(*v) for k, v in self.by_endpoint.items()}
+            by_parameter = {k: _rate_entry(*v) for k, v in self.by_parameter.items()}
+            by_mutation = {k: list(v) for k, v in self.by_mutation.items()}
+            status_codes = dict(self.status_codes)
+            rule_stats = dict(self.rule_stats)
+            missed_attacks = list(self.missed_attacks)
+
+        # Преобразование учитывается во всех цепочках, где оно участвует
+        by_transform = {}
+        for name, (sent, blocked) in by_mutation.items():
+            for transform in split_chain(name):
+                entry = by_transform.setdefault(transform, [0, 0])
+                entry[0] += sent
+                entry[1] += blocked
+
+        return {
+            "total_sent": total_sent,
+            "total_blocked": total_blocked,
+            "total_missed": total_sent - total_blocked,
+            "detection_rate": (total_blocked / total_sent * 100) if total_sent else 0,
+            "stats_by_type": by_type,
+            "stats_by_endpoint": by_endpoint,
+            "stats_by_parameter": by_parameter,
+            "stats_by_mutation": {k: _rate_entry(*v) for k, v in by_mutation.items()},
+            "stats_by_transform": {k: _rate_entry(*v) for k, v in by_transform.items()},
+            "status_codes": status_codes,
+            "rule_stats": rule_stats,
+            "top_rules": heapq.nlargest(self.top_n, rule_stats.items(), key=lambda x: x[1]),
+            "missed_attacks": missed_attacks,
+        }
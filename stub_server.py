@@ -0,0 +1,254 @@
+# stub_server.py
+"""
+Локальный HTTP сервер-заглушка, имитирующий WAF, для офлайн тестов и бенчмарков
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import threading
+from datetime import datetime, timezone
+from urllib.parse import unquote_plus
+
+# Упрощённые сигнатуры атак с id правил в стиле CRS: совпадение -> ответ 403
+SIGNATURE_RULES = [
+    ("942100", re.compile(r"'|--|/\*|union\s+select|\bsleep\(", re.IGNORECASE)),
+    ("941100", re.compile(r"<script|<svg|<img|<iframe|onerror|onload|javascript:", re.IGNORECASE)),
+    ("932100", re.compile(r";\s*\w|\|\s*\w|&&|\$\(|`")),
+    ("930100", re.compile(r"\.\./|\.\.\\\\|/etc/passwd|%00", re.IGNORECASE)),
+]
+
+# Заголовки, которые добавляет сам клиент: в них сигнатуры не ищутся
+_CLIENT_HEADERS = {
+    "host", "user-agent", "accept", "accept-encoding", "connection",
+    "content-length", "content-type",
+}
+
+
+class StubServer:
+    """Asyncio HTTP/1.1 сервер с keep-alive, блокирующий атаки статусом 403 или страницей блокировки"""
+
+    def __init__(self, host="127.0.0.1", port=0, delay=0.0, audit_log=None, attack_delay=0.0,
+                 block_page=False, body_size=0):
+        """
+        Инициализация сервера
+
+        Args:
+            host (str): Адрес для прослушивания
+            port (int): Порт (0 - выбрать свободный)
+            delay (float): Искусственная задержка ответа в секундах
+            audit_log (str): Путь для записи аудит-лога в формате ModSecurity JSON
+            attack_delay (float): Дополнительная задержка для запросов с сигнатурами
+                                  (имитация стоимости срабатывания правил)
+            block_page (bool): Блокировать ответом 200 со страницей блокировки и
+                               заголовком X-WAF-Rule-Id вместо статуса 403
+            body_size (int): Дополнить тело ответов до N байт
+        """
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.audit_log = audit_log
+        self.attack_delay = attack_delay
+        self.block_page = block_page
+        self.body_size = body_size
+        self._audit_file = None
+        self.requests = 0
+        self.blocked = 0
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def match_rules(self, target, body=b"", headers=None):
+        """
+        Найти сработавшие сигнатуры в запросе
+
+        Args:
+            target (str): Путь и query string запроса
+            body (bytes): Тело запроса (форма или JSON)
+            headers (Dict): Заголовки запроса (имена в нижнем регистре);
+                            стандартные заголовки клиента не проверяются
+
+        Returns:
+            List[str]: Идентификаторы сработавших правил
+        """
+        _, _, query = target.partition("?")
+        inspected = [unquote_plus(query)]
+        if body:
+            inspected.append(unquote_plus(body.decode("latin-1")))
+        for name, value in (headers or {}).items():
+            if name not in _CLIENT_HEADERS:
+                inspected.append(unquote_plus(value))
+        text = "\n".join(inspected)
+        return [rule_id for rule_id, pattern in SIGNATURE_RULES if pattern.search(text)]
+
+    def is_attack(self, target):
+        """
+        Проверить, содержит ли цель запроса сигнатуру атаки
+
+        Args:
+            target (str): Путь и query string запроса
+
+        Returns:
+            bool: True если запрос должен быть заблокирован
+        """
+        return bool(self.match_rules(target))
+
+    def _write_audit(self, method, target, headers, rule_ids):
+        entry = {
+            "transaction": {
+                "client_ip": "127.0.0.1",
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "request": {"method": method, "uri": target, "headers": headers},
+                "response": {"http_code": 403},
+                "messages": [
+                    {"message": "Stub signature match", "details": {"ruleId": rule_id}}
+                    for rule_id in rule_ids
+                ],
+            }
+        }
+        self._audit_file.write(json.dumps(entry) + "\n")
+        self._audit_file.flush()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                headers = {}
+                raw_headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                    raw_headers[name.strip()] = value.strip()
+
+                length = int(headers.get("content-length", 0) or 0)
+                request_body = await reader.readexactly(length) if length else b""
+
+                parts = request_line.decode("latin-1").split()
+                method = parts[0] if parts else "GET"
+                target = parts[1] if len(parts) > 1 else "/"
+
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+
+                self.requests += 1
+                rule_ids = self.match_rules(target, request_body, headers)
+                if rule_ids:
+                    self.blocked += 1
+                    if self.attack_delay:
+                        await asyncio.sleep(self.attack_delay)
+                    if self._audit_file is not None:
+                        self._write_audit(method, target, raw_headers, rule_ids)
+                    if self.block_page:
+                        status = "200 OK"
+                        extra = f"X-WAF-Rule-Id: {','.join(rule_ids)}\r\n"
+                        body = (f"<html><body><h1>Request Rejected</h1>"
+                                f"<p>Rule ID: {rule_ids[0]}</p></body></html>").encode()
+                    else:
+                        status, extra = "403 Forbidden", ""
+                        body = b"<html><body>403 Forbidden</body></html>"
+                else:
+                    status, extra, body = "200 OK", "", b"<html><body>OK</body></html>"
+                if len(body) < self.body_size:
+                    body += b" " * (self.body_size - len(body))
+
+                close = headers.get("connection", "").lower() == "close"
+                writer.write(
+                    f"HTTP/1.1 {status}\r\n"
+                    f"Content-Type: text/html\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"{extra}"
+                    f"Connection: {'close' if close else 'keep-alive'}\r\n"
+                    f"\r\n".encode("latin-1") + body
+                )
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _serve(self):
+        if self.audit_log:
+            self._audit_file = open(self.audit_log, "a", encoding="utf-8")
+        self._server = await asyncio.start_server(
+            self._handle, self.host, self.port, backlog=4096
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._serve())
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    def start(self):
+        """
+        Запустить сервер в фоновом потоке
+
+        Returns:
+            StubServer: Сам сервер (для цепочки вызовов)
+        """
+        self._thread = threading.Thread(target=self._run_loop, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        """
+        Остановить сервер
+        """
+        if self._loop and self._server:
+            self._loop.call_soon_threadsafe(self._server.close)
+        if self._thread:
+            self._thread.join(timeout=5)
+        if self._audit_file is not None:
+            self._audit_file.close()
+            self._audit_file = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP заглушка WAF для локальных тестов")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--delay", type=float, default=0.0,
+                        help="задержка ответа в секундах")
+    parser.add_argument("--audit-log", help="файл аудит-лога в формате ModSecurity JSON")
+    parser.add_argument("--attack-delay", type=float, default=0.0,
+                        help="дополнительная задержка для атак в секундах")
+    parser.add_argument("--block-page", action="store_true",
+                        help="блокировать ответом 200 со страницей блокировки")
+    parser.add_argument("--body-size", type=int, default=0,
+                        help="дополнить тело ответов до N байт")
+    args = parser.parse_args()
+
+    server = StubServer(args.host, args.port, args.delay, args.audit_log, args.attack_delay,
+                        args.block_page, args.body_size)
+    print(f"[*] Заглушка WAF слушает {server.url}")
+    try:
+        asyncio.run(server._serve())
+    except KeyboardInterrupt:
+        print("\n[*] Остановлено")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+# verdict_cache.py
+"""
+Кэш вердиктов WAF между запусками и объединение одинаковых запросов
+"""
+
+import glob
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import config
+from wire_request import RequestCompiler
+
+# Состояния payload при проверке кэша
+HIT, WAIT, SEND = "hit", "wait", "send"
+
+# Ключ директив без id (SecRuleEngine, SecDefaultAction, ...): их изменение
+# может повлиять на любой вердикт
+GLOBAL_RULES = "*"
+
+_RULE_ID = re.compile(r"\bid\s*:\s*'?(\d+)")
+_CHAIN = re.compile(r"\bchain\b")
+
+# Отпечаток не зависит от сервера: вердикты и так хранятся отдельно по target
+_COMPILER = RequestCompiler("http://target")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS verdicts (
+    namespace TEXT NOT NULL,
+    fingerprint BLOB NOT NULL,
+    status INTEGER NOT NULL,
+    blocked INTEGER NOT NULL,
+    rules TEXT NOT NULL,
+    ruleset TEXT NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (namespace, fingerprint)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rulesets (
+    hash TEXT PRIMARY KEY,
+    rules TEXT
+);
+"""
+
+
+def request_fingerprint(payload_dict):
+    """
+    Отпечаток запроса по его каноническому виду на проводе
+
+    Маркер корреляции в отпечаток не входит: он свой у каждой отправки.
+
+    Args:
+        payload_dict (Dict): Словарь с информацией о payload
+
+    Returns:
+        bytes: 16 байт BLAKE2b от шаблона запроса без маркера
+    """
+    return hashlib.blake2b(_COMPILER.compile(payload_dict).render(""), digest_size=16).digest()
+
+
+def _logical_lines(text):
+    # Строки с продолжением "\" склеиваются, комментарии пропускаются
+    buffer = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not buffer and (not stripped or stripped.startswith("#")):
+            continue
+        if stripped.endswith("\\"):
+            buffer.append(stripped[:-1])
+            continue
+        buffer.append(stripped)
+        yield " ".join(buffer)
+        buffer = []
+    if buffer:
+        yield " ".join(buffer)
+
+
+def parse_ruleset(patterns):
+    """
+    Хэши отдельных правил ModSecurity
+
+    Цепочка (chain) относится к правилу с id в её начале, директивы без
+    id собираются под ключом GLOBAL_RULES.
+
+    Args:
+        patterns (List[str]): Пути или glob-шаблоны файлов правил
+
+    Returns:
+        Dict[str, str]: Id правила -> хэш его текста (None, если файлов нет)
+    """
+    paths = sorted({path for pattern in patterns for path in glob.glob(pattern)})
+    if not paths:
+        return None
+    texts = {}
+    current = None
+    in_chain = False
+    for path in paths:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for directive in _logical_lines(f.read()):
+                match = _RULE_ID.search(directive)
+                if match:
+                    current = match.group(1)
+                elif not (in_chain and directive.startswith("SecRule")):
+                    current = GLOBAL_RULES
+                texts.setdefault(current, []).append(directive)
+                in_chain = bool(_CHAIN.search(directive))
+    return {
+        rule_id: hashlib.blake2b("\n".join(lines).encode("utf-8"), digest_size=8).hexdigest()
+        for rule_id, lines in texts.items()
+    }
+
+
+def ruleset_snapshot(version=None, files=None):
+    """
+    Снимок текущего набора правил
+
+    Args:
+        version (str): Версия набора (по умолчанию RULESET_VERSION)
+        files (List[str]): Файлы правил (по умолчанию RULESET_FILES)
+
+    Returns:
+        Tuple[str, Dict]: Хэш набора и хэши правил (None - набор не разобран по правилам)
+    """
+    version = config.RULESET_VERSION if version is None else version
+    files = config.RULESET_FILES if files is None else files
+    rules = parse_ruleset(files) if files else None
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(str(version or "").encode("utf-8"))
+    for rule_id, rule_hash in sorted((rules or {}).items()):
+        digest.update(f"\0{rule_id}={rule_hash}".encode("utf-8"))
+    return digest.hexdigest(), rules
+
+
+class VerdictCache:
+    """Вердикты по отпечаткам запросов: LRU в памяти и SQLite на диске
+
+    Вердикт действителен, пока не изменился набор правил. Если правила
+    разобраны по id (RULESET_FILES), после изменения остаются в силе
+    блокировки, сработавшие правила которых не менялись, и пропуски, если
+    правила только удалялись - повторно отправляются лишь затронутые payload.
+    Одинаковые запросы в полёте объединяются: копии ждут ответа на первый.
+    """
+
+    def __init__(self, target_url, path=None, capacity=None, ttl=None):
+        """
+        Инициализация кэша
+
+        Args:
+            target_url (str): Целевой сервер (вердикты хранятся отдельно для каждого)
+            path (str): Файл SQLite (по умолчанию VERDICT_CACHE_FILE, None - только память)
+            capacity (int): Вердиктов в памяти (по умолчанию VERDICT_CACHE_SIZE)
+            ttl (float): Срок действия вердикта в секундах (0 - без срока)
+        """
+        self.namespace = target_url.rstrip("/")
+        self.path = config.VERDICT_CACHE_FILE if path is None else path
+        self.capacity = config.VERDICT_CACHE_SIZE if capacity is None else capacity
+        self.ttl = config.VERDICT_CACHE_TTL if ttl is None else ttl
+        self.ruleset, self.rules = ruleset_snapshot()
+
+        self._memory = OrderedDict()
+        self._inflight = {}
+        # id отправленного payload -> отпечаток (до сохранения вердикта)
+        self._sent = {}
+        self._validity = {self.ruleset: True}
+        self._rows = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale = 0
+        self.waited = 0
+        self.stored = 0
+
+        self.db = None
+        if self.path:
+            self.db = sqlite3.connect(self.path, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute(f"PRAGMA mmap_size={int(config.VERDICT_CACHE_MMAP)}")
+            self.db.executescript(_SCHEMA)
+            self.db.execute(
+                "INSERT OR IGNORE INTO rulesets (hash, rules) VALUES (?, ?)",
+                (self.ruleset, json.dumps(self.rules) if self.rules is not None else None)
+            )
+            self.db.commit()
+
+    def _is_valid(self, ruleset, blocked, rules, updated):
+        if self.ttl and updated + self.ttl < time.time():
+            return False
+        validity = self._validity.get(ruleset)
+        if validity is None:
+            validity = self._validity[ruleset] = self._compare_ruleset(ruleset)
+        if validity is True or validity is False:
+            return validity
+        misses_valid, changed = validity
+        if blocked:
+            return bool(rules) and changed.isdisjoint(rules)
+        return misses_valid
+
+    def _compare_ruleset(self, ruleset):
+        # Что изменилось с набора правил, при котором получен вердикт
+        row = self.db.execute("SELECT rules FROM rulesets WHERE hash = ?", (ruleset,)).fetchone()
+        old = json.loads(row[0]) if row and row[0] else None
+        if old is None or self.rules is None:
+            return False
+        changed = frozenset(
+            rule_id for rule_id in old.keys() | self.rules.keys()
+            if old.get(rule_id) != self.rules.get(rule_id)
+        )
+        if GLOBAL_RULES in changed:
+            return False
+        # Удаление правил не может заблокировать пропущенный запрос
+        return all(rule_id not in self.rules for rule_id in changed), changed
+
+    def _lookup(self, fingerprint):
+        verdict = self._memory.get(fingerprint)
+        if verdict is not None:
+            self._memory.move_to_end(fingerprint)
+            return verdict
+        if self.db is None:
+            return None
+        row = self.db.execute(
+            "SELECT status, blocked, rules, ruleset, updated FROM verdicts "
+            "WHERE namespace = ? AND fingerprint = ?",
+            (self.namespace, fingerprint)
+        ).fetchone()
+        if row is None:
+            return None
+        status, blocked, rules, ruleset, updated = row
+        rules = tuple(rules.split(",")) if rules else ()
+        if not self._is_valid(ruleset, blocked, rules, updated):
+            self.stale += 1
+            return None
+        verdict = (status, bool(blocked), rules)
+        self._remember(fingerprint, verdict)
+        return verdict
+
+    def _remember(self, fingerprint, verdict):
+        self._memory[fingerprint] = verdict
+        self._memory.move_to_end(fingerprint)
+        if len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def claim(self, payload_dict):
+        """
+        Проверить payload перед отправкой
+
+        Args:
+            payload_dict (Dict): Словарь с информацией о payload
+
+        Returns:
+            Tuple[str, Tuple]: HIT и вердикт (статус, блокировка, правила);
+                               WAIT - такой же запрос в полёте, payload ждёт его ответа;
+                               SEND - payload нужно отправить
+        """
+        fingerprint = request_fingerprint(payload_dict)
+        with self._lock:
+            waiting = self._inflight.get(fingerprint)
+            if waiting is not None:
+                waiting.append(payload_dict)
+                self.waited += 1
+                return WAIT, None
+            verdict = self._lookup(fingerprint)
+            if verdict is not None:
+                self.hits += 1
+                return HIT, verdict
+            self._inflight[fingerprint] = []
+            self._sent[payload_dict["id"]] = fingerprint
+            return SEND, None
+
+    def complete(self, result):
+        """
+        Запомнить ответ на отправленный запрос и отпустить ждущие копии
+
+        Args:
+            result (TestResult): Результат сразу после ответа
+
+        Returns:
+            Tuple[Tuple, List[Dict]]: Вердикт и payload, ждавшие этого ответа
+        """
+        verdict = (result.status_code, result.was_blocked, result.blocked_by_rules)
+        with self._lock:
+            fingerprint = self._sent.get(result.request_id)
+            if fingerprint is None:
+                return verdict, []
+            waiting = self._inflight.pop(fingerprint, None) or []
+            if isinstance(result.status_code, int):
+                self._remember(fingerprint, verdict)
+            else:
+                del self._sent[result.request_id]
+        return verdict, waiting
+
+    def add(self, result):
+        """
+        Сохранить окончательный вердикт отправленного запроса (приёмник результатов)
+
+        Args:
+            result (TestResult): Результат с учётом данных аудит-лога
+        """
+        # Вердикты из кэша, копии запросов и ошибки не сохраняются
+        if result.sent_ts is None or not isinstance(result.status_code, int):
+            return
+        verdict = (result.status_code, result.was_blocked, result.blocked_by_rules)
+        with self._lock:
+            fingerprint = self._sent.pop(result.request_id, None)
+            if fingerprint is None:
+                return
+            self._remember(fingerprint, verdict)
+            self.stored += 1
+            if self.db is None:
+                return
+            self._rows.append((
+                self.namespace, fingerprint, result.status_code, int(result.was_blocked),
+                ",".join(result.blocked_by_rules), self.ruleset, result.sent_ts
+            ))
+            if len(self._rows) >= config.VERDICT_CACHE_BATCH:
+                self._flush()
+
+    def _flush(self):
+        self.db.executemany(
+            "INSERT OR REPLACE INTO verdicts "
+            "(namespace, fingerprint, status, blocked, rules, ruleset, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            self._rows
+        )
+        self.db.commit()
+        self._rows = []
+
+    def close(self):
+        """
+        Записать оставшиеся вердикты и закрыть файл
+        """
+        with self._lock:
+            if self.db is None:
+                return
+            if self._rows:
+                self._flush()
+            self.db.close()
+            self.db = None
+
+    def as_dict(self):
+        """
+        Сводка кэша для отчёта
+
+        Returns:
+            Dict: Попадания, устаревшие вердикты, объединённые копии и версия правил
+        """
+        return {
+            "hits": self.hits,
+            "stale": self.stale,
+            "waited": self.waited,
+            "stored": self.stored,
+            "ruleset": self.ruleset,
+            "rules": len(self.rules) if self.rules is not None else None,
+            "file": self.path,
+        }
@@ -3,53 +3,318 @@
 Главный класс системы тестирования WAF
 """
 
+import os
 import requests
-import json
+import threading
 import time
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
 import re
+import sys
 
-from payloads import get_all_payloads
+from payloads import load_corpus
+from http_pool import (HTTPSessionPool, reset_connect_timer, pop_connect_timer, phase_timer,
+                       read_body_prefix)
+from block_detector import load_block_detector
+from rate_limiter import RateLimiter
+from correlation import CorrelationIndex, new_run_id, extract_rule_ids, quote_header_marker
+from audit_log import iter_entries, AuditLogFollower, LinePrefilter
+from log_ingest import LogSource, resolve_log_sources, capture_positions, ingest_logs
+from stats import StatsAggregator
+from latency import LatencyRecorder, build_timings
+from result_sink import ResultSpill, record_to_result
+from result_table import ResultTable
+from verdict_cache import VerdictCache, ruleset_snapshot, HIT, SEND
 import config
 
 
 class TestResult:
-    """Результат тестирования одного payload"""
+    """Результат тестирования одного payload
     
-    def __init__(self, request_id, attack_type, payload, endpoint):
+    Поля хранятся в __slots__ без словаря экземпляра, время отправки - как
+    число (epoch), список правил - как кортеж.
+    """
+    
+    __slots__ = (
+        "request_id", "attack_type", "payload", "endpoint", "parameter", "mutation",
+        "correlation_id", "was_blocked", "log_matched", "blocked_by_rules",
+        "status_code", "response_time", "connect_time", "sent_ts", "timings",
+    )
+    
+    def __init__(self, request_id, attack_type, payload, endpoint, parameter=None):
         self.request_id = request_id
         self.attack_type = attack_type
         self.payload = payload
         self.endpoint = endpoint
+        self.parameter = parameter
+        # Цепочка преобразований варианта payload (None - набор без мутаций)
+        self.mutation = None
+        self.correlation_id = None
         self.was_blocked = False
-        self.blocked_by_rules = []
+        self.log_matched = False
+        self.blocked_by_rules = ()
         self.status_code = None
         self.response_time = 0
-        self.sent_time = None
+        self.connect_time = 0
+        self.sent_ts = None
+        # Время фаз запроса в наносекундах (см. latency.PHASES)
+        self.timings = None
+    
+    @property
+    def sent_time(self):
+        return datetime.fromtimestamp(self.sent_ts) if self.sent_ts else None
+    
+    @classmethod
+    def from_record(cls, record):
+        """
+        Восстановить результат из записи result_to_record
+        
+        Args:
+            record (Dict): Запись журнала или JSONL файла результатов
+        
+        Returns:
+            TestResult: Результат с теми же полями
+        """
+        restored = record_to_result(record)
+        result = cls(
+            restored.request_id,
+            sys.intern(restored.attack_type),
+            restored.payload,
+            sys.intern(restored.endpoint),
+            sys.intern(restored.parameter) if restored.parameter else restored.parameter
+        )
+        if restored.mutation is not None:
+            result.mutation = sys.intern(restored.mutation)
+        result.was_blocked = restored.was_blocked
+        result.log_matched = restored.log_matched
+        result.blocked_by_rules = restored.blocked_by_rules
+        result.status_code = restored.status_code
+        result.response_time = restored.response_time
+        result.connect_time = restored.connect_time
+        result.timings = restored.timings
+        result.sent_ts = restored.sent_time.timestamp() if restored.sent_time else None
+        return result
+
+
+def new_result_store():
+    """
+    Создать хранилище окончательных результатов по RESULT_STORAGE
+    
+    Returns:
+        list|ResultTable: Список объектов или колоночная таблица
+    """
+    if config.RESULT_STORAGE == "table":
+        return ResultTable()
+    return []
 
 
 class WAFTester:
     """Главный класс системы тестирования WAF"""
     
-    def __init__(self, target_url=None, log_file=None):
+    def __init__(self, target_url=None, log_file=None, engine=None, keep_results=None, run_id=None):
         """
         Инициализация системы тестирования
         
         Args:
             target_url (str): URL целевого сервера
-            log_file (str): Путь к логу ModSecurity
+            log_file (str|List[str]): Путь, glob-шаблон или список логов ModSecurity
+                                      (пустой - блокировки определяются только по ответам)
+            engine (str): Движок отправки ("threads", "asyncio" или "raw")
+            keep_results (bool): Хранить результаты в памяти (по умолчанию KEEP_RESULTS_IN_MEMORY)
+            run_id (str): ID запуска (рабочие распределённого режима берут ID координатора)
         """
         self.target_url = target_url or config.TARGET_URL
-        self.log_file = log_file or config.NGINX_LOG_FILE
-        self.test_results = []
+        self.log_file = config.NGINX_LOG_FILE if log_file is None else log_file
+        self.engine = engine or config.ENGINE
+        # Окончательные результаты (None, если не хранятся в памяти)
+        self.keep_results = config.KEEP_RESULTS_IN_MEMORY if keep_results is None else keep_results
+        self.test_results = new_result_store() if self.keep_results else None
         self.start_time = None
         self.end_time = None
+        self.http_pool = HTTPSessionPool()
+        self.rate_limiter = RateLimiter()
+        self.block_detector = load_block_detector()
+        # Продолжение прерванного запуска (CHECKPOINT_RESUME): ID запуска из журнала
+        journal = self._read_checkpoint() if config.CHECKPOINT_RESUME else None
+        if journal is not None:
+            run_id = journal[0]["run_id"]
+        self.run_id = run_id or new_run_id()
+        self.correlation = CorrelationIndex(self.run_id, self.target_url)
+        self.log_positions = {}
+        self.log_followers = []
+        self._log_lock = threading.Lock()
+        self._awaiting_log = set()
+        self._follow_thread = None
+        self._sending_done = threading.Event()
+        self.log_matched_count = 0
+        self.worker_stats = []
+        # Payload, оставшиеся без результата из-за сбоя рабочих
+        self.lost_payloads = 0
+        # Вызываются с каждым результатом сразу после ответа (до данных лога)
+        self.result_observers = []
+        self.search = None
+        
+        # Результаты хранятся в памяти или только проходят через агрегатор и файл
+        self.aggregator = StatsAggregator(
+            max_missed=None if self.keep_results else config.MAX_MISSED_IN_MEMORY
+        )
+        self.latency = LatencyRecorder()
+        self.result_sinks = [self.aggregator, self.latency]
+        if config.RESULTS_SPILL_FILE:
+            self.result_sinks.append(ResultSpill(config.RESULTS_SPILL_FILE))
+        self.exporters = []
+        if config.EXPORT_FORMATS:
+            from report import open_exporters
+            # Недоступный формат (например, parquet без pyarrow) не отключает остальные
+            for kind in config.EXPORT_FORMATS:
+                try:
+                    self.exporters.extend(open_exporters(config.EXPORT_PREFIX, [kind]))
+                except (OSError, ValueError) as e:
+                    print(f"[!] Выгрузка {kind} отключена: {e}")
+            self.result_sinks.extend(self.exporters)
+        # Вердикты прошлых запусков и объединение одинаковых запросов
+        self.verdict_cache = VerdictCache(self.target_url) if config.VERDICT_CACHE else None
+        if self.verdict_cache is not None:
+            self.result_sinks.append(self.verdict_cache)
+        # История запусков для сравнения и трендов
+        self.run_store = None
+        if config.RUN_STORE:
+            from run_store import RunStore
+            if self.verdict_cache is not None:
+                ruleset = self.verdict_cache.ruleset
+            elif config.RULESET_VERSION or config.RULESET_FILES:
+                ruleset = ruleset_snapshot()[0]
+            else:
+                ruleset = None
+            self.run_store = RunStore()
+            self.run_store.start_run(self.run_id, self.target_url, ruleset)
+            self.result_sinks.append(self.run_store)
+        # Метрики для Prometheus: счётчики ответов и окончательных вердиктов
+        self.metrics = None
+        self.metrics_server = None
+        if config.METRICS_ENABLED:
+            from metrics import RunMetrics
+            self.metrics = RunMetrics()
+            self.result_observers.append(self.metrics.observe)
+            self.result_sinks.append(self.metrics)
+            self._add_gauges()
+        self._skipped = 0
+        self._finalize_lock = threading.Lock()
+        # Результаты, ожидающие записей аудит-лога перед окончательной обработкой
+        self._pending_results = OrderedDict()
+        self._finalized = False
+        # Журнал завершённых payload и результаты, восстановленные из него
+        self.checkpoint = None
+        self._completed = {}
+        if config.CHECKPOINT or config.CHECKPOINT_RESUME:
+            self._open_checkpoint(journal)
         
         print(f"[*] Инициализация WAF Tester")
         print(f"    Целевой сервер: {self.target_url}")
-        print(f"    Лог файл: {self.log_file}")
+        print(f"    Лог файл: {self.log_file or 'не используется'}")
+        print(f"    Движок: {self.engine}")
+        print(f"    ID запуска: {self.run_id}")
+        if self.verdict_cache is not None:
+            cache = self.verdict_cache
+            rules = f"{len(cache.rules)} правил" if cache.rules is not None else "без разбора по правилам"
+            print(f"    Кэш вердиктов: {cache.path or 'только память'} "
+                  f"(набор правил {cache.ruleset}, {rules})")
+            if not (config.RULESET_VERSION or cache.rules):
+                print("[!] Версия правил не задана (RULESET_VERSION, RULESET_FILES): "
+                      "вердикты действуют до истечения VERDICT_CACHE_TTL")
+        if self.run_store is not None:
+            print(f"    История запусков: {self.run_store.path}")
+    
+    def _read_checkpoint(self):
+        from checkpoint import load_journal
+        
+        path = config.CHECKPOINT_FILE
+        if not Path(path).exists():
+            print(f"[!] Журнал {path} не найден: запуск начинается сначала")
+            return None
+        header, records, valid_size = load_journal(path)
+        if header is None or header["target"].rstrip("/") != self.target_url.rstrip("/"):
+            backup = path + ".old"
+            os.replace(path, backup)
+            print(f"[!] Журнал {path} относится к другому серверу или формату, "
+                  f"сохранён как {backup}: запуск начинается сначала")
+            return None
+        return header, records, valid_size
+    
+    def _open_checkpoint(self, journal):
+        from checkpoint import CheckpointJournal
+        
+        resume_size = None
+        if journal is not None:
+            _, records, resume_size = journal
+            for record in records:
+                # Ошибки отправки (например, сервер был недоступен) отправляются заново
+                if isinstance(record.get("status_code"), int):
+                    result = TestResult.from_record(record)
+                    result.correlation_id = self.correlation.marker_for(result.request_id)
+                    self._completed[result.request_id] = result
+            # Частичная статистика, выгрузки и история восстанавливаются до отправки
+            for result in self._completed.values():
+                self._finalize(result)
+            print(f"[*] Продолжение запуска {self.run_id}: восстановлено "
+                  f"{len(self._completed)} результатов из {config.CHECKPOINT_FILE}")
+        self.checkpoint = CheckpointJournal(config.CHECKPOINT_FILE, self.run_id,
+                                            self.target_url, resume_size)
+        self.result_sinks.append(self.checkpoint)
+    
+    def close_checkpoint(self):
+        """
+        Сбросить журнал на диск при прерывании запуска
+        """
+        if self.checkpoint is not None:
+            with self._finalize_lock:
+                self.checkpoint.close()
+    
+    def _add_gauges(self):
+        started = time.monotonic()
+        metrics = self.metrics
+        metrics.add_gauge("waf_run_info", "Текущий запуск", lambda: 1,
+                          (("run_id", self.run_id), ("target", self.target_url), ("engine", self.engine)))
+        metrics.add_gauge("waf_run_elapsed_seconds", "Время с начала запуска",
+                          lambda: time.monotonic() - started)
+        metrics.add_gauge("waf_awaiting_log_results", "Результаты, ожидающие записей аудит-лога",
+                          lambda: len(self._pending_results))
+        metrics.add_gauge("waf_rate_limit_rps", "Текущий лимит скорости (0 - без ограничения)",
+                          lambda: self.rate_limiter.as_dict()["rate"])
+        if self.verdict_cache is not None:
+            metrics.add_gauge("waf_cache_hits", "Вердикты из кэша без отправки",
+                              lambda: self.verdict_cache.hits + self.verdict_cache.waited)
+    
+    def start_metrics(self):
+        """
+        Запустить HTTP сервер метрик (если METRICS_ENABLED)
+        
+        Returns:
+            bool: Сервер запущен
+        """
+        if self.metrics is None or self.metrics_server is not None:
+            return self.metrics_server is not None
+        from metrics import MetricsServer
+        try:
+            self.metrics_server = MetricsServer(self.metrics).start()
+        except OSError as e:
+            print(f"[!] Сервер метрик не запущен: {e}")
+            return False
+        print(f"[*] Метрики Prometheus: {self.metrics_server.url}")
+        return True
+    
+    def stop_metrics(self):
+        """
+        Остановить сервер метрик после METRICS_LINGER секунд
+        """
+        if self.metrics_server is None:
+            return
+        if config.METRICS_LINGER:
+            print(f"[*] Итоговые метрики доступны ещё {config.METRICS_LINGER} сек")
+        self.metrics_server.stop(config.METRICS_LINGER)
+        self.metrics_server = None
     
     def check_connection(self):
         """
@@ -59,10 +324,9 @@ class WAFTester:
             bool: True если сервер доступен, False иначе
         """
         try:
-            response = requests.get(
+            response = self.http_pool.get_session().get(
                 self.target_url,
-                timeout=config.REQUEST_TIMEOUT,
-                verify=False
+                timeout=config.REQUEST_TIMEOUT
             )
             print(f"[✓] Соединение успешно (статус: {response.status_code})")
             return True
@@ -70,52 +334,145 @@ class WAFTester:
             print(f"[✗] Ошибка соединения: {str(e)}")
             return False
     
-    def send_payload(self, payload_dict):
+    def new_result(self, payload_dict):
         """
-        Отправить один payload запрос
+        Создать пустой результат для payload
         
         Args:
             payload_dict (Dict): Словарь с информацией о payload
         
         Returns:
-            TestResult: Результат отправки
+            TestResult: Результат без данных об ответе
         """
+        # Повторяющиеся строки интернируются, payload хранится ссылкой на строку набора
         result = TestResult(
             payload_dict["id"],
-            payload_dict["attack_type"],
+            sys.intern(payload_dict["attack_type"]),
             payload_dict["payload"],
-            payload_dict["endpoint"]
+            sys.intern(payload_dict["endpoint"]),
+            sys.intern(payload_dict["parameter"])
         )
+        mutation = payload_dict.get("mutation")
+        if mutation is not None:
+            result.mutation = sys.intern(mutation)
+        result.correlation_id = self.correlation.marker_for(result.request_id)
+        return result
+    
+    def build_request_args(self, payload_dict, result):
+        """
+        Сформировать метод и аргументы запроса requests с маркером корреляции
+        
+        Payload помещается по полю "location": query (по умолчанию), form,
+        json, header или cookie; для form и json метод GET заменяется на POST.
+        
+        Args:
+            payload_dict (Dict): Словарь с информацией о payload
+            result (TestResult): Результат, для которого формируется запрос
+        
+        Returns:
+            Tuple[str, Dict]: HTTP метод и аргументы Session.request
+        """
+        location = payload_dict.get("location") or "query"
+        method = payload_dict.get("method") or "GET"
+        name, value = payload_dict["parameter"], payload_dict["payload"]
+        params, headers = {}, {}
+        kwargs = {"params": params, "headers": headers}
+        if location == "query":
+            params[name] = value
+        elif location == "form":
+            kwargs["data"] = {name: value}
+        elif location == "json":
+            kwargs["json"] = {name: value}
+        elif location == "header":
+            headers[name] = value
+        elif location == "cookie":
+            kwargs["cookies"] = {name: value}
+        else:
+            raise ValueError(f"Неизвестное место payload: {location}")
+        if location in ("form", "json") and method == "GET":
+            method = "POST"
+        
+        if config.CORRELATION_PARAM:
+            params[config.CORRELATION_PARAM] = result.correlation_id
+        if config.CORRELATION_HEADER:
+            headers[config.CORRELATION_HEADER] = quote_header_marker(result.correlation_id)
+        return method, kwargs
+    
+    def apply_response(self, result, status_code, response_time, headers=None, body=b""):
+        """
+        Заполнить результат данными полученного ответа
+        
+        Args:
+            result (TestResult): Результат отправки
+            status_code (int): HTTP статус ответа
+            response_time (float): Время ответа в секундах
+            headers (Mapping): Заголовки ответа
+            body (bytes): Начало тела ответа (не более block_detector.body_bytes)
+        """
+        result.status_code = status_code
+        result.response_time = response_time
+        self.rate_limiter.feedback(status_code, response_time)
+        
+        # Вердикт по статусу, заголовкам и странице блокировки
+        blocked, rule_ids = self.block_detector.detect(status_code, headers, body)
+        if blocked:
+            result.was_blocked = True
+        if rule_ids:
+            result.blocked_by_rules = rule_ids
+    
+    def send_payload(self, payload_dict):
+        """
+        Отправить один payload запрос
+        
+        Args:
+            payload_dict (Dict): Словарь с информацией о payload
+        
+        Returns:
+            TestResult: Результат отправки
+        """
+        result = self.new_result(payload_dict)
         
         try:
             # Формирование полного URL
             full_url = self.target_url + payload_dict["endpoint"]
             
-            # Добавление параметра с payload
-            params = {payload_dict["parameter"]: payload_dict["payload"]}
+            # Payload и маркер корреляции в query, теле, заголовках или cookie
+            method, kwargs = self.build_request_args(payload_dict, result)
             
-            start_time = time.time()
+            session = self.http_pool.get_session()
+            self.rate_limiter.acquire(payload_dict["endpoint"])
+            reset_connect_timer()
+            start_ns = time.perf_counter_ns()
             
-            # Отправка GET запроса
-            response = requests.get(
+            # Отправка запроса через пул соединений, тело читается
+            # только в объёме, нужном детектору блокировок
+            response = session.request(
+                method,
                 full_url,
-                params=params,
                 timeout=config.REQUEST_TIMEOUT,
-                verify=False,
-                allow_redirects=False
+                allow_redirects=False,
+                stream=True,
+                **kwargs
             )
+            body = read_body_prefix(response, self.block_detector.body_bytes)
             
-            response_time = time.time() - start_time
-            result.sent_time = datetime.now()
-            result.status_code = response.status_code
-            result.response_time = response_time
+            end_ns = time.perf_counter_ns()
+            response_time = (end_ns - start_ns) / 1e9
+            dns_ns, tcp_ns, tls_ns, headers_ns = phase_timer()
+            connect_time, connections = pop_connect_timer()
+            self.http_pool.stats.record(connections, connect_time, response_time)
             
-            # Статусы, указывающие на блокировку
-            if response.status_code in [403, 406, 418]:
-                result.was_blocked = True
+            result.sent_ts = time.time()
+            result.connect_time = connect_time
+            result.timings = build_timings(
+                start_ns, end_ns, dns_ns, tcp_ns, tls_ns, headers_ns, connections
+            )
+            self.apply_response(result, response.status_code, response_time,
+                                response.headers, body)
         
         except requests.exceptions.Timeout:
             result.status_code = "TIMEOUT"
+            self.rate_limiter.feedback(result.status_code, config.REQUEST_TIMEOUT)
         except requests.exceptions.ConnectionError:
             result.status_code = "CONNECTION_ERROR"
         except Exception as e:
@@ -123,69 +480,311 @@ class WAFTester:
         
         return result
     
-    def send_all_payloads(self):
+    def _print_progress(self, completed, total):
+        completed += self._skipped
+        latency = self.latency.progress_line()
+        suffix = f" | {latency}" if latency else ""
+        if total is None:
+            # Размер набора заранее неизвестен (повторы мутаций отбрасываются при обходе)
+            print(f"\r[*] Прогресс: {completed}{suffix}   ", end="", flush=True)
+            return
+        percent = (completed / total) * 100 if total else 100
+        print(f"\r[*] Прогресс: {completed}/{total} ({percent:.1f}%){suffix}   ", 
+              end="", flush=True)
+    
+    def send_all_payloads(self, payloads=None):
         """
         Отправить все payload параллельно
+        
+        Args:
+            payloads (Iterable[Dict]): Набор payload (по умолчанию - load_corpus())
         """
-        payloads = get_all_payloads()
-        print(f"\n[*] Отправка {len(payloads)} тестовых запросов...")
+        if payloads is None:
+            payloads = load_corpus()
+        if getattr(payloads, "approximate_len", False):
+            # len() - верхняя граница до отбрасывания повторов, не итог
+            total = None
+            print(f"\n[*] Отправка до {len(payloads)} тестовых запросов "
+                  f"(повторы отбрасываются при отправке)...")
+        else:
+            total = len(payloads)
+            print(f"\n[*] Отправка {total} тестовых запросов...")
         
+        self.begin_sending()
+        self.dispatch(payloads, total)
+        
+        print(f"\n[✓] Все запросы отправлены")
+        if self.verdict_cache is not None:
+            print(f"[*] Вердиктов из кэша: {self.verdict_cache.hits}, "
+                  f"копий запросов без отправки: {self.verdict_cache.waited}")
+        if getattr(payloads, "duplicates", None) is not None:
+            print(f"[*] Вариантов мутаций: {payloads.produced}, "
+                  f"повторов отброшено: {payloads.duplicates}")
+        self.end_sending()
+    
+    def begin_sending(self):
+        """
+        Отметить начало отправки: время запуска и позиции логов
+        """
+        # Запоминаем конец лога, чтобы не разбирать записи прошлых запусков
+        if self.log_file and not self.log_followers:
+            self.log_positions = capture_positions(resolve_log_sources(self.log_file))
         self.start_time = datetime.now()
+    
+    def dispatch(self, payloads, total):
+        """
+        Отправить набор payload выбранным движком
         
-        # Параллельная отправка
-        with ThreadPoolExecutor(max_workers=config.CONCURRENT_REQUESTS) as executor:
-            futures = {
-                executor.submit(self.send_payload, payload): payload 
-                for payload in payloads
-            }
+        Может вызываться несколько раз между begin_sending() и end_sending(),
+        например по раунду адаптивного поиска.
+        
+        Args:
+            payloads (Iterable[Dict]): Набор payload
+            total (int): Размер набора для прогресса (None - неизвестен)
+        """
+        self._skipped = 0
+        if self._completed:
+            payloads = self._skip_completed(payloads)
+        if self.verdict_cache is not None:
+            payloads = self._skip_known(payloads)
+        if config.DISTRIBUTED_WORKERS or config.DISTRIBUTED_REMOTE:
+            self._send_all_distributed(payloads, total)
+        elif self.engine == "asyncio":
+            self._send_all_async(payloads, total)
+        elif self.engine == "raw":
+            self._send_all_raw(payloads, total)
+        else:
+            self._send_all_threaded(payloads, total)
+    
+    def end_sending(self):
+        """
+        Отметить конец отправки и закрыть соединения
+        """
+        self.end_time = datetime.now()
+        self.http_pool.close()
+    
+    def _skip_completed(self, payloads):
+        # Payload, завершённые до прерывания, не отправляются; их результаты
+        # уже учтены при восстановлении, наблюдатели (поиск обходов) получают их здесь
+        for payload_dict in payloads:
+            result = self._completed.get(payload_dict["id"])
+            if result is None:
+                yield payload_dict
+                continue
+            self._skipped += 1
+            for observer in self.result_observers:
+                observer(result)
+    
+    def _skip_known(self, payloads):
+        # Payload с действующим вердиктом и копии запросов в полёте не отправляются
+        for payload_dict in payloads:
+            state, verdict = self.verdict_cache.claim(payload_dict)
+            if state == SEND:
+                yield payload_dict
+            elif state == HIT:
+                self._collect_known(payload_dict, verdict)
+    
+    def _collect_known(self, payload_dict, verdict):
+        # Результат без отправки: вердикт из кэша или ответа на такой же запрос
+        result = self.new_result(payload_dict)
+        result.status_code, result.was_blocked, result.blocked_by_rules = verdict
+        self._skipped += 1
+        for observer in self.result_observers:
+            observer(result)
+        self._finalize(result)
+    
+    def wait_for_log(self, timeout):
+        """
+        Дождаться записей лога по заблокированным запросам без id правил
+        
+        Args:
+            timeout (float): Максимальное ожидание (сек)
+        
+        Returns:
+            bool: True если все ожидаемые записи получены
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._log_lock:
+                if not self._awaiting_log:
+                    return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(config.LOG_POLL_INTERVAL)
+    
+    def _collect(self, result):
+        for observer in self.result_observers:
+            observer(result)
+        if self.verdict_cache is not None:
+            verdict, waiting = self.verdict_cache.complete(result)
+            for payload_dict in waiting:
+                self._collect_known(payload_dict, verdict)
+        self.latency.observe(result)
+        with self._log_lock:
+            transaction = self.correlation.register(result)
+            if transaction is not None:
+                self._apply_log_match([result], transaction)
+            elif self.log_followers and result.was_blocked and not result.blocked_by_rules:
+                # Заблокированный запрос должен появиться в аудит-логе,
+                # если id правил не пришли в ответе сервера
+                self._awaiting_log.add(result.correlation_id)
             
-            completed = 0
-            for future in as_completed(futures):
-                result = future.result()
+            if self.log_followers:
+                deadline = time.monotonic() + config.LOG_FOLLOW_TIMEOUT
+            elif self.keep_results and self.log_file:
+                # Пакетная проверка логов после отправки
+                deadline = float("inf")
+            else:
+                deadline = 0
+            self._pending_results[result.correlation_id] = (result, deadline)
+            ready = self._pop_ready_results()
+        
+        for result in ready:
+            self._finalize(result)
+    
+    def _pop_ready_results(self, force=False):
+        # Результат готов, когда по нему пришла запись лога или истёк срок ожидания
+        ready = []
+        now = time.monotonic()
+        while self._pending_results:
+            correlation_id, (result, deadline) = next(iter(self._pending_results.items()))
+            if not (force or result.log_matched or deadline <= now):
+                break
+            del self._pending_results[correlation_id]
+            self._awaiting_log.discard(correlation_id)
+            self.correlation.unregister(result)
+            ready.append(result)
+        return ready
+    
+    def _finalize(self, result):
+        # Результаты из кэша в распределённом режиме приходят из потока раздачи
+        with self._finalize_lock:
+            if self.test_results is not None:
                 self.test_results.append(result)
-                completed += 1
+            for sink in self.result_sinks:
+                sink.add(result)
+    
+    def finalize_results(self):
+        """
+        Передать все ожидающие результаты в агрегатор и файл результатов
+        
+        Вызывается после сопоставления с логами; повторный вызов ничего не делает.
+        """
+        if self._finalized:
+            return
+        with self._log_lock:
+            ready = self._pop_ready_results(force=True)
+        for result in ready:
+            self._finalize(result)
+        for sink in self.result_sinks:
+            sink.close()
+        self._finalized = True
+    
+    def _send_all_threaded(self, payloads, total, send=None):
+        # Параллельная отправка с ограниченным окном: в работе не больше window запросов
+        send = send or self.send_payload
+        window = config.SUBMIT_WINDOW or config.CONCURRENT_REQUESTS * 4
+        iterator = iter(payloads)
+        exhausted = False
+        pending = set()
+        completed = 0
+        
+        with ThreadPoolExecutor(max_workers=config.CONCURRENT_REQUESTS) as executor:
+            while True:
+                while not exhausted and len(pending) < window:
+                    payload = next(iterator, None)
+                    if payload is None:
+                        exhausted = True
+                        break
+                    pending.add(executor.submit(send, payload))
                 
-                # Простой прогресс-бар
-                percent = (completed / len(payloads)) * 100
-                print(f"\r[*] Прогресс: {completed}/{len(payloads)} ({percent:.1f}%)", 
-                      end="", flush=True)
+                if not pending:
+                    break
                 
-                time.sleep(config.DELAY_BETWEEN_REQUESTS)
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._collect(future.result())
+                    completed += 1
+                
+                # Простой прогресс-бар
+                self._print_progress(completed, total)
+    
+    def _send_all_raw(self, payloads, total):
+        from raw_engine import RawEngine
         
-        print(f"\n[✓] Все запросы отправлены")
-        self.end_time = datetime.now()
+        # Payload компилируются в wire-формат в потоке раздачи, потоки пула только пишут в сокет
+        engine = RawEngine(self)
+        try:
+            self._send_all_threaded(engine.compiled(payloads), total, engine.send_compiled)
+        finally:
+            engine.close()
+    
+    def _send_all_async(self, payloads, total):
+        from async_engine import AsyncEngine
+        
+        completed = 0
+        
+        def on_result(result):
+            nonlocal completed
+            self._collect(result)
+            completed += 1
+            self._print_progress(completed, total)
+        
+        AsyncEngine(self).run(payloads, on_result)
+    
+    def _send_all_distributed(self, payloads, total):
+        from distributed import DistributedCoordinator
+        
+        completed = 0
+        
+        def on_result(result):
+            nonlocal completed
+            self._collect(result)
+            completed += 1
+            if completed % 100 == 0 or completed == total:
+                self._print_progress(completed, total)
+        
+        coordinator = DistributedCoordinator(self)
+        self.worker_stats = coordinator.run(payloads, on_result)
+        if completed % 100:
+            self._print_progress(completed, total)
+        self.lost_payloads += coordinator.lost
+        for worker in self.worker_stats:
+            self.http_pool.stats.merge(worker["connection_stats"])
     
     def check_logs(self):
         """
         Прочитать логи ModSecurity и определить блокировки
+        
+        Читаются только записи, добавленные после начала отправки payload.
         """
         print(f"\n[*] Проверка логов ModSecurity...")
         
-        if not Path(self.log_file).exists():
+        sources = [
+            source for source in resolve_log_sources(self.log_file)
+            if Path(source.path).exists() or source.path in self.log_positions
+        ]
+        if not sources:
             print(f"[!] Файл логов не найден: {self.log_file}")
             return
         
         try:
-            with open(self.log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                log_content = f.read()
+            # Парсинг JSON логов (ModSecurity пишет одну запись на строку),
+            # несколько файлов разбираются параллельно в пуле процессов
+            counter = {"entries": 0}
             
-            # Парсинг JSON логов (ModSecurity пишет одну запись на строку)
-            log_lines = log_content.strip().split('\n')
-            blocks = []
+            def counted(entries):
+                for entry in entries:
+                    counter["entries"] += 1
+                    yield entry
             
-            for line in log_lines:
-                if not line.strip():
-                    continue
-                try:
-                    log_entry = json.loads(line)
-                    blocks.append(log_entry)
-                except json.JSONDecodeError:
-                    continue
+            entries = ingest_logs(sources, self.log_positions, self._log_prefilter())
             
-            print(f"[✓] Прочитано {len(blocks)} записей блокировки")
+            # Соотнесение с отправленными запросами по мере чтения
+            self._match_blocks_to_results(counted(entries))
             
-            # Соотнесение с test_results
-            self._match_blocks_to_results(blocks)
+            print(f"[✓] Прочитано {counter['entries']} записей блокировки "
+                  f"из {len(sources)} источников")
         
         except Exception as e:
             print(f"[!] Ошибка при чтении логов: {str(e)}")
@@ -195,7 +794,7 @@ class WAFTester:
         Соотнести блокировки в логах с отправленными payload
         
         Args:
-            blocks (List[Dict]): Список записей из логов
+            blocks (Iterable[Dict]): Записи из логов
         """
         for block in blocks:
             try:
@@ -204,7 +803,6 @@ class WAFTester:
                     continue
                 
                 transaction = block['transaction']
-                request_uri = transaction.get('request', {}).get('uri', '')
                 timestamp_str = transaction.get('timestamp', '')
                 
                 # Проверка времени блокировки
@@ -216,76 +814,123 @@ class WAFTester:
                     except:
                         pass
                 
-                # Поиск соответствующего payload в результатах
-                for result in self.test_results:
-                    # Простое соотнесение по содержимому payload в URI
-                    if result.payload in request_uri:
-                        result.was_blocked = True
-                        
-                        # Извлечение информации о правилах
-                        if 'messages' in transaction:
-                            for message in transaction['messages']:
-                                if 'details' in message:
-                                    rule_id = str(message['details'].get('ruleId', 'unknown'))
-                                    if rule_id not in result.blocked_by_rules:
-                                        result.blocked_by_rules.append(rule_id)
+                # Поиск результатов через индекс корреляции
+                with self._log_lock:
+                    results = self.correlation.lookup(transaction)
+                    if results:
+                        self._apply_log_match(results, transaction)
             
             except Exception as e:
                 continue
     
+    def _apply_log_match(self, results, transaction):
+        # Извлечение информации о правилах
+        rule_ids = extract_rule_ids(transaction)
+        for result in results:
+            if not result.log_matched:
+                self.log_matched_count += 1
+            result.was_blocked = True
+            result.log_matched = True
+            self._awaiting_log.discard(result.correlation_id)
+            new_rules = tuple(r for r in dict.fromkeys(rule_ids) if r not in result.blocked_by_rules)
+            if new_rules:
+                result.blocked_by_rules += new_rules
+    
+    def _log_prefilter(self):
+        has_marker = bool(config.CORRELATION_HEADER or config.CORRELATION_PARAM)
+        return LinePrefilter(
+            run_id=self.run_id if has_marker else None,
+            since=self.start_time or datetime.now()
+        )
+    
+    def start_log_follow(self):
+        """
+        Начать чтение аудит-логов параллельно с отправкой payload
+        
+        Режим доступен, когда все источники - обычные файлы.
+        
+        Returns:
+            bool: True если логи доступны и чтение запущено
+        """
+        sources = resolve_log_sources(self.log_file)
+        files = [s for s in sources if s.kind == LogSource.FILE and Path(s.path).exists()]
+        if not files or len(files) != len(sources):
+            return False
+        
+        self.log_positions = capture_positions(files)
+        self.log_followers = [AuditLogFollower(pos) for pos in self.log_positions.values()]
+        self._sending_done.clear()
+        self._follow_thread = threading.Thread(target=self._follow_logs, daemon=True)
+        self._follow_thread.start()
+        return True
+    
+    def _follow_logs(self):
+        deadline = None
+        prefilter = self._log_prefilter()
+        while True:
+            got_lines = False
+            for follower in self.log_followers:
+                lines = follower.poll()
+                if lines:
+                    got_lines = True
+                    self._match_blocks_to_results(iter_entries(lines, prefilter))
+            if got_lines:
+                continue
+            
+            if self._sending_done.is_set():
+                if deadline is None:
+                    deadline = time.monotonic() + config.LOG_FOLLOW_TIMEOUT
+                with self._log_lock:
+                    accounted = not self._awaiting_log
+                if accounted or time.monotonic() >= deadline:
+                    break
+            time.sleep(config.LOG_POLL_INTERVAL)
+    
+    def finish_log_follow(self):
+        """
+        Дождаться записей лога по всем отправленным запросам или истечения срока
+        """
+        print(f"\n[*] Ожидание записей аудит-лога (не более {config.LOG_FOLLOW_TIMEOUT} сек)...")
+        self._sending_done.set()
+        self._follow_thread.join()
+        for follower in self.log_followers:
+            follower.close()
+        self.log_followers = []
+        
+        print(f"[✓] Сопоставлено с логом: {self.log_matched_count} запросов")
+        if self._awaiting_log:
+            print(f"[!] Нет записей в логе для {len(self._awaiting_log)} заблокированных запросов")
+    
     def get_statistics(self):
         """
         Получить статистику тестирования
         
+        Статистика берётся из инкрементального агрегатора, результаты
+        повторно не перебираются.
+        
         Returns:
             Dict: Словарь со статистикой
         """
-        total_sent = len(self.test_results)
-        total_blocked = sum(1 for r in self.test_results if r.was_blocked)
-        total_missed = total_sent - total_blocked
-        
-        # Статистика по типам атак
-        stats_by_type = {}
-        for attack_type in config.ATTACK_TYPES:
-            type_results = [r for r in self.test_results if r.attack_type == attack_type]
-            type_blocked = sum(1 for r in type_results if r.was_blocked)
-            
-            stats_by_type[attack_type] = {
-                "sent": len(type_results),
-                "blocked": type_blocked,
-                "missed": len(type_results) - type_blocked,
-                "detection_rate": (type_blocked / len(type_results) * 100) if type_results else 0
-            }
-        
-        # Статистика по правилам
-        rule_stats = {}
-        for result in self.test_results:
-            for rule_id in result.blocked_by_rules:
-                if rule_id not in rule_stats:
-                    rule_stats[rule_id] = 0
-                rule_stats[rule_id] += 1
-        
-        # Топ правил
-        top_rules = sorted(
-            rule_stats.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:10]
-        
-        # Пропущенные атаки
-        missed_attacks = [r for r in self.test_results if not r.was_blocked]
-        
-        return {
-            "total_sent": total_sent,
-            "total_blocked": total_blocked,
-            "total_missed": total_missed,
-            "detection_rate": (total_blocked / total_sent * 100) if total_sent else 0,
-            "stats_by_type": stats_by_type,
-            "rule_stats": rule_stats,
-            "top_rules": top_rules,
-            "missed_attacks": missed_attacks,
+        self.finalize_results()
+        stats = self.aggregator.snapshot()
+        stats.update({
+            "connection_stats": self.http_pool.stats.as_dict(),
+            "rate_limit": self.rate_limiter.as_dict(),
+            "latency": self.latency.snapshot(),
+            "workers": self.worker_stats,
+            "lost_payloads": self.lost_payloads,
+            "search": self.search.as_dict() if self.search else None,
+            "cache": self.verdict_cache.as_dict() if self.verdict_cache else None,
+            "exports": [exporter.filename for exporter in self.exporters],
+            "run_store": self.run_store.as_dict() if self.run_store else None,
+            "checkpoint": {
+                "file": self.checkpoint.path,
+                "restored": len(self._completed),
+                "written": self.checkpoint.count,
+            } if self.checkpoint else None,
             "execution_time": (self.end_time - self.start_time).total_seconds() if self.start_time and self.end_time else 0
-        }
+        })
+        return stats
     
     def run_full_test(self):
         """
@@ -295,15 +940,38 @@ class WAFTester:
         if not self.check_connection():
             return False
         
-        # Отправка всех payload
-        self.send_all_payloads()
+        self.start_metrics()
+        try:
+            return self._run_full_test()
+        finally:
+            self.stop_metrics()
+    
+    def _run_full_test(self):
+        # Чтение лога параллельно с отправкой
+        following = bool(self.log_file) and config.LOG_FOLLOW and self.start_log_follow()
         
-        # Небольшая задержка для логирования
-        print("[*] Ожидание логирования (2 сек)...")
-        time.sleep(2)
+        # Отправка всех payload или адаптивный поиск обходов
+        if config.SEARCH_ENABLED:
+            from bypass_search import BypassSearch
+            self.search = BypassSearch()
+            self.search.run(self)
+        else:
+            self.send_all_payloads()
         
-        # Проверка логов
-        self.check_logs()
+        if following:
+            self.finish_log_follow()
+        elif not self.log_file:
+            print("[*] Аудит-лог не используется: блокировки определены по ответам сервера")
+        elif not self.keep_results:
+            print("[!] Результаты не хранятся в памяти: записи лога сопоставляются "
+                  "только в режиме LOG_FOLLOW")
+        else:
+            # Небольшая задержка для логирования
+            print(f"[*] Ожидание логирования ({config.LOG_WAIT_TIME} сек)...")
+            time.sleep(config.LOG_WAIT_TIME)
+            
+            # Проверка логов
+            self.check_logs()
         
+        self.finalize_results()
         return True
-
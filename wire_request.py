@@ -0,0 +1,189 @@
+# wire_request.py
+"""
+Запросы в wire-формате HTTP/1.1: payload компилируется в байты до отправки
+"""
+
+import json
+from urllib.parse import quote, quote_plus, urlsplit
+
+import config
+from correlation import quote_header_marker
+
+# Где в запросе находится payload (поле "location" записи набора)
+LOCATIONS = ("query", "form", "json", "header", "cookie")
+
+# Управляющие символы, которые без "raw" кодируются в заголовках
+_HEADER_UNSAFE = str.maketrans({"\r": "%0D", "\n": "%0A", "\0": "%00"})
+
+
+def _raw_bytes(value):
+    # Строка как есть, без нормализации: суррогаты из байтовых наборов сохраняются
+    return value.encode("utf-8", "surrogateescape")
+
+
+class RequestTemplate:
+    """Скомпилированный запрос с местами для маркера корреляции
+
+    Части запроса хранятся готовыми байтами; маркер (свой у каждой
+    отправки) вставляется между частями без копирования остального запроса.
+    """
+
+    __slots__ = ("parts", "slots")
+
+    def __init__(self, parts, slots=()):
+        """
+        Инициализация шаблона
+
+        Args:
+            parts (List[bytes]): Части запроса, между соседними - маркер корреляции
+            slots (Tuple[str]): Место каждого маркера: "query" или "header"
+        """
+        self.parts = parts
+        self.slots = slots
+
+    def buffers(self, marker):
+        """
+        Буферы запроса для sendmsg (writev)
+
+        Args:
+            marker (str): Маркер корреляции
+
+        Returns:
+            List[bytes]: Части запроса с маркером между ними
+        """
+        parts = self.parts
+        if len(parts) == 1:
+            return parts
+        # Маркер кодируется как значение query string или заголовка:
+        # "+" и не-ASCII символы в id мутаций не должны менять его при разборе
+        encoded = {
+            "query": quote_plus(marker).encode("ascii"),
+            "header": quote_header_marker(marker).encode("ascii"),
+        }
+        buffers = [parts[0]]
+        for slot, part in zip(self.slots, parts[1:]):
+            buffers.append(encoded[slot])
+            buffers.append(part)
+        return buffers
+
+    def render(self, marker):
+        """
+        Запрос одной строкой байт
+
+        Args:
+            marker (str): Маркер корреляции
+
+        Returns:
+            bytes: Запрос в wire-формате
+        """
+        return b"".join(self.buffers(marker))
+
+
+class RequestCompiler:
+    """Компиляция payload в шаблоны запросов к одному серверу
+
+    Поле "location" записи выбирает место payload: query string (по
+    умолчанию), тело формы, тело JSON, заголовок или cookie с именем из
+    "parameter". Для form и json метод GET заменяется на POST. С "raw":
+    true payload вставляется без кодирования - так отправляются
+    некорректные запросы (сырой %00, неверные %-последовательности,
+    незакрытый JSON).
+    """
+
+    def __init__(self, target_url):
+        """
+        Инициализация компилятора
+
+        Args:
+            target_url (str): URL целевого сервера
+        """
+        parts = urlsplit(target_url)
+        scheme = parts.scheme or "http"
+        port = parts.port or (443 if scheme == "https" else 80)
+        default_port = 443 if scheme == "https" else 80
+        host_header = parts.hostname if port == default_port else f"{parts.hostname}:{port}"
+        self.base_path = parts.path.rstrip("/").encode("ascii")
+
+        # Общие для всех запросов заголовки кодируются один раз
+        self.common_headers = (
+            f"Host: {host_header}\r\n"
+            f"User-Agent: waf-tester\r\n"
+            f"Accept: */*\r\n"
+        ).encode("latin-1")
+        connection = "keep-alive" if config.HTTP_KEEP_ALIVE else "close"
+        self.connection_header = f"Connection: {connection}\r\n".encode("ascii")
+        self.marker_param = (quote_plus(config.CORRELATION_PARAM).encode("ascii")
+                             if config.CORRELATION_PARAM else None)
+        self.marker_header = (config.CORRELATION_HEADER.encode("ascii")
+                              if config.CORRELATION_HEADER else None)
+
+    def _encode_value(self, location, value, raw):
+        if raw:
+            return _raw_bytes(value)
+        if location in ("query", "form"):
+            return quote_plus(value).encode("ascii")
+        if location == "cookie":
+            return quote(value, safe="!#$&'()*+-./:<>?@[]^_`{|}~").encode("ascii")
+        if location == "header":
+            return value.translate(_HEADER_UNSAFE).encode("utf-8")
+        return json.dumps(value).encode("utf-8")
+
+    def compile(self, payload_dict):
+        """
+        Скомпилировать payload в шаблон запроса
+
+        Args:
+            payload_dict (Dict): Словарь с информацией о payload
+
+        Returns:
+            RequestTemplate: Шаблон, готовый к отправке
+        """
+        location = payload_dict.get("location") or "query"
+        if location not in LOCATIONS:
+            raise ValueError(f"Неизвестное место payload: {location}")
+        raw = payload_dict.get("raw", False)
+        method = (payload_dict.get("method") or "GET").upper()
+        if location in ("form", "json") and method == "GET":
+            method = "POST"
+
+        parameter = payload_dict["parameter"]
+        name = parameter.encode("utf-8") if raw else quote_plus(parameter).encode("ascii")
+        value = self._encode_value(location, payload_dict["payload"], raw)
+
+        query = b""
+        headers = b""
+        body = None
+        if location == "query":
+            query = name + b"=" + value
+        elif location == "form":
+            body = name + b"=" + value
+            headers = b"Content-Type: application/x-www-form-urlencoded\r\n"
+        elif location == "json":
+            body = json.dumps(parameter).encode("utf-8") if not raw else b'"' + name + b'"'
+            body = b"{" + body + b": " + value + b"}"
+            headers = b"Content-Type: application/json\r\n"
+        elif location == "header":
+            headers = parameter.encode("latin-1", "replace") + b": " + value + b"\r\n"
+        else:
+            headers = b"Cookie: " + name + b"=" + value + b"\r\n"
+        if body is not None:
+            headers += b"Content-Length: %d\r\n" % len(body)
+
+        target = self.base_path + _raw_bytes(payload_dict["endpoint"])
+        parts = []
+        slots = []
+        head = method.encode("ascii") + b" " + target
+        if query or self.marker_param:
+            head += b"?" + query
+        if self.marker_param:
+            head += (b"&" if query else b"") + self.marker_param + b"="
+            parts.append(head)
+            slots.append("query")
+            head = b""
+        head += b" HTTP/1.1\r\n" + self.common_headers + headers
+        if self.marker_header:
+            parts.append(head + self.marker_header + b": ")
+            slots.append("header")
+            head = b"\r\n"
+        parts.append(head + self.connection_header + b"\r\n" + (body or b""))
+        return RequestTemplate(parts, tuple(slots))